@@ -27,6 +27,11 @@ from app.models.task import Task
 from app.models.submission import Submission
 from app.models.evaluation import Evaluation
 from app.models.ai_solution import AISolution
+from app.models.code_fingerprint import CodeFingerprint
+from app.models.submission_similarity import SubmissionSimilarity
+from app.models.submission_similarity_stats import SubmissionSimilarityStats
+from app.models.cached_test_run import CachedTestRun
+from app.models.cached_llm_response import CachedLLMResponse
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
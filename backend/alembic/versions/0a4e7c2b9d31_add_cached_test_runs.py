@@ -0,0 +1,48 @@
+"""Add cached test runs keyed by code hash and test set hash
+
+Revision ID: 0a4e7c2b9d31
+Revises: f2c6a9d4b8e1
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a4e7c2b9d31'
+down_revision: Union[str, Sequence[str], None] = 'f2c6a9d4b8e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'cached_test_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('code_hash', sa.String(length=64), nullable=False),
+        sa.Column('test_set_hash', sa.String(length=64), nullable=False),
+        sa.Column('score', sa.Float(), nullable=True),
+        sa.Column('passed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('results', sa.Text(), nullable=False),
+        sa.Column('hit_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('last_used_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_cached_test_runs')),
+        sa.UniqueConstraint('code_hash', 'test_set_hash', name='unique_cached_test_run_key')
+    )
+    op.create_index(op.f('ix_cached_test_runs_id'), 'cached_test_runs', ['id'], unique=False)
+    op.create_index(op.f('ix_cached_test_runs_test_set_hash'), 'cached_test_runs', ['test_set_hash'], unique=False)
+    op.create_index(op.f('ix_cached_test_runs_last_used_at'), 'cached_test_runs', ['last_used_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_cached_test_runs_last_used_at'), table_name='cached_test_runs')
+    op.drop_index(op.f('ix_cached_test_runs_test_set_hash'), table_name='cached_test_runs')
+    op.drop_index(op.f('ix_cached_test_runs_id'), table_name='cached_test_runs')
+    op.drop_table('cached_test_runs')
@@ -0,0 +1,47 @@
+"""Add cached LLM responses keyed by request hash
+
+Revision ID: 1b5d8f3a6c20
+Revises: 0a4e7c2b9d31
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b5d8f3a6c20'
+down_revision: Union[str, Sequence[str], None] = '0a4e7c2b9d31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'cached_llm_responses',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('provider', sa.String(length=20), nullable=False),
+        sa.Column('model', sa.String(length=100), nullable=True),
+        sa.Column('temperature', sa.Float(), nullable=True),
+        sa.Column('response', sa.Text(), nullable=False),
+        sa.Column('hit_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('last_used_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_cached_llm_responses')),
+        sa.UniqueConstraint('cache_key', name='unique_cached_llm_response_key')
+    )
+    op.create_index(op.f('ix_cached_llm_responses_id'), 'cached_llm_responses', ['id'], unique=False)
+    op.create_index(op.f('ix_cached_llm_responses_created_at'), 'cached_llm_responses', ['created_at'], unique=False)
+    op.create_index(op.f('ix_cached_llm_responses_last_used_at'), 'cached_llm_responses', ['last_used_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_cached_llm_responses_last_used_at'), table_name='cached_llm_responses')
+    op.drop_index(op.f('ix_cached_llm_responses_created_at'), table_name='cached_llm_responses')
+    op.drop_index(op.f('ix_cached_llm_responses_id'), table_name='cached_llm_responses')
+    op.drop_table('cached_llm_responses')
@@ -0,0 +1,30 @@
+"""Add task grading rubric and evaluation correctness score
+
+Revision ID: 2c9e4a7b1f05
+Revises: 1b5d8f3a6c20
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c9e4a7b1f05'
+down_revision: Union[str, Sequence[str], None] = '1b5d8f3a6c20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tasks', sa.Column('grading_rubric', sa.Text(), nullable=True))
+    op.add_column('evaluations', sa.Column('correctness_score', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('evaluations', 'correctness_score')
+    op.drop_column('tasks', 'grading_rubric')
@@ -0,0 +1,32 @@
+"""Add (created_at, id) indexes for keyset pagination
+
+Revision ID: 3d7f1b9c5e28
+Revises: 2c9e4a7b1f05
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d7f1b9c5e28'
+down_revision: Union[str, Sequence[str], None] = '2c9e4a7b1f05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PAGINATED_TABLES = ('tasks', 'submissions', 'evaluations', 'users', 'groups')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in PAGINATED_TABLES:
+        op.create_index(f'ix_{table}_created_at_id', table, ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in PAGINATED_TABLES:
+        op.drop_index(f'ix_{table}_created_at_id', table_name=table)
@@ -0,0 +1,91 @@
+"""Add task and global evaluation stats rollups
+
+Revision ID: 4e8a2c6d0b13
+Revises: 3d7f1b9c5e28
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8a2c6d0b13'
+down_revision: Union[str, Sequence[str], None] = '3d7f1b9c5e28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STATS_COLUMNS = (
+    'evaluation_count', 'score_sum', 'ai_similarity_sum', 'group_similarity_sum',
+    'high_ai_similarity_count', 'high_group_similarity_count', 'suspicious_count',
+    'grade_a_count', 'grade_b_count', 'grade_c_count', 'grade_d_count', 'grade_f_count'
+)
+
+
+def stats_columns() -> list:
+    return [
+        sa.Column('evaluation_count', sa.Integer(), nullable=False),
+        sa.Column('score_sum', sa.BigInteger(), nullable=False),
+        sa.Column('ai_similarity_sum', sa.Float(), nullable=False),
+        sa.Column('group_similarity_sum', sa.Float(), nullable=False),
+        sa.Column('high_ai_similarity_count', sa.Integer(), nullable=False),
+        sa.Column('high_group_similarity_count', sa.Integer(), nullable=False),
+        sa.Column('suspicious_count', sa.Integer(), nullable=False),
+        sa.Column('grade_a_count', sa.Integer(), nullable=False),
+        sa.Column('grade_b_count', sa.Integer(), nullable=False),
+        sa.Column('grade_c_count', sa.Integer(), nullable=False),
+        sa.Column('grade_d_count', sa.Integer(), nullable=False),
+        sa.Column('grade_f_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'task_evaluation_stats',
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        *stats_columns(),
+        sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('task_id')
+    )
+    op.create_table(
+        'global_evaluation_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        *stats_columns(),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    # Backfill from the existing evaluations
+    op.execute("""
+        INSERT INTO task_evaluation_stats (task_id, evaluation_count, score_sum, ai_similarity_sum,
+            group_similarity_sum, high_ai_similarity_count, high_group_similarity_count, suspicious_count,
+            grade_a_count, grade_b_count, grade_c_count, grade_d_count, grade_f_count)
+        SELECT s.task_id,
+            count(*),
+            sum(e.final_score),
+            sum(e.ai_similarity),
+            sum(e.intra_group_similarity),
+            count(*) FILTER (WHERE e.ai_similarity > 0.8),
+            count(*) FILTER (WHERE e.intra_group_similarity > 0.8),
+            count(*) FILTER (WHERE e.ai_similarity > 0.8 OR e.intra_group_similarity > 0.8),
+            count(*) FILTER (WHERE e.final_score >= 90),
+            count(*) FILTER (WHERE e.final_score >= 80 AND e.final_score < 90),
+            count(*) FILTER (WHERE e.final_score >= 70 AND e.final_score < 80),
+            count(*) FILTER (WHERE e.final_score >= 60 AND e.final_score < 70),
+            count(*) FILTER (WHERE e.final_score < 60)
+        FROM evaluations e
+        JOIN submissions s ON s.id = e.submission_id
+        GROUP BY s.task_id
+    """)
+    columns = ', '.join(STATS_COLUMNS)
+    sums = ', '.join(f'coalesce(sum({column}), 0)' for column in STATS_COLUMNS)
+    op.execute(f"INSERT INTO global_evaluation_stats (id, {columns}) SELECT 1, {sums} FROM task_evaluation_stats")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('global_evaluation_stats')
+    op.drop_table('task_evaluation_stats')
@@ -0,0 +1,29 @@
+"""Add language to code fingerprints
+
+Revision ID: 5f1c3e7a9d24
+Revises: 4e8a2c6d0b13
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f1c3e7a9d24'
+down_revision: Union[str, Sequence[str], None] = '4e8a2c6d0b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing fingerprints have no language and are rebuilt on next load
+    op.add_column('code_fingerprints', sa.Column('language', sa.String(length=20), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('code_fingerprints', 'language')
@@ -0,0 +1,32 @@
+"""Add program hash to fingerprints and reset similarity aggregates
+
+Revision ID: 6a2d4f8b0c35
+Revises: 5f1c3e7a9d24
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6a2d4f8b0c35'
+down_revision: Union[str, Sequence[str], None] = '5f1c3e7a9d24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('code_fingerprints', sa.Column('program_hash', sa.String(length=64), nullable=True))
+
+    # Aggregates left exact copies out of the average; grading rebuilds them
+    op.execute("DELETE FROM submission_similarity_stats")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM submission_similarity_stats")
+    op.drop_column('code_fingerprints', 'program_hash')
@@ -0,0 +1,28 @@
+"""Add embedding AI similarity to evaluations
+
+Revision ID: 7b3e5a9c1d46
+Revises: 6a2d4f8b0c35
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3e5a9c1d46'
+down_revision: Union[str, Sequence[str], None] = '6a2d4f8b0c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('evaluations', sa.Column('ai_embedding_similarity', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('evaluations', 'ai_embedding_similarity')
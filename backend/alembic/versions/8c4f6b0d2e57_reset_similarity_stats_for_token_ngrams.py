@@ -0,0 +1,28 @@
+"""Reset similarity aggregates for canonical token n-gram features
+
+Revision ID: 8c4f6b0d2e57
+Revises: 7b3e5a9c1d46
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c4f6b0d2e57'
+down_revision: Union[str, Sequence[str], None] = '7b3e5a9c1d46'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Token and semantic scores now compare canonical token n-grams; grading rebuilds the aggregates
+    op.execute("DELETE FROM submission_similarity_stats")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM submission_similarity_stats")
@@ -0,0 +1,33 @@
+"""Drop code_fingerprints.term_counts and reset similarity aggregates
+
+Revision ID: 9d5a7c1e3f68
+Revises: 8c4f6b0d2e57
+Create Date: 2026-10-18 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d5a7c1e3f68'
+down_revision: Union[str, Sequence[str], None] = '8c4f6b0d2e57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The semantic method reads the token n-gram counts, which term_counts duplicated
+    op.drop_column('code_fingerprints', 'term_counts')
+    # Soft keywords are now canonicalized like identifiers; grading rebuilds the aggregates
+    op.execute("DELETE FROM submission_similarity_stats")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM submission_similarity_stats")
+    # Fingerprints of this version are stale for older code and get rebuilt
+    op.add_column('code_fingerprints', sa.Column('term_counts', sa.Text(), nullable=False, server_default='{}'))
@@ -0,0 +1,55 @@
+"""Add code fingerprints for precomputed similarity features
+
+Revision ID: b7e1f2a3c4d5
+Revises: a1b2c3d4e5f6
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e1f2a3c4d5'
+down_revision: Union[str, Sequence[str], None] = 'a1b2c3d4e5f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'code_fingerprints',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('submission_id', sa.Integer(), nullable=True),
+        sa.Column('ai_solution_id', sa.Integer(), nullable=True),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('normalized_hash', sa.String(length=64), nullable=False),
+        sa.Column('token_counts', sa.Text(), nullable=False),
+        sa.Column('term_counts', sa.Text(), nullable=False),
+        sa.Column('ast_histogram', sa.Text(), nullable=False),
+        sa.Column('minhash', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['submission_id'], ['submissions.id'], name=op.f('fk_code_fingerprints_submission_id_submissions'), ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['ai_solution_id'], ['ai_solutions.id'], name=op.f('fk_code_fingerprints_ai_solution_id_ai_solutions'), ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_code_fingerprints'))
+    )
+    op.create_index(op.f('ix_code_fingerprints_id'), 'code_fingerprints', ['id'], unique=False)
+    op.create_index(op.f('ix_code_fingerprints_submission_id'), 'code_fingerprints', ['submission_id'], unique=True)
+    op.create_index(op.f('ix_code_fingerprints_ai_solution_id'), 'code_fingerprints', ['ai_solution_id'], unique=True)
+    op.create_index(op.f('ix_code_fingerprints_content_hash'), 'code_fingerprints', ['content_hash'], unique=False)
+    op.create_index(op.f('ix_code_fingerprints_normalized_hash'), 'code_fingerprints', ['normalized_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_code_fingerprints_normalized_hash'), table_name='code_fingerprints')
+    op.drop_index(op.f('ix_code_fingerprints_content_hash'), table_name='code_fingerprints')
+    op.drop_index(op.f('ix_code_fingerprints_ai_solution_id'), table_name='code_fingerprints')
+    op.drop_index(op.f('ix_code_fingerprints_submission_id'), table_name='code_fingerprints')
+    op.drop_index(op.f('ix_code_fingerprints_id'), table_name='code_fingerprints')
+    op.drop_table('code_fingerprints')
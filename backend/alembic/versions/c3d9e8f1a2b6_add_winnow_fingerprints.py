@@ -0,0 +1,28 @@
+"""Add winnowed fingerprint hashes to code fingerprints
+
+Revision ID: c3d9e8f1a2b6
+Revises: b7e1f2a3c4d5
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3d9e8f1a2b6'
+down_revision: Union[str, Sequence[str], None] = 'b7e1f2a3c4d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('code_fingerprints', sa.Column('winnow', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('code_fingerprints', 'winnow')
@@ -0,0 +1,31 @@
+"""Replace AST node histogram with subtree hashes on code fingerprints
+
+Revision ID: d4a7b2c9e1f3
+Revises: c3d9e8f1a2b6
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7b2c9e1f3'
+down_revision: Union[str, Sequence[str], None] = 'c3d9e8f1a2b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('code_fingerprints', sa.Column('subtree_hashes', sa.Text(), nullable=True))
+    op.drop_column('code_fingerprints', 'ast_histogram')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Fingerprints are rebuilt on access once their version is outdated
+    op.add_column('code_fingerprints', sa.Column('ast_histogram', sa.Text(), nullable=False, server_default='{}'))
+    op.drop_column('code_fingerprints', 'subtree_hashes')
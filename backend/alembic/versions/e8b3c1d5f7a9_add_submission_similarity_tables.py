@@ -0,0 +1,76 @@
+"""Add stored pairwise submission similarities and per-submission aggregates
+
+Revision ID: e8b3c1d5f7a9
+Revises: d4a7b2c9e1f3
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b3c1d5f7a9'
+down_revision: Union[str, Sequence[str], None] = 'd4a7b2c9e1f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'submission_similarities',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('submission_a_id', sa.Integer(), nullable=False),
+        sa.Column('submission_b_id', sa.Integer(), nullable=False),
+        sa.Column('similarity', sa.Float(), nullable=False),
+        sa.Column('identical', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('method', sa.String(length=32), nullable=False, server_default='hybrid'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], name=op.f('fk_submission_similarities_task_id_tasks'), ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['submission_a_id'], ['submissions.id'], name=op.f('fk_submission_similarities_submission_a_id_submissions'), ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['submission_b_id'], ['submissions.id'], name=op.f('fk_submission_similarities_submission_b_id_submissions'), ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_submission_similarities')),
+        sa.UniqueConstraint('submission_a_id', 'submission_b_id', name='unique_submission_similarity_pair')
+    )
+    op.create_index(op.f('ix_submission_similarities_id'), 'submission_similarities', ['id'], unique=False)
+    op.create_index(op.f('ix_submission_similarities_task_id'), 'submission_similarities', ['task_id'], unique=False)
+    op.create_index(op.f('ix_submission_similarities_submission_a_id'), 'submission_similarities', ['submission_a_id'], unique=False)
+    op.create_index(op.f('ix_submission_similarities_submission_b_id'), 'submission_similarities', ['submission_b_id'], unique=False)
+
+    op.create_table(
+        'submission_similarity_stats',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('submission_id', sa.Integer(), nullable=False),
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('peer_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('compared_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('similarity_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('max_similarity', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('ai_max_similarity', sa.Float(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['submission_id'], ['submissions.id'], name=op.f('fk_submission_similarity_stats_submission_id_submissions'), ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['task_id'], ['tasks.id'], name=op.f('fk_submission_similarity_stats_task_id_tasks'), ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_submission_similarity_stats'))
+    )
+    op.create_index(op.f('ix_submission_similarity_stats_id'), 'submission_similarity_stats', ['id'], unique=False)
+    op.create_index(op.f('ix_submission_similarity_stats_submission_id'), 'submission_similarity_stats', ['submission_id'], unique=True)
+    op.create_index(op.f('ix_submission_similarity_stats_task_id'), 'submission_similarity_stats', ['task_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_submission_similarity_stats_task_id'), table_name='submission_similarity_stats')
+    op.drop_index(op.f('ix_submission_similarity_stats_submission_id'), table_name='submission_similarity_stats')
+    op.drop_index(op.f('ix_submission_similarity_stats_id'), table_name='submission_similarity_stats')
+    op.drop_table('submission_similarity_stats')
+
+    op.drop_index(op.f('ix_submission_similarities_submission_b_id'), table_name='submission_similarities')
+    op.drop_index(op.f('ix_submission_similarities_submission_a_id'), table_name='submission_similarities')
+    op.drop_index(op.f('ix_submission_similarities_task_id'), table_name='submission_similarities')
+    op.drop_index(op.f('ix_submission_similarities_id'), table_name='submission_similarities')
+    op.drop_table('submission_similarities')
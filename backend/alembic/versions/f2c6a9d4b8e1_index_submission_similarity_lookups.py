@@ -0,0 +1,50 @@
+"""Add code hashes and score lookup index to submission similarities
+
+Revision ID: f2c6a9d4b8e1
+Revises: e8b3c1d5f7a9
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c6a9d4b8e1'
+down_revision: Union[str, Sequence[str], None] = 'e8b3c1d5f7a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('submission_similarities', sa.Column('content_hash_a', sa.String(length=64), nullable=False, server_default=''))
+    op.add_column('submission_similarities', sa.Column('content_hash_b', sa.String(length=64), nullable=False, server_default=''))
+    op.alter_column('submission_similarities', 'updated_at', new_column_name='computed_at')
+
+    op.drop_constraint('unique_submission_similarity_pair', 'submission_similarities', type_='unique')
+    op.create_unique_constraint(
+        'unique_submission_similarity_pair', 'submission_similarities',
+        ['submission_a_id', 'submission_b_id', 'method']
+    )
+    op.create_index(
+        'ix_submission_similarities_task_method_similarity', 'submission_similarities',
+        ['task_id', 'method', 'similarity'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_submission_similarities_task_method_similarity', table_name='submission_similarities')
+    op.drop_constraint('unique_submission_similarity_pair', 'submission_similarities', type_='unique')
+    op.execute("DELETE FROM submission_similarities WHERE method <> 'hybrid'")
+    op.create_unique_constraint(
+        'unique_submission_similarity_pair', 'submission_similarities',
+        ['submission_a_id', 'submission_b_id']
+    )
+
+    op.alter_column('submission_similarities', 'computed_at', new_column_name='updated_at')
+    op.drop_column('submission_similarities', 'content_hash_b')
+    op.drop_column('submission_similarities', 'content_hash_a')
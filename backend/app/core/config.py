@@ -72,6 +72,18 @@ class Settings(BaseSettings):
     # AI Service Settings
     OPENAI_API_KEY: Optional[str] = None
     ANTHROPIC_API_KEY: Optional[str] = None
+    AI_HTTP_MAX_CONNECTIONS: int = 20  # Pooled connections per process to each AI provider
+    AI_HTTP_MAX_KEEPALIVE: int = 10  # Idle connections kept open for reuse
+    AI_HTTP_KEEPALIVE_SECONDS: float = 60.0  # Close idle connections after this long
+    AI_HTTP_HTTP2: bool = True  # Multiplex requests over HTTP/2 (needs the h2 package)
+    AI_HTTP_TIMEOUT_SECONDS: float = 30.0  # Per-request timeout for AI API calls
+    AI_SOLUTION_OPENAI_CONCURRENCY: int = 3  # Concurrent OpenAI solution requests per process
+    AI_SOLUTION_ANTHROPIC_CONCURRENCY: int = 2  # Concurrent Anthropic solution requests per process
+    GRADING_MODE: str = "llm"  # Primary grader: "llm" or "rubric" (tasks may override in their rubric)
+    GRADING_CONCURRENCY: int = 10  # Final grade requests in flight per grading run
+    GRADING_RATE_PER_SECOND: float = 5.0  # Sustained grade request rate (0 = unlimited)
+    GRADING_RATE_BURST: int = 10  # Requests that may start at once before the rate applies
+    GRADING_BATCH_SIZE: int = 10  # Submissions graded per LLM request (1 = one request each)
     
     # Similarity Service Settings
     SIMILARITY_SERVICE_URL: str = "http://localhost:8001"
@@ -86,6 +98,33 @@ class Settings(BaseSettings):
     AI_SIMILARITY_THRESHOLD: float = 0.8
     GROUP_SIMILARITY_THRESHOLD: float = 0.7
     
+    # Similarity Engine Settings
+    SIMILARITY_LSH_THRESHOLD: float = 0.5  # Estimated Jaccard for LSH candidate pairs
+    SIMILARITY_LSH_MIN_SUBMISSIONS: int = 200  # Use LSH instead of all-pairs from this size
+    SIMILARITY_WORKERS: int = 0  # Processes for CPU-bound similarity work (0 = one per CPU; needs a --pool=solo worker)
+    SIMILARITY_PARALLEL_MIN_DOCUMENTS: int = 100  # Below this many documents similarity runs serially
+    EMBEDDING_MODEL_NAME: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_DEVICE: str = "cpu"
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_CACHE_DIR: str = ".cache/embeddings"  # Persistent vector cache keyed by code hash
+    
+    # Test Execution Sandbox Settings
+    TEST_SANDBOX_POOL_SIZE: int = 4  # Warm sandbox interpreters per worker process
+    TEST_SANDBOX_MEMORY_MB: int = 256  # Address-space limit per test run
+    TEST_SANDBOX_MAX_OUTPUT_KB: int = 64  # Output beyond this fails the test
+    TEST_SANDBOX_BWRAP: str = "bwrap"  # bubblewrap binary that isolates test runs (tests are skipped without it)
+    TEST_SANDBOX_UID: int = 65534  # Uid test runs get inside the sandbox (must differ from the worker's)
+    TEST_RESULT_CACHE_TTL_DAYS: int = 30  # Evict cached test runs unused for this long
+    TEST_RESULT_CACHE_MAX_ENTRIES: int = 100000  # Evict least recently used runs beyond this
+    
+    # LLM Response Cache Settings
+    LLM_CACHE_ENABLED: bool = True  # Reuse stored responses to identical LLM requests
+    LLM_CACHE_TTL_DAYS: int = 14  # Responses older than this are requested again
+    LLM_CACHE_MAX_ENTRIES: int = 50000  # Evict least recently used responses beyond this
+
+    # Pagination Settings
+    PAGINATION_TOTAL_CACHE_SECONDS: int = 30  # Reuse list totals for this long (0 = count every page)
+
     # File Upload Settings
     MAX_FILE_SIZE_MB: int = 10
     ALLOWED_FILE_EXTENSIONS: Union[str, List[str]] = [".py", ".js", ".java", ".cpp", ".c", ".go", ".rs"]
@@ -14,6 +14,7 @@ from app.core.config import settings
 from app.core.database import init_db, close_db
 from app.core.rate_limit import limiter
 from app.core.logging import setup_logging, RequestIDMiddleware
+from app.services.ai_service import ai_service
 from app.routes.health import router as health_router
 from app.routes.auth import router as auth_router
 from app.routes.users import router as users_router
@@ -46,9 +47,12 @@ async def lifespan(app: FastAPI):
         logger.error(f"❌ Database connection failed: {e}")
         raise
     
+    await ai_service.startup()
+    
     yield
     
     logger.info("🛑 Shutting down EduCode Backend...")
+    await ai_service.aclose()
     await close_db()
     logger.info("✅ DB connection closed")
 
@@ -17,6 +17,12 @@ from app.models.ai_solution import AISolution
 from app.models.teacher_subject_group import TeacherSubjectGroup
 from app.models.lesson_assignment import LessonAssignment
 from app.models.task_test import TaskTest
+from app.models.code_fingerprint import CodeFingerprint
+from app.models.submission_similarity import SubmissionSimilarity
+from app.models.submission_similarity_stats import SubmissionSimilarityStats
+from app.models.cached_test_run import CachedTestRun
+from app.models.cached_llm_response import CachedLLMResponse
+from app.models.evaluation_stats import TaskEvaluationStats, GlobalEvaluationStats
 
 __all__ = [
     "User",
@@ -30,5 +36,12 @@ __all__ = [
     "AISolution",
     "TeacherSubjectGroup",
     "LessonAssignment",
-    "TaskTest"
+    "TaskTest",
+    "CodeFingerprint",
+    "SubmissionSimilarity",
+    "SubmissionSimilarityStats",
+    "CachedTestRun",
+    "CachedLLMResponse",
+    "TaskEvaluationStats",
+    "GlobalEvaluationStats"
 ]
\ No newline at end of file
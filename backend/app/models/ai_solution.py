@@ -11,7 +11,7 @@ from typing import Optional, Dict, Any
 import json
 
 from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum as SQLEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -30,8 +30,9 @@ class AISolution(Base):
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False, index=True)
     provider = Column(SQLEnum(AIProvider), nullable=False, index=True)
     variant_index = Column(Integer, nullable=False, index=True)
-    code = Column(Text, nullable=False)
-    meta = Column(Text, nullable=True)
+    # Deferred: undefer via app.models.loading where code/meta are read
+    code = deferred(Column(Text, nullable=False))
+    meta = deferred(Column(Text, nullable=True))
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -0,0 +1,67 @@
+"""
+EduCode Backend - CachedLLMResponse Model
+
+Defines the CachedLLMResponse entity memoizing LLM API responses. Entries
+are keyed by a hash of the full request (provider, model, temperature and
+prompt messages), so repeated solution generation, grading and task
+generation runs do not call the provider again.
+"""
+
+import json
+from typing import Any, Dict
+
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class CachedLLMResponse(Base):
+    """
+    Cached, validated response to one LLM request.
+
+    Entries are never updated in place: a changed prompt, model or
+    temperature produces a new key. Entries older than the TTL are ignored
+    and evicted by the periodic cleanup task.
+
+    Attributes:
+        id: Primary key
+        cache_key: SHA-256 of the provider and request payload
+        provider: AI provider (openai, anthropic)
+        model: Requested model
+        temperature: Requested sampling temperature
+        response: JSON response returned to the caller
+        hit_count: Number of times the entry was reused
+        created_at: Timestamp when the provider was called
+        last_used_at: Timestamp when the entry was last read or written
+    """
+
+    __tablename__ = "cached_llm_responses"
+    __table_args__ = (
+        UniqueConstraint("cache_key", name="unique_cached_llm_response_key"),
+    )
+
+    # Primary key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Cache key and the request parameters it covers
+    cache_key = Column(String(64), nullable=False)
+    provider = Column(String(20), nullable=False)
+    model = Column(String(100), nullable=True)
+    temperature = Column(Float, nullable=True)
+
+    # Response
+    response = Column(Text, nullable=False)  # JSON string
+
+    # Eviction bookkeeping
+    hit_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<CachedLLMResponse(id={self.id}, key='{self.cache_key[:12]}', provider='{self.provider}', model='{self.model}')>"
+
+    @property
+    def response_data(self) -> Dict[str, Any]:
+        """Parse and return the cached response."""
+        return json.loads(self.response) if self.response else {}
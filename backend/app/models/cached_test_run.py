@@ -0,0 +1,67 @@
+"""
+EduCode Backend - CachedTestRun Model
+
+Defines the CachedTestRun entity memoizing sandboxed test execution results.
+Entries are keyed by the normalized code hash and a hash of the task's test
+set, so resubmitted identical code and repeated grading runs skip execution.
+"""
+
+import json
+from typing import Dict, List
+
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class CachedTestRun(Base):
+    """
+    Cached outcome of running one code version against one test set.
+
+    Entries are never updated in place: changed code or tests produce a new
+    key. Unused entries are evicted by the periodic cleanup task.
+
+    Attributes:
+        id: Primary key
+        code_hash: SHA-256 of the normalized submission code
+        test_set_hash: SHA-256 of the language, test cases and sandbox limits
+        score: Weighted test score (0-100)
+        passed: Number of passed tests
+        total: Number of tests run
+        results: JSON list of per-test results
+        hit_count: Number of times the entry was reused
+        created_at: Timestamp when the tests were run
+        last_used_at: Timestamp when the entry was last read or written
+    """
+
+    __tablename__ = "cached_test_runs"
+    __table_args__ = (
+        UniqueConstraint("code_hash", "test_set_hash", name="unique_cached_test_run_key"),
+    )
+
+    # Primary key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Cache key
+    code_hash = Column(String(64), nullable=False)
+    test_set_hash = Column(String(64), nullable=False, index=True)
+
+    # Outcome
+    score = Column(Float, nullable=True)
+    passed = Column(Integer, default=0, nullable=False)
+    total = Column(Integer, default=0, nullable=False)
+    results = Column(Text, nullable=False)  # JSON string
+
+    # Eviction bookkeeping
+    hit_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<CachedTestRun(id={self.id}, code='{self.code_hash[:12]}', tests='{self.test_set_hash[:12]}', score={self.score})>"
+
+    @property
+    def results_data(self) -> List[Dict]:
+        """Parse and return the per-test results."""
+        return json.loads(self.results) if self.results else []
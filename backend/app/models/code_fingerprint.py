@@ -0,0 +1,92 @@
+"""
+EduCode Backend - CodeFingerprint Model
+
+Defines the CodeFingerprint entity storing precomputed similarity features.
+Fingerprints are derived once from submission or AI solution code so that
+similarity and grading jobs never have to re-process the raw source.
+"""
+
+import json
+from typing import Dict, List
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class CodeFingerprint(Base):
+    """
+    CodeFingerprint model holding the similarity features of one code document.
+
+    Exactly one of submission_id / ai_solution_id is set. A fingerprint is
+    stale when its content_hash no longer matches the owner's code, its
+    language differs from the task's, or its version differs from the
+    current feature extraction version.
+
+    Attributes:
+        id: Primary key
+        submission_id: Foreign key to Submission (one-to-one)
+        ai_solution_id: Foreign key to AISolution (one-to-one)
+        version: Feature extraction version used to build the fingerprint
+        language: Programming language the features were extracted for
+        content_hash: SHA-256 of the raw code
+        program_hash: Program hash used to group exact copies (see app.services.dedup)
+        normalized_hash: SHA-256 of the normalized code
+        token_counts: JSON canonical token n-gram multiset
+        subtree_hashes: JSON sorted AST subtree hashes (with repeats)
+        minhash: JSON MinHash signature
+        winnow: JSON winnowed k-gram fingerprint hashes
+        created_at: Timestamp when fingerprint was created
+        updated_at: Timestamp when fingerprint was last recomputed
+    """
+
+    __tablename__ = "code_fingerprints"
+
+    # Primary key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Owner (one of the two is set)
+    submission_id = Column(Integer, ForeignKey("submissions.id", ondelete="CASCADE"), unique=True, nullable=True, index=True)
+    ai_solution_id = Column(Integer, ForeignKey("ai_solutions.id", ondelete="CASCADE"), unique=True, nullable=True, index=True)
+
+    # Invalidation keys
+    version = Column(Integer, nullable=False, default=1)
+    language = Column(String(20), nullable=True)
+    content_hash = Column(String(64), nullable=False, index=True)
+    program_hash = Column(String(64), nullable=True)
+    normalized_hash = Column(String(64), nullable=False, index=True)
+
+    # Features (JSON strings)
+    token_counts = Column(Text, nullable=False)
+    subtree_hashes = Column(Text, nullable=True)
+    minhash = Column(Text, nullable=False)
+    winnow = Column(Text, nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        owner = f"submission_id={self.submission_id}" if self.submission_id else f"ai_solution_id={self.ai_solution_id}"
+        return f"<CodeFingerprint(id={self.id}, {owner}, hash='{self.content_hash[:12]}')>"
+
+    @property
+    def token_counts_data(self) -> Dict[str, int]:
+        """Parse and return the token multiset."""
+        return json.loads(self.token_counts) if self.token_counts else {}
+
+    @property
+    def subtree_hashes_data(self) -> List[int]:
+        """Parse and return the AST subtree hashes."""
+        return json.loads(self.subtree_hashes) if self.subtree_hashes else []
+
+    @property
+    def minhash_data(self) -> List[int]:
+        """Parse and return the MinHash signature."""
+        return json.loads(self.minhash) if self.minhash else []
+
+    @property
+    def winnow_data(self) -> List[int]:
+        """Parse and return the winnowed fingerprint hashes."""
+        return json.loads(self.winnow) if self.winnow else []
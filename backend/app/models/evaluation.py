@@ -8,8 +8,8 @@ Contains similarity metrics and final scores with rationale.
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Column, Integer, Float, Text, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, Float, Text, DateTime, ForeignKey, Index
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -25,8 +25,10 @@ class Evaluation(Base):
     Attributes:
         id: Primary key
         submission_id: Foreign key to Submission (one-to-one)
-        ai_similarity: Similarity score to AI-generated solutions (0.0-1.0)
+        ai_similarity: Highest hybrid similarity to any AI-generated solution (0.0-1.0)
+        ai_embedding_similarity: Highest embedding (cosine_embedding) similarity to any AI solution, if computed
         intra_group_similarity: Similarity score to other students in group (0.0-1.0)
+        correctness_score: Test correctness score the grade was based on (0-100)
         final_score: Final grade from AI evaluation (1-100)
         rationale: AI-generated explanation for the grade
         created_at: Timestamp when evaluation was created
@@ -43,11 +45,13 @@ class Evaluation(Base):
     
     # Similarity metrics
     ai_similarity = Column(Float, nullable=False, index=True)
+    ai_embedding_similarity = Column(Float, nullable=True)
     intra_group_similarity = Column(Float, nullable=False, index=True)
     
-    # Final grading results
+    # Grading inputs and results
+    correctness_score = Column(Float, nullable=True)
     final_score = Column(Integer, nullable=False, index=True)
-    rationale = Column(Text, nullable=False)
+    rationale = deferred(Column(Text, nullable=False))  # Deferred; EVALUATION_RATIONALE loads it
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -57,6 +61,11 @@ class Evaluation(Base):
     # FIXED: Use lazy="selectin" to prevent greenlet errors when accessing relationships in async context
     submission = relationship("Submission", back_populates="evaluation", lazy="selectin")
     
+    # Keyset pagination: newest first by (created_at, id)
+    __table_args__ = (
+        Index('ix_evaluations_created_at_id', 'created_at', 'id'),
+    )
+
     def __repr__(self) -> str:
         return f"<Evaluation(id={self.id}, submission_id={self.submission_id}, final_score={self.final_score})>"
     
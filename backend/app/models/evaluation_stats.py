@@ -0,0 +1,116 @@
+"""
+EduCode Backend - Evaluation Stats Rollup Models
+
+Defines the TaskEvaluationStats and GlobalEvaluationStats entities holding
+precomputed evaluation aggregates, so the summary endpoints read one row
+instead of scanning evaluations. Both are refreshed in the transaction
+that changes an evaluation (see app.services.evaluation_stats).
+"""
+
+from typing import Dict
+
+from sqlalchemy import Column, Integer, BigInteger, Float, DateTime, ForeignKey
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+GRADE_LETTERS = ("A", "B", "C", "D", "F")
+
+# Id of the single GlobalEvaluationStats row
+GLOBAL_STATS_ID = 1
+
+
+class EvaluationStatsColumns:
+    """
+    Aggregate columns shared by the task and global rollups.
+
+    Attributes:
+        evaluation_count: Number of evaluations
+        score_sum: Sum of final scores
+        ai_similarity_sum: Sum of AI similarities
+        group_similarity_sum: Sum of intra-group similarities
+        high_ai_similarity_count: Evaluations with AI similarity above the threshold
+        high_group_similarity_count: Evaluations with group similarity above the threshold
+        suspicious_count: Evaluations with either similarity above the threshold
+        grade_a_count .. grade_f_count: Letter grade histogram
+        updated_at: Timestamp when the rollup was last refreshed
+    """
+
+    # Counts and sums
+    evaluation_count = Column(Integer, default=0, nullable=False)
+    score_sum = Column(BigInteger, default=0, nullable=False)
+    ai_similarity_sum = Column(Float, default=0.0, nullable=False)
+    group_similarity_sum = Column(Float, default=0.0, nullable=False)
+
+    # Similarity threshold counts
+    high_ai_similarity_count = Column(Integer, default=0, nullable=False)
+    high_group_similarity_count = Column(Integer, default=0, nullable=False)
+    suspicious_count = Column(Integer, default=0, nullable=False)
+
+    # Grade histogram
+    grade_a_count = Column(Integer, default=0, nullable=False)
+    grade_b_count = Column(Integer, default=0, nullable=False)
+    grade_c_count = Column(Integer, default=0, nullable=False)
+    grade_d_count = Column(Integer, default=0, nullable=False)
+    grade_f_count = Column(Integer, default=0, nullable=False)
+
+    # Timestamps
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def _average(self, total: float) -> float:
+        return total / self.evaluation_count if self.evaluation_count else 0.0
+
+    @property
+    def average_score(self) -> float:
+        """Average final score."""
+        return self._average(self.score_sum)
+
+    @property
+    def average_ai_similarity(self) -> float:
+        """Average AI similarity."""
+        return self._average(self.ai_similarity_sum)
+
+    @property
+    def average_group_similarity(self) -> float:
+        """Average intra-group similarity."""
+        return self._average(self.group_similarity_sum)
+
+    @property
+    def grade_distribution(self) -> Dict[str, int]:
+        """Letter grade counts, omitting grades nobody received."""
+        counts = (self.grade_a_count, self.grade_b_count, self.grade_c_count, self.grade_d_count, self.grade_f_count)
+        return {letter: count for letter, count in zip(GRADE_LETTERS, counts) if count}
+
+
+class TaskEvaluationStats(EvaluationStatsColumns, Base):
+    """
+    Evaluation aggregates of one task's submissions.
+
+    Attributes:
+        task_id: Primary key and foreign key to Task
+    """
+
+    __tablename__ = "task_evaluation_stats"
+
+    # Primary key (one row per task)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), primary_key=True)
+
+    def __repr__(self) -> str:
+        return f"<TaskEvaluationStats(task_id={self.task_id}, evaluations={self.evaluation_count})>"
+
+
+class GlobalEvaluationStats(EvaluationStatsColumns, Base):
+    """
+    Evaluation aggregates over all tasks, the sum of every task's rollup.
+
+    Attributes:
+        id: Primary key (always GLOBAL_STATS_ID)
+    """
+
+    __tablename__ = "global_evaluation_stats"
+
+    # Primary key (single row)
+    id = Column(Integer, primary_key=True, default=GLOBAL_STATS_ID)
+
+    def __repr__(self) -> str:
+        return f"<GlobalEvaluationStats(evaluations={self.evaluation_count})>"
@@ -8,7 +8,7 @@ Groups are used for intra-group similarity analysis during grading.
 from datetime import datetime
 from typing import List
 
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -42,10 +42,16 @@ class Group(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
     # Relationships
-    # FIXED: Use lazy="selectin" to prevent greenlet errors when accessing relationships in async context
-    users = relationship("User", back_populates="group", lazy="selectin")
-    teacher_assignments = relationship("TeacherSubjectGroup", back_populates="group", lazy="selectin")
-    lesson_assignments = relationship("LessonAssignment", back_populates="group", lazy="selectin")
+    # Never loaded implicitly: queries opt in through app.models.loading profiles,
+    # and touching an unloaded relationship raises instead of querying
+    users = relationship("User", back_populates="group", lazy="raise_on_sql")
+    teacher_assignments = relationship("TeacherSubjectGroup", back_populates="group", lazy="raise_on_sql")
+    lesson_assignments = relationship("LessonAssignment", back_populates="group", lazy="raise_on_sql")
+
+    # Keyset pagination: newest first by (created_at, id)
+    __table_args__ = (
+        Index('ix_groups_created_at_id', 'created_at', 'id'),
+    )
 
     def __repr__(self) -> str:
         return f"<Group(id={self.id}, name='{self.name}')>"
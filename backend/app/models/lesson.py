@@ -49,12 +49,13 @@ class Lesson(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
     # Relationships
-    # FIXED: Use lazy="selectin" to prevent greenlet errors when accessing relationships in async context
-    subject = relationship("Subject", back_populates="lessons", lazy="selectin")
-    teacher = relationship("User", back_populates="lessons", foreign_keys=[teacher_id], lazy="selectin")
-    tasks = relationship("Task", back_populates="lesson", cascade="all, delete-orphan", lazy="selectin")
-    materials = relationship("LessonMaterial", back_populates="lesson", cascade="all, delete-orphan", lazy="selectin")
-    assignments = relationship("LessonAssignment", back_populates="lesson", cascade="all, delete-orphan", lazy="selectin")
+    # Never loaded implicitly: queries opt in through app.models.loading profiles,
+    # and touching an unloaded relationship raises instead of querying
+    subject = relationship("Subject", back_populates="lessons", lazy="raise_on_sql")
+    teacher = relationship("User", back_populates="lessons", foreign_keys=[teacher_id], lazy="raise_on_sql")
+    tasks = relationship("Task", back_populates="lesson", cascade="all, delete-orphan", lazy="raise_on_sql")
+    materials = relationship("LessonMaterial", back_populates="lesson", cascade="all, delete-orphan", lazy="raise_on_sql")
+    assignments = relationship("LessonAssignment", back_populates="lesson", cascade="all, delete-orphan", lazy="raise_on_sql")
 
     def __repr__(self) -> str:
         return f"<Lesson(id={self.id}, title='{self.title}', subject_id={self.subject_id})>"
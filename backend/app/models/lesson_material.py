@@ -10,7 +10,7 @@ from typing import Optional
 import enum
 
 from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -73,7 +73,7 @@ class LessonMaterial(Base):
     youtube_url = Column(String(512), nullable=True)  # YouTube video URL
 
     # AI generation fields
-    extracted_text = Column(Text, nullable=True)  # Text extracted from PDF/PPTX/DOCX
+    extracted_text = deferred(Column(Text, nullable=True))  # Text extracted from PDF/PPTX/DOCX (deferred)
     use_for_ai_generation = Column(Boolean, default=False, nullable=False)  # Use for AI task generation
 
     # Timestamps
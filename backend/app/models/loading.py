@@ -0,0 +1,81 @@
+"""
+EduCode Backend - Loading Profiles
+
+Relationships on Task, Lesson, User, Group and Subject are declared
+lazy="raise_on_sql", so loading a row never pulls in its collections (and,
+through them, every submission, evaluation and student). Each endpoint
+loads exactly what it serializes by passing one of these named profiles to
+``select(...).options(*PROFILE)`` or ``db.query(...).options(*PROFILE)``;
+accessing a relationship a profile did not load raises instead of querying.
+
+Large Text columns (Submission.code, AISolution.code/meta, Task.body,
+LessonMaterial.extracted_text, Evaluation.rationale) are deferred as well:
+only profiles for responses and workers that read them undefer them, so
+relationship loads and aggregate queries no longer ship source code and
+extracted document text.
+"""
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, selectinload, undefer
+
+from app.models.ai_solution import AISolution
+from app.models.evaluation import Evaluation
+from app.models.lesson import Lesson
+from app.models.lesson_material import LessonMaterial
+from app.models.subject import Subject
+from app.models.submission import Submission
+from app.models.task import Task
+from app.models.group import Group
+from app.models.user import User
+
+# Deferred columns, for the *Read schemas that serialize them and for workers
+SUBMISSION_CODE = (undefer(Submission.code),)
+AI_SOLUTION_CODE = (undefer(AISolution.code), undefer(AISolution.meta))
+EVALUATION_RATIONALE = (undefer(Evaluation.rationale),)
+TASK_BODY = (undefer(Task.body),)
+
+# Task lists serialize TaskRead columns only (including the body)
+TASK_LIST = TASK_BODY
+
+# Ownership checks read task.lesson.teacher_id
+TASK_WITH_LESSON = (selectinload(Task.lesson),)
+
+# Task detail always shows the lesson with its materials
+TASK_DETAIL = TASK_LIST + (selectinload(Task.lesson).selectinload(Lesson.materials),)
+TASK_WITH_SUBMISSIONS = TASK_DETAIL + (selectinload(Task.submissions).options(*SUBMISSION_CODE),)
+TASK_WITH_RELATIONS = TASK_WITH_SUBMISSIONS + (selectinload(Task.ai_solutions).options(*AI_SOLUTION_CODE),)
+
+# Grading runs submissions against the task's tests and describes the task
+TASK_GRADING = TASK_BODY + (selectinload(Task.tests),)
+
+# Lesson lists serialize LessonRead columns only
+LESSON_LIST = ()
+LESSON_WITH_TASKS = (selectinload(Lesson.tasks).options(*TASK_LIST),)
+LESSON_WITH_SUBJECT = (selectinload(Lesson.subject),)
+LESSON_WITH_RELATIONS = (
+    selectinload(Lesson.tasks).options(*TASK_LIST),
+    selectinload(Lesson.subject),
+    selectinload(Lesson.teacher)
+)
+
+# UserRead columns; reads never need the password hash
+USER_COLUMNS = (User.id, User.name, User.email, User.role, User.group_id, User.created_at, User.updated_at)
+USER_READ = (load_only(*USER_COLUMNS),)
+
+GROUP_WITH_USERS = (selectinload(Group.users).load_only(*USER_COLUMNS),)
+
+SUBJECT_WITH_LESSONS = (selectinload(Subject.lessons),)
+
+# Task generation reads the extracted text of a lesson's materials
+MATERIAL_TEXT = (undefer(LessonMaterial.extracted_text),)
+
+
+async def refresh_columns(db: AsyncSession, instance) -> None:
+    """
+    Refresh every column of ``instance``, deferred ones included.
+
+    ``refresh()`` expires deferred columns without reloading them; use this
+    after a commit when the response serializes a deferred column.
+    """
+    await db.refresh(instance, attribute_names=[column.key for column in inspect(instance).mapper.column_attrs])
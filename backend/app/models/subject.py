@@ -41,9 +41,10 @@ class Subject(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
     # Relationships
-    # FIXED: Use lazy="selectin" to prevent greenlet errors when accessing relationships in async context
-    lessons = relationship("Lesson", back_populates="subject", lazy="selectin")
-    teacher_assignments = relationship("TeacherSubjectGroup", back_populates="subject", lazy="selectin")
+    # Never loaded implicitly: queries opt in through app.models.loading profiles,
+    # and touching an unloaded relationship raises instead of querying
+    lessons = relationship("Lesson", back_populates="subject", lazy="raise_on_sql")
+    teacher_assignments = relationship("TeacherSubjectGroup", back_populates="subject", lazy="raise_on_sql")
 
     def __repr__(self) -> str:
         return f"<Subject(id={self.id}, name='{self.name}')>"
@@ -8,8 +8,8 @@ Submissions are evaluated for AI similarity and graded automatically.
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, Text, DateTime, ForeignKey, Index
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -36,8 +36,8 @@ class Submission(Base):
     # Primary key
     id = Column(Integer, primary_key=True, index=True)
     
-    # Submission content
-    code = Column(Text, nullable=False)
+    # Submission content (deferred; loaded only where the code is used)
+    code = deferred(Column(Text, nullable=False))
     
     # Foreign keys
     task_id = Column(Integer, ForeignKey("tasks.id"), nullable=False, index=True)
@@ -53,6 +53,11 @@ class Submission(Base):
     student = relationship("User", back_populates="submissions", foreign_keys=[student_id], lazy="selectin")
     evaluation = relationship("Evaluation", back_populates="submission", uselist=False, cascade="all, delete-orphan", lazy="selectin")
 
+    # Keyset pagination: newest first by (created_at, id)
+    __table_args__ = (
+        Index('ix_submissions_created_at_id', 'created_at', 'id'),
+    )
+
     def __repr__(self) -> str:
         return f"<Submission(id={self.id}, task_id={self.task_id}, student_id={self.student_id})>"
 
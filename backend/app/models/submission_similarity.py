@@ -0,0 +1,69 @@
+"""
+EduCode Backend - SubmissionSimilarity Model
+
+Defines the SubmissionSimilarity entity storing the pairwise similarity
+matrix of the submissions of one task. Rows are patched incrementally when
+a single submission is created or changed, and are indexed by task and
+score so plagiarism review reads them with range queries.
+"""
+
+from sqlalchemy import Column, Integer, Float, String, Boolean, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class SubmissionSimilarity(Base):
+    """
+    Similarity between two submissions of the same task.
+
+    Each unordered pair is stored once per method with
+    submission_a_id < submission_b_id.
+
+    Attributes:
+        id: Primary key
+        task_id: Foreign key to Task
+        submission_a_id: Foreign key to the submission with the lower ID
+        submission_b_id: Foreign key to the submission with the higher ID
+        similarity: Similarity score (0.0-1.0)
+        identical: Whether both submissions contain the same program (same program hash)
+        method: Similarity method used to compute the score
+        content_hash_a: Content hash of submission A's code when scored
+        content_hash_b: Content hash of submission B's code when scored
+        computed_at: Timestamp when the score was last computed
+    """
+
+    __tablename__ = "submission_similarities"
+
+    # Primary key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Foreign keys
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False, index=True)
+    submission_a_id = Column(Integer, ForeignKey("submissions.id", ondelete="CASCADE"), nullable=False, index=True)
+    submission_b_id = Column(Integer, ForeignKey("submissions.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    # Score
+    similarity = Column(Float, nullable=False)
+    identical = Column(Boolean, default=False, nullable=False)
+    method = Column(String(32), default="hybrid", nullable=False)
+
+    # Code versions the score belongs to
+    content_hash_a = Column(String(64), nullable=False)
+    content_hash_b = Column(String(64), nullable=False)
+
+    # Timestamps
+    computed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    # One row per submission pair and method; top-K / threshold lookups per task
+    __table_args__ = (
+        UniqueConstraint('submission_a_id', 'submission_b_id', 'method', name='unique_submission_similarity_pair'),
+        Index('ix_submission_similarities_task_method_similarity', 'task_id', 'method', 'similarity'),
+    )
+
+    def __repr__(self) -> str:
+        return f"<SubmissionSimilarity(a={self.submission_a_id}, b={self.submission_b_id}, similarity={self.similarity:.3f})>"
+
+    def other(self, submission_id: int) -> int:
+        """Return the ID of the other submission in the pair."""
+        return self.submission_b_id if submission_id == self.submission_a_id else self.submission_a_id
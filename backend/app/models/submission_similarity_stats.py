@@ -0,0 +1,67 @@
+"""
+EduCode Backend - SubmissionSimilarityStats Model
+
+Defines the SubmissionSimilarityStats entity holding precomputed
+per-submission similarity aggregates, so grading does not have to rebuild
+the group similarity matrix.
+"""
+
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class SubmissionSimilarityStats(Base):
+    """
+    Aggregated similarity of one submission against its task peers and AI solutions.
+
+    The stats are current when content_hash matches the submission's
+    fingerprint and peer_count equals the number of other submissions.
+    Large tasks only store pairs found by LSH, so compared_count can be
+    lower than peer_count; unstored pairs count as 0.0 in the average.
+
+    Attributes:
+        id: Primary key
+        submission_id: Foreign key to Submission (one-to-one)
+        task_id: Foreign key to Task
+        content_hash: Content hash of the code the stats were computed for
+        peer_count: Number of other submissions of the task (averaging base)
+        compared_count: Number of peers with a stored pair similarity
+        similarity_sum: Sum of stored pair similarities (exact copies count as 1.0)
+        max_similarity: Highest similarity to any peer
+        ai_max_similarity: Highest similarity to any AI solution
+        updated_at: Timestamp when the stats were last patched
+    """
+
+    __tablename__ = "submission_similarity_stats"
+
+    # Primary key
+    id = Column(Integer, primary_key=True, index=True)
+
+    # Foreign keys
+    submission_id = Column(Integer, ForeignKey("submissions.id", ondelete="CASCADE"), unique=True, nullable=False, index=True)
+    task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    # Invalidation key
+    content_hash = Column(String(64), nullable=False)
+
+    # Group aggregates
+    peer_count = Column(Integer, default=0, nullable=False)
+    compared_count = Column(Integer, default=0, nullable=False)
+    similarity_sum = Column(Float, default=0.0, nullable=False)
+    max_similarity = Column(Float, default=0.0, nullable=False)
+
+    # AI aggregate
+    ai_max_similarity = Column(Float, nullable=True)
+
+    # Timestamps
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<SubmissionSimilarityStats(submission_id={self.submission_id}, avg={self.average_similarity:.3f})>"
+
+    @property
+    def average_similarity(self) -> float:
+        """Average similarity to every peer (exact copies 1.0, unstored pairs 0.0)."""
+        return self.similarity_sum / self.peer_count if self.peer_count else 0.0
@@ -9,8 +9,8 @@ from datetime import datetime, timezone
 from enum import Enum
 from typing import List, Optional
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum as SQLEnum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, Enum as SQLEnum
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -42,6 +42,7 @@ class Task(Base):
         body: Task description and requirements
         language: Programming language for the task
         deadline_at: Submission deadline
+        grading_rubric: JSON GradingRubric for local grading (defaults when NULL)
         created_at: Timestamp when task was created
         updated_at: Timestamp when task was last updated
     """
@@ -53,7 +54,7 @@ class Task(Base):
     
     # Task information
     title = Column(String(255), nullable=False, index=True)
-    body = Column(Text, nullable=False)
+    body = deferred(Column(Text, nullable=False))  # Deferred; TaskRead profiles undefer it
     language = Column(SQLEnum(ProgrammingLanguage), nullable=False, index=True)
     
     # Foreign keys
@@ -62,16 +63,25 @@ class Task(Base):
     # Deadline
     deadline_at = Column(DateTime(timezone=True), nullable=False, index=True)
     
+    # Grading
+    grading_rubric = Column(Text, nullable=True)  # JSON string
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
     # Relationships
-    # FIXED: Use lazy="selectin" to prevent greenlet errors when accessing relationships in async context
-    lesson = relationship("Lesson", back_populates="tasks", lazy="selectin")
-    submissions = relationship("Submission", back_populates="task", cascade="all, delete-orphan", lazy="selectin")
-    ai_solutions = relationship("AISolution", back_populates="task", cascade="all, delete-orphan", lazy="selectin")
-    tests = relationship("TaskTest", back_populates="task", cascade="all, delete-orphan", lazy="selectin")
+    # Never loaded implicitly: queries opt in through app.models.loading profiles,
+    # and touching an unloaded relationship raises instead of querying
+    lesson = relationship("Lesson", back_populates="tasks", lazy="raise_on_sql")
+    submissions = relationship("Submission", back_populates="task", cascade="all, delete-orphan", lazy="raise_on_sql")
+    ai_solutions = relationship("AISolution", back_populates="task", cascade="all, delete-orphan", lazy="raise_on_sql")
+    tests = relationship("TaskTest", back_populates="task", cascade="all, delete-orphan", lazy="raise_on_sql")
+
+    # Keyset pagination: newest first by (created_at, id)
+    __table_args__ = (
+        Index('ix_tasks_created_at_id', 'created_at', 'id'),
+    )
 
     def __repr__(self) -> str:
         return f"<Task(id={self.id}, title='{self.title}', language='{self.language}')>"
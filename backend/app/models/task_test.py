@@ -1,8 +1,8 @@
 """
 EduCode Backend - TaskTest Model
 
-Defines unit tests for tasks (for future implementation).
-Tests will be used to automatically verify student code correctness.
+Defines unit tests for tasks.
+Tests are run in the sandbox (app.services.execution) to verify student code correctness.
 """
 
 from datetime import datetime
@@ -25,10 +25,11 @@ class TestType(str, enum.Enum):
 
 class TaskTest(Base):
     """
-    Task test model for automated code verification (future feature).
+    Task test model for automated code verification.
 
     Tests are used to verify student submissions automatically.
-    Each test contains input data and expected output.
+    Each test contains input data (fed to the program on stdin) and
+    expected output (compared with what the program prints).
 
     Example:
         Task: "Write a function to add two numbers"
@@ -9,7 +9,7 @@ from datetime import datetime
 from enum import Enum
 from typing import Optional, List
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -56,16 +56,22 @@ class User(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
     # Relationships
-    # FIXED: Use lazy="selectin" to prevent greenlet errors when accessing relationships in async context
-    group = relationship("Group", back_populates="users", lazy="selectin")
+    # Never loaded implicitly: queries opt in through app.models.loading profiles,
+    # and touching an unloaded relationship raises instead of querying
+    group = relationship("Group", back_populates="users", lazy="raise_on_sql")
 
     # Teacher relationships
-    lessons = relationship("Lesson", back_populates="teacher", foreign_keys="Lesson.teacher_id", lazy="selectin")
-    teaching_assignments = relationship("TeacherSubjectGroup", back_populates="teacher", lazy="selectin")
+    lessons = relationship("Lesson", back_populates="teacher", foreign_keys="Lesson.teacher_id", lazy="raise_on_sql")
+    teaching_assignments = relationship("TeacherSubjectGroup", back_populates="teacher", lazy="raise_on_sql")
 
     # Student relationships
-    submissions = relationship("Submission", back_populates="student", foreign_keys="Submission.student_id", lazy="selectin")
+    submissions = relationship("Submission", back_populates="student", foreign_keys="Submission.student_id", lazy="raise_on_sql")
     
+    # Keyset pagination: newest first by (created_at, id)
+    __table_args__ = (
+        Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
+
     def __repr__(self) -> str:
         return f"<User(id={self.id}, name='{self.name}', email='{self.email}', role='{self.role}')>"
     
@@ -19,9 +19,11 @@ from app.models.lesson import Lesson
 from app.models.lesson_material import LessonMaterial, MaterialType
 from app.models.task import Task, ProgrammingLanguage
 from app.models.task_test import TaskTest, TestType
-from app.models.ai_solution import AISolution
+from app.models.ai_solution import AISolution, AIProvider
+from app.models.loading import LESSON_WITH_SUBJECT, MATERIAL_TEXT
 from app.services.file_processor import process_multiple_materials
 from app.services.ai_task_generator import ai_task_generator, TaskGenerationError
+from app.services.fingerprints import save_fingerprint
 from pydantic import BaseModel, Field
 
 router = APIRouter(tags=["ai-generation"])
@@ -86,7 +88,7 @@ async def generate_tasks_from_materials(
         # Verify lesson exists and belongs to teacher
         lesson_result = await db.execute(
             select(Lesson)
-            .options(selectinload(Lesson.subject))
+            .options(*LESSON_WITH_SUBJECT)
             .where(Lesson.id == request.lesson_id)
         )
         lesson = lesson_result.scalar_one_or_none()
@@ -104,7 +106,7 @@ async def generate_tasks_from_materials(
         if request.material_ids:
             # Use specific materials
             materials_result = await db.execute(
-                select(LessonMaterial).where(
+                select(LessonMaterial).options(*MATERIAL_TEXT).where(
                     and_(
                         LessonMaterial.lesson_id == request.lesson_id,
                         LessonMaterial.id.in_(request.material_ids)
@@ -114,7 +116,7 @@ async def generate_tasks_from_materials(
         else:
             # Use all materials marked for AI generation
             materials_result = await db.execute(
-                select(LessonMaterial).where(
+                select(LessonMaterial).options(*MATERIAL_TEXT).where(
                     and_(
                         LessonMaterial.lesson_id == request.lesson_id,
                         LessonMaterial.use_for_ai_generation == True
@@ -195,10 +197,13 @@ async def generate_tasks_from_materials(
             # Create AI solution (reference solution)
             ai_solution = AISolution(
                 task_id=task.id,
-                code=task_data["reference_solution"],
-                language=task_data["language"].lower()
+                provider=AIProvider.OPENAI if request.use_openai else AIProvider.ANTHROPIC,
+                variant_index=1,
+                code=task_data["reference_solution"]
             )
             db.add(ai_solution)
+            await db.flush()
+            await save_fingerprint(db, ai_solution.code, task.language.value, ai_solution_id=ai_solution.id)
 
             # Create test cases
             for test_data in task_data["tests"]:
@@ -357,7 +362,7 @@ async def preview_generation_materials(
         if material_ids:
             ids = [int(id.strip()) for id in material_ids.split(",")]
             materials_result = await db.execute(
-                select(LessonMaterial).where(
+                select(LessonMaterial).options(*MATERIAL_TEXT).where(
                     and_(
                         LessonMaterial.lesson_id == lesson_id,
                         LessonMaterial.id.in_(ids)
@@ -366,7 +371,7 @@ async def preview_generation_materials(
             )
         else:
             materials_result = await db.execute(
-                select(LessonMaterial).where(
+                select(LessonMaterial).options(*MATERIAL_TEXT).where(
                     and_(
                         LessonMaterial.lesson_id == lesson_id,
                         LessonMaterial.use_for_ai_generation == True
@@ -14,10 +14,12 @@ from sqlalchemy.orm import selectinload
 from app.core.database import get_db
 from app.models.ai_solution import AISolution, AIProvider
 from app.models.task import Task
+from app.models.loading import AI_SOLUTION_CODE, TASK_LIST, refresh_columns
 from app.schemas.ai_solution import (
     AISolutionCreate, AISolutionRead, AISolutionUpdate, AISolutionList,
     AISolutionWithTask, TaskAISolutionSummary
 )
+from app.services.fingerprints import save_fingerprint
 
 router = APIRouter(prefix="/api/ai-solutions", tags=["ai-solutions"])
 
@@ -65,8 +67,12 @@ async def create_ai_solution(
         # Create new AI solution
         ai_solution = AISolution(**ai_solution_data.model_dump())
         db.add(ai_solution)
+        await db.flush()
+        
+        # Store similarity fingerprint together with the code
+        await save_fingerprint(db, ai_solution.code, task.language.value, ai_solution_id=ai_solution.id)
         await db.commit()
-        await db.refresh(ai_solution)
+        await refresh_columns(db, ai_solution)
         
         return {
             "data": AISolutionRead.model_validate(ai_solution),
@@ -101,7 +107,7 @@ async def get_ai_solutions(
     """
     try:
         # Build query with filters
-        query = select(AISolution).options(selectinload(AISolution.task))
+        query = select(AISolution).options(*AI_SOLUTION_CODE)
         
         if task_id:
             query = query.where(AISolution.task_id == task_id)
@@ -159,10 +165,10 @@ async def get_ai_solution(
     - **include_task**: Whether to include task details in the response
     """
     try:
-        query = select(AISolution)
+        query = select(AISolution).options(*AI_SOLUTION_CODE)
         
         if include_task:
-            query = query.options(selectinload(AISolution.task))
+            query = query.options(selectinload(AISolution.task).options(*TASK_LIST))
         
         query = query.where(AISolution.id == ai_solution_id)
         result = await db.execute(query)
@@ -223,8 +229,12 @@ async def update_ai_solution(
         for field, value in update_data.items():
             setattr(ai_solution, field, value)
         
+        # Refresh the fingerprint (no-op when the content hash is unchanged)
+        if 'code' in update_data:
+            await save_fingerprint(db, ai_solution.code, ai_solution.task.language.value, ai_solution_id=ai_solution.id)
+        
         await db.commit()
-        await db.refresh(ai_solution)
+        await refresh_columns(db, ai_solution)
         
         return {
             "data": AISolutionRead.model_validate(ai_solution),
@@ -301,11 +311,12 @@ async def get_task_ai_solution_summary(
                 detail="Task not found"
             )
         
-        # Get AI solutions for this task
+        # Get AI solutions for this task (code lengths only, not the code)
         ai_solutions_result = await db.execute(
-            select(AISolution).where(AISolution.task_id == task_id)
+            select(AISolution.provider, func.length(AISolution.code).label("code_length"))
+            .where(AISolution.task_id == task_id)
         )
-        ai_solutions = ai_solutions_result.scalars().all()
+        ai_solutions = ai_solutions_result.all()
         
         # Count by provider
         openai_count = sum(1 for sol in ai_solutions if sol.provider == AIProvider.OPENAI)
@@ -314,7 +325,7 @@ async def get_task_ai_solution_summary(
         # Calculate average code length
         avg_code_length = 0
         if ai_solutions:
-            avg_code_length = sum(len(sol.code) for sol in ai_solutions) / len(ai_solutions)
+            avg_code_length = sum(sol.code_length for sol in ai_solutions) / len(ai_solutions)
         
         return {
             "data": TaskAISolutionSummary(
@@ -9,19 +9,29 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import selectinload, aliased
 
 from app.core.database import get_db
 from app.core.auth import get_current_user, teacher_required, admin_required, require_roles
+from app.models.code_fingerprint import CodeFingerprint
 from app.models.evaluation import Evaluation
 from app.models.submission import Submission
 from app.models.task import Task
 from app.models.lesson import Lesson
 from app.models.user import User
+from app.models.loading import EVALUATION_RATIONALE, SUBMISSION_CODE, TASK_LIST, TASK_WITH_LESSON, refresh_columns
+from app.models.submission_similarity import SubmissionSimilarity
 from app.schemas.evaluation import (
     EvaluationCreate, EvaluationRead, EvaluationUpdate, EvaluationList,
     EvaluationWithSubmission, EvaluationStats, TaskEvaluationSummary
 )
+from app.schemas.submission_similarity import (
+    SubmissionSimilarityRead, SubmissionSimilarityList, DuplicateCluster, DuplicateClusterList
+)
+from app.services.ai_service import ai_service
+from app.services.dedup import SubmissionClusters
+from app.services.evaluation_stats import global_evaluation_aggregates, task_evaluation_aggregates
+from app.utils.pagination import paginate
 
 router = APIRouter(prefix="/evaluations", tags=["evaluations"])
 
@@ -67,7 +77,7 @@ async def create_evaluation(
         evaluation = Evaluation(**evaluation_data.model_dump())
         db.add(evaluation)
         await db.commit()
-        await db.refresh(evaluation)
+        await refresh_columns(db, evaluation)
         
         return {
             "data": EvaluationRead.model_validate(evaluation),
@@ -92,6 +102,8 @@ async def get_evaluations(
     min_score: Optional[int] = Query(None, ge=1, le=100, description="Minimum final score"),
     max_score: Optional[int] = Query(None, ge=1, le=100, description="Maximum final score"),
     suspicious_only: Optional[bool] = Query(False, description="Show only suspicious evaluations"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page (overrides page)"),
+    include_total: bool = Query(True, description="Include the (cached) total count"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -110,6 +122,7 @@ async def get_evaluations(
         if current_user.role.value == "student":
             # Students can only view evaluations for their own submissions
             query = select(Evaluation).options(
+                *EVALUATION_RATIONALE,
                 selectinload(Evaluation.submission).selectinload(Submission.task),
                 selectinload(Evaluation.submission).selectinload(Submission.student)
             ).join(Evaluation.submission).where(Submission.student_id == current_user.id)
@@ -126,24 +139,11 @@ async def get_evaluations(
                     (Evaluation.ai_similarity > 0.8) | 
                     (Evaluation.intra_group_similarity > 0.8)
                 )
-            
-            # Count query for students
-            count_query = select(func.count(Evaluation.id)).select_from(Evaluation).join(Evaluation.submission).where(Submission.student_id == current_user.id)
-            if task_id:
-                count_query = count_query.where(Submission.task_id == task_id)
-            if min_score is not None:
-                count_query = count_query.where(Evaluation.final_score >= min_score)
-            if max_score is not None:
-                count_query = count_query.where(Evaluation.final_score <= max_score)
-            if suspicious_only:
-                count_query = count_query.where(
-                    (Evaluation.ai_similarity > 0.8) | 
-                    (Evaluation.intra_group_similarity > 0.8)
-                )
                 
         elif current_user.role.value == "teacher":
             # Teachers can only view evaluations for tasks in their lessons
             query = select(Evaluation).options(
+                *EVALUATION_RATIONALE,
                 selectinload(Evaluation.submission).selectinload(Submission.task),
                 selectinload(Evaluation.submission).selectinload(Submission.student)
             ).join(Evaluation.submission).join(Submission.task).join(Task.lesson).where(Lesson.teacher_id == current_user.id)
@@ -166,24 +166,11 @@ async def get_evaluations(
                     (Evaluation.ai_similarity > 0.8) | 
                     (Evaluation.intra_group_similarity > 0.8)
                 )
-            
-            # Count query for teachers
-            count_query = select(func.count(Evaluation.id)).select_from(Evaluation).join(Evaluation.submission).join(Submission.task).join(Task.lesson).where(Lesson.teacher_id == current_user.id)
-            if task_id:
-                count_query = count_query.where(Submission.task_id == task_id)
-            if min_score is not None:
-                count_query = count_query.where(Evaluation.final_score >= min_score)
-            if max_score is not None:
-                count_query = count_query.where(Evaluation.final_score <= max_score)
-            if suspicious_only:
-                count_query = count_query.where(
-                    (Evaluation.ai_similarity > 0.8) | 
-                    (Evaluation.intra_group_similarity > 0.8)
-                )
                 
         else:  # admin
             # Admins can view all evaluations
             query = select(Evaluation).options(
+                *EVALUATION_RATIONALE,
                 selectinload(Evaluation.submission).selectinload(Submission.task),
                 selectinload(Evaluation.submission).selectinload(Submission.student)
             )
@@ -199,41 +186,23 @@ async def get_evaluations(
                     (Evaluation.ai_similarity > 0.8) | 
                     (Evaluation.intra_group_similarity > 0.8)
                 )
-            
-            # Count query for admins
-            count_query = select(func.count(Evaluation.id))
-            if task_id:
-                count_query = count_query.select_from(Evaluation).join(Evaluation.submission).where(Submission.task_id == task_id)
-            if min_score is not None:
-                count_query = count_query.where(Evaluation.final_score >= min_score)
-            if max_score is not None:
-                count_query = count_query.where(Evaluation.final_score <= max_score)
-            if suspicious_only:
-                count_query = count_query.where(
-                    (Evaluation.ai_similarity > 0.8) | 
-                    (Evaluation.intra_group_similarity > 0.8)
-                )
-        
-        total_result = await db.execute(count_query)
-        total = total_result.scalar()
-        
-        # Get paginated results
-        offset = (page - 1) * size
-        query = query.offset(offset).limit(size).order_by(Evaluation.created_at.desc())
         
-        result = await db.execute(query)
-        evaluations = result.scalars().all()
+        # Get the page after the cursor; the total counts the same filtered query
+        result = await paginate(db, query, Evaluation, size, cursor=cursor, page=page, include_total=include_total)
         
         return {
             "data": EvaluationList(
-                evaluations=[EvaluationRead.model_validate(evaluation) for evaluation in evaluations],
-                total=total,
+                evaluations=[EvaluationRead.model_validate(evaluation) for evaluation in result.items],
+                total=result.total,
                 page=page,
-                size=size
+                size=size,
+                next_cursor=result.next_cursor
             ),
             "status": "success"
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -255,10 +224,11 @@ async def get_evaluation(
     - **include_submission**: Whether to include submission details in the response
     """
     try:
-        query = select(Evaluation)
+        query = select(Evaluation).options(*EVALUATION_RATIONALE)
         
         if include_submission:
             query = query.options(
+                selectinload(Evaluation.submission).options(*SUBMISSION_CODE),
                 selectinload(Evaluation.submission).selectinload(Submission.task).selectinload(Task.lesson),
                 selectinload(Evaluation.submission).selectinload(Submission.student)
             )
@@ -346,7 +316,7 @@ async def update_evaluation(
             setattr(evaluation, field, value)
         
         await db.commit()
-        await db.refresh(evaluation)
+        await refresh_columns(db, evaluation)
         
         return {
             "data": EvaluationRead.model_validate(evaluation),
@@ -363,6 +333,70 @@ async def update_evaluation(
         )
 
 
+@router.post("/{evaluation_id}/rationale", response_model=dict)
+async def generate_evaluation_rationale(
+    evaluation_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_roles(["admin", "teacher"]))
+):
+    """
+    Ask the AI to explain an evaluation's score and store it as the rationale.
+    
+    Used with rubric grading, where scores are computed locally and the AI
+    is only asked for rationales on demand. The score is not changed.
+    
+    - **evaluation_id**: Evaluation ID
+    """
+    try:
+        result = await db.execute(
+            select(Evaluation).options(
+                selectinload(Evaluation.submission).selectinload(Submission.task).options(*TASK_LIST, *TASK_WITH_LESSON)
+            ).where(Evaluation.id == evaluation_id)
+        )
+        evaluation = result.scalar_one_or_none()
+        
+        if not evaluation:
+            raise HTTPException(
+                status_code=404,
+                detail="Evaluation not found"
+            )
+        
+        task = evaluation.submission.task
+        if current_user.role == "teacher" and task.lesson.teacher_id != current_user.id:
+            raise HTTPException(
+                status_code=403,
+                detail="Access denied: You can only explain evaluations for your own tasks"
+            )
+        
+        evaluation.rationale = await ai_service.request_grade_rationale(
+            {
+                "task_title": task.title,
+                "task_description": task.body,
+                "ai_similarity": evaluation.ai_similarity,
+                "intra_group_similarity": evaluation.intra_group_similarity,
+                "correctness_score": evaluation.correctness_score
+            },
+            evaluation.final_score
+        )
+        
+        await db.commit()
+        await refresh_columns(db, evaluation)
+        
+        return {
+            "data": EvaluationRead.model_validate(evaluation),
+            "status": "success"
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate evaluation rationale: {str(e)}"
+        )
+
+
 @router.delete("/{evaluation_id}", response_model=dict)
 async def delete_evaluation(
     evaluation_id: int,
@@ -417,7 +451,7 @@ async def get_task_evaluation_summary(
     try:
         # Check if task exists and load lesson for role-based access control
         task_result = await db.execute(
-            select(Task).options(selectinload(Task.lesson)).where(Task.id == task_id)
+            select(Task).options(*TASK_WITH_LESSON).where(Task.id == task_id)
         )
         task = task_result.scalar_one_or_none()
         
@@ -443,52 +477,186 @@ async def get_task_evaluation_summary(
                 )
         # Admins can view any task summary (no additional check needed)
         
-        # Get evaluation statistics
-        evaluations_query = select(Evaluation).join(Evaluation.submission).where(Submission.task_id == task_id)
-        evaluations_result = await db.execute(evaluations_query)
-        evaluations = evaluations_result.scalars().all()
+        # Read the task's stats rollup (kept current on every evaluation change)
+        stats = await task_evaluation_aggregates(db, task_id)
         
-        if not evaluations:
-            return {
-                "data": TaskEvaluationSummary(
-                    task_id=task_id,
-                    total_evaluations=0,
-                    average_score=0.0,
-                    average_ai_similarity=0.0,
-                    average_group_similarity=0.0,
-                    suspicious_count=0,
-                    grade_distribution={}
-                ),
-                "status": "success"
-            }
+        return {
+            "data": TaskEvaluationSummary(
+                task_id=task_id,
+                total_evaluations=stats.total_evaluations,
+                average_score=round(stats.average_score, 2),
+                average_ai_similarity=round(stats.average_ai_similarity, 3),
+                average_group_similarity=round(stats.average_group_similarity, 3),
+                suspicious_count=stats.suspicious_count,
+                grade_distribution=stats.grade_distribution
+            ),
+            "status": "success"
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch evaluation summary: {str(e)}"
+        )
+
+
+async def _get_reviewable_task(db: AsyncSession, task_id: int, current_user: User) -> Task:
+    """Load a task and check the current user may review its similarity data."""
+    task_result = await db.execute(
+        select(Task).options(*TASK_WITH_LESSON).where(Task.id == task_id)
+    )
+    task = task_result.scalar_one_or_none()
+    
+    if not task:
+        raise HTTPException(
+            status_code=404,
+            detail="Task not found"
+        )
+    
+    if current_user.role == "student":
+        raise HTTPException(
+            status_code=403,
+            detail="Access denied: Students cannot view submission similarities"
+        )
+    elif current_user.role == "teacher":
+        if task.lesson.teacher_id != current_user.id:
+            raise HTTPException(
+                status_code=403,
+                detail="Access denied: You can only view similarities for your own tasks"
+            )
+    
+    return task
+
+
+def _similar_pairs_query(task_id: int, method: str):
+    """Stored pairs of a task joined with the authors of both submissions."""
+    submission_a = aliased(Submission)
+    submission_b = aliased(Submission)
+    
+    return (
+        select(
+            SubmissionSimilarity,
+            submission_a.student_id.label("student_a_id"),
+            submission_b.student_id.label("student_b_id")
+        )
+        .join(submission_a, submission_a.id == SubmissionSimilarity.submission_a_id)
+        .join(submission_b, submission_b.id == SubmissionSimilarity.submission_b_id)
+        .where(SubmissionSimilarity.task_id == task_id, SubmissionSimilarity.method == method)
+    )
+
+
+def _similar_pair_read(row) -> SubmissionSimilarityRead:
+    """Build the response schema from a (pair, student_a_id, student_b_id) row."""
+    pair, student_a_id, student_b_id = row
+    return SubmissionSimilarityRead(
+        submission_a_id=pair.submission_a_id,
+        submission_b_id=pair.submission_b_id,
+        student_a_id=student_a_id,
+        student_b_id=student_b_id,
+        similarity=pair.similarity,
+        identical=pair.identical,
+        method=pair.method,
+        content_hash_a=pair.content_hash_a,
+        content_hash_b=pair.content_hash_b,
+        computed_at=pair.computed_at
+    )
+
+
+@router.get("/task/{task_id}/similar-pairs/top", response_model=dict)
+async def get_top_similar_pairs(
+    task_id: int,
+    k: int = Query(20, ge=1, le=500, description="Number of pairs to return"),
+    method: str = Query("hybrid", description="Similarity method"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get the K most similar submission pairs of a task.
+    
+    - **task_id**: Task ID
+    - **k**: Number of pairs to return
+    - **method**: Similarity method the scores were computed with
+    """
+    try:
+        await _get_reviewable_task(db, task_id, current_user)
         
-        # Calculate statistics
-        total_evaluations = len(evaluations)
-        average_score = sum(e.final_score for e in evaluations) / total_evaluations
-        average_ai_similarity = sum(e.ai_similarity for e in evaluations) / total_evaluations
-        average_group_similarity = sum(e.intra_group_similarity for e in evaluations) / total_evaluations
+        # Served by the (task_id, method, similarity) index
+        query = _similar_pairs_query(task_id, method).order_by(
+            SubmissionSimilarity.similarity.desc()
+        ).limit(k)
+        result = await db.execute(query)
+        pairs = [_similar_pair_read(row) for row in result.all()]
         
-        # Count suspicious evaluations (high similarity)
-        suspicious_count = sum(
-            1 for e in evaluations 
-            if e.ai_similarity > 0.8 or e.intra_group_similarity > 0.8
+        return {
+            "data": SubmissionSimilarityList(
+                task_id=task_id,
+                method=method,
+                pairs=pairs,
+                total=len(pairs),
+                page=1,
+                size=k
+            ),
+            "status": "success"
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch similar pairs: {str(e)}"
         )
+
+
+@router.get("/task/{task_id}/similar-pairs", response_model=dict)
+async def get_similar_pairs_above_threshold(
+    task_id: int,
+    min_score: float = Query(0.8, ge=0.0, le=1.0, description="Minimum similarity score"),
+    method: str = Query("hybrid", description="Similarity method"),
+    page: int = Query(1, ge=1, description="Page number"),
+    size: int = Query(50, ge=1, le=500, description="Page size"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get all submission pairs of a task at or above a similarity threshold.
+    
+    - **task_id**: Task ID
+    - **min_score**: Minimum similarity score (0.0-1.0)
+    - **method**: Similarity method the scores were computed with
+    - **page**: Page number (starts from 1)
+    - **size**: Number of pairs per page
+    """
+    try:
+        await _get_reviewable_task(db, task_id, current_user)
+        
+        count_query = select(func.count(SubmissionSimilarity.id)).where(
+            SubmissionSimilarity.task_id == task_id,
+            SubmissionSimilarity.method == method,
+            SubmissionSimilarity.similarity >= min_score
+        )
+        total_result = await db.execute(count_query)
+        total = total_result.scalar()
         
-        # Grade distribution
-        grade_distribution = {}
-        for evaluation in evaluations:
-            grade_letter = evaluation.grade_letter
-            grade_distribution[grade_letter] = grade_distribution.get(grade_letter, 0) + 1
+        offset = (page - 1) * size
+        query = _similar_pairs_query(task_id, method).where(
+            SubmissionSimilarity.similarity >= min_score
+        ).order_by(
+            SubmissionSimilarity.similarity.desc(), SubmissionSimilarity.id
+        ).offset(offset).limit(size)
+        result = await db.execute(query)
+        pairs = [_similar_pair_read(row) for row in result.all()]
         
         return {
-            "data": TaskEvaluationSummary(
+            "data": SubmissionSimilarityList(
                 task_id=task_id,
-                total_evaluations=total_evaluations,
-                average_score=round(average_score, 2),
-                average_ai_similarity=round(average_ai_similarity, 3),
-                average_group_similarity=round(average_group_similarity, 3),
-                suspicious_count=suspicious_count,
-                grade_distribution=grade_distribution
+                method=method,
+                pairs=pairs,
+                total=total,
+                page=page,
+                size=size
             ),
             "status": "success"
         }
@@ -498,7 +666,61 @@ async def get_task_evaluation_summary(
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to fetch evaluation summary: {str(e)}"
+            detail=f"Failed to fetch similar pairs: {str(e)}"
+        )
+
+
+@router.get("/task/{task_id}/duplicate-clusters", response_model=dict)
+async def get_duplicate_clusters(
+    task_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get groups of submissions of a task with identical code.
+    
+    Code is compared after normalizing line endings and trailing whitespace,
+    using the program hashes stored with the submissions' fingerprints.
+    Submissions not fingerprinted yet count as distinct programs.
+    
+    - **task_id**: Task ID
+    """
+    try:
+        await _get_reviewable_task(db, task_id, current_user)
+        
+        result = await db.execute(
+            select(Submission.id, Submission.student_id, CodeFingerprint.program_hash).outerjoin(
+                CodeFingerprint, CodeFingerprint.submission_id == Submission.id
+            ).where(Submission.task_id == task_id).order_by(Submission.id)
+        )
+        rows = result.all()
+        students = {row.id: row.student_id for row in rows}
+        clusters = SubmissionClusters.from_hashes({row.id: row.program_hash for row in rows if row.program_hash})
+        unhashed = sum(1 for row in rows if not row.program_hash)
+        
+        return {
+            "data": DuplicateClusterList(
+                task_id=task_id,
+                total_submissions=len(rows),
+                distinct_programs=len(clusters) + unhashed,
+                clusters=[
+                    DuplicateCluster(
+                        program_hash=clusters.hash_by_submission[members[0]],
+                        submission_ids=members,
+                        student_ids=[students[submission_id] for submission_id in members]
+                    )
+                    for members in clusters.duplicate_clusters
+                ]
+            ),
+            "status": "success"
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to fetch duplicate clusters: {str(e)}"
         )
 
 
@@ -511,46 +733,19 @@ async def get_global_evaluation_stats(
     Get global evaluation statistics across all tasks.
     """
     try:
-        # Get all evaluations
-        evaluations_result = await db.execute(select(Evaluation))
-        evaluations = evaluations_result.scalars().all()
-        
-        if not evaluations:
-            return {
-                "data": EvaluationStats(
-                    total_evaluations=0,
-                    average_score=0.0,
-                    average_ai_similarity=0.0,
-                    average_group_similarity=0.0,
-                    high_ai_similarity_count=0,
-                    high_group_similarity_count=0,
-                    suspicious_evaluations=0
-                ),
-                "status": "success"
-            }
-        
-        # Calculate global statistics
-        total_evaluations = len(evaluations)
-        average_score = sum(e.final_score for e in evaluations) / total_evaluations
-        average_ai_similarity = sum(e.ai_similarity for e in evaluations) / total_evaluations
-        average_group_similarity = sum(e.intra_group_similarity for e in evaluations) / total_evaluations
-        
-        high_ai_similarity_count = sum(1 for e in evaluations if e.ai_similarity > 0.8)
-        high_group_similarity_count = sum(1 for e in evaluations if e.intra_group_similarity > 0.8)
-        suspicious_evaluations = sum(
-            1 for e in evaluations 
-            if e.ai_similarity > 0.8 or e.intra_group_similarity > 0.8
-        )
+        # Read the global stats rollup (kept current on every evaluation change)
+        stats = await global_evaluation_aggregates(db)
         
         return {
             "data": EvaluationStats(
-                total_evaluations=total_evaluations,
-                average_score=round(average_score, 2),
-                average_ai_similarity=round(average_ai_similarity, 3),
-                average_group_similarity=round(average_group_similarity, 3),
-                high_ai_similarity_count=high_ai_similarity_count,
-                high_group_similarity_count=high_group_similarity_count,
-                suspicious_evaluations=suspicious_evaluations
+                total_evaluations=stats.total_evaluations,
+                average_score=round(stats.average_score, 2),
+                average_ai_similarity=round(stats.average_ai_similarity, 3),
+                average_group_similarity=round(stats.average_group_similarity, 3),
+                high_ai_similarity_count=stats.high_ai_similarity_count,
+                high_group_similarity_count=stats.high_group_similarity_count,
+                suspicious_evaluations=stats.suspicious_count,
+                grade_distribution=stats.grade_distribution
             ),
             "status": "success"
         }
@@ -5,17 +5,18 @@ FastAPI routes for Group CRUD operations.
 Handles student group management for organizing classes.
 """
 
-from typing import List
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
 
 from app.core.database import get_db
 from app.core.auth import admin_required
 from app.models.group import Group
 from app.models.user import User
+from app.models.loading import GROUP_WITH_USERS
 from app.schemas.group import GroupCreate, GroupRead, GroupUpdate, GroupList, GroupWithUsers
+from app.utils.pagination import paginate
 
 router = APIRouter()
 
@@ -67,6 +68,8 @@ async def create_group(
 async def get_groups(
     page: int = Query(1, ge=1, description="Page number"),
     size: int = Query(10, ge=1, le=100, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page (overrides page)"),
+    include_total: bool = Query(True, description="Include the (cached) total count"),
     db: AsyncSession = Depends(get_db),
     current_admin: str = Depends(admin_required)
 ):
@@ -77,16 +80,8 @@ async def get_groups(
     - **size**: Number of groups per page
     """
     try:
-        # Get total count
-        count_result = await db.execute(select(func.count(Group.id)))
-        total = count_result.scalar()
-        
-        # Get paginated results
-        offset = (page - 1) * size
-        query = select(Group).offset(offset).limit(size).order_by(Group.created_at.desc())
-        
-        result = await db.execute(query)
-        groups = result.scalars().all()
+        # Get the page after the cursor
+        result = await paginate(db, select(Group), Group, size, cursor=cursor, page=page, include_total=include_total)
         
         return {
             "data": GroupList(
@@ -97,15 +92,18 @@ async def get_groups(
                         created_at=group.created_at,
                         updated_at=group.updated_at,
                         student_count=0  # Temporary fix
-                    ) for group in groups
+                    ) for group in result.items
                 ],
-                total=total,
+                total=result.total,
                 page=page,
-                size=size
+                size=size,
+                next_cursor=result.next_cursor
             ),
             "status": "success"
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -128,7 +126,7 @@ async def get_group(
     """
     try:
         if include_users:
-            query = select(Group).options(selectinload(Group.users)).where(Group.id == group_id)
+            query = select(Group).options(*GROUP_WITH_USERS).where(Group.id == group_id)
         else:
             query = select(Group).where(Group.id == group_id)
         
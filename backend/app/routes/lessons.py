@@ -9,13 +9,13 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
 
 from app.core.database import get_db
 from app.core.auth import get_current_user, teacher_required, admin_required, require_roles
 from app.models.lesson import Lesson
 from app.models.task import Task
 from app.models.user import User
+from app.models.loading import LESSON_LIST, LESSON_WITH_TASKS, LESSON_WITH_RELATIONS
 from app.schemas.lesson import LessonCreate, LessonRead, LessonUpdate, LessonList, LessonWithTasks, LessonWithRelations
 
 router = APIRouter(prefix="/api/lessons", tags=["lessons"])
@@ -87,10 +87,7 @@ async def get_lessons(
     """
     try:
         # Build base query
-        query = select(Lesson).options(
-            selectinload(Lesson.subject),
-            selectinload(Lesson.teacher)
-        )
+        query = select(Lesson).options(*LESSON_LIST)
         
         # Apply role-based filtering
         if current_user.role == "teacher":
@@ -159,23 +156,15 @@ async def get_lesson(
     Admins can access any lesson.
     """
     try:
-        query = select(Lesson)
-        
         if include_tasks and include_relations:
-            query = query.options(
-                selectinload(Lesson.tasks),
-                selectinload(Lesson.subject),
-                selectinload(Lesson.teacher)
-            )
+            profile = LESSON_WITH_RELATIONS
         elif include_tasks:
-            query = query.options(selectinload(Lesson.tasks))
-        elif include_relations:
-            query = query.options(
-                selectinload(Lesson.subject),
-                selectinload(Lesson.teacher)
-            )
+            profile = LESSON_WITH_TASKS
+        else:
+            # LessonRead serializes no relations
+            profile = LESSON_LIST
         
-        query = query.where(Lesson.id == lesson_id)
+        query = select(Lesson).options(*profile).where(Lesson.id == lesson_id)
         result = await db.execute(query)
         lesson = result.scalar_one_or_none()
         
@@ -22,7 +22,7 @@ class CompareRequest(BaseModel):
     """Request model for code comparison."""
     code1: str = Field(..., description="First code snippet to compare")
     code2: str = Field(..., description="Second code snippet to compare")
-    method: str = Field(default="hybrid", description="Similarity method: token, semantic, structural, or hybrid")
+    method: str = Field(default="hybrid", description="Similarity method: token, semantic, structural, winnow, or hybrid")
 
 
 class CompareResponse(BaseModel):
@@ -56,7 +56,7 @@ async def compare_code(request: CompareRequest) -> CompareResponse:
         logger.info(f"Comparing code snippets using method: {request.method}")
         
         # Validate method
-        valid_methods = ["token", "semantic", "structural", "hybrid"]
+        valid_methods = ["token", "semantic", "structural", "winnow", "hybrid"]
         if request.method not in valid_methods:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
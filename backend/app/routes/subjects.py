@@ -9,11 +9,11 @@ from typing import List
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
 
 from app.core.database import get_db
 from app.models.subject import Subject
 from app.models.lesson import Lesson
+from app.models.loading import SUBJECT_WITH_LESSONS
 from app.schemas.subject import SubjectCreate, SubjectRead, SubjectUpdate, SubjectList, SubjectWithLessons
 
 router = APIRouter(tags=["subjects"])
@@ -125,7 +125,7 @@ async def get_subject(
     """
     try:
         if include_lessons:
-            query = select(Subject).options(selectinload(Subject.lessons)).where(Subject.id == subject_id)
+            query = select(Subject).options(*SUBJECT_WITH_LESSONS).where(Subject.id == subject_id)
         else:
             query = select(Subject).where(Subject.id == subject_id)
         
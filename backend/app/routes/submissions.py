@@ -18,11 +18,14 @@ from app.models.submission import Submission
 from app.models.task import Task
 from app.models.lesson import Lesson
 from app.models.user import User
+from app.models.loading import SUBMISSION_CODE, EVALUATION_RATIONALE, TASK_LIST, refresh_columns
 from app.schemas.submission import (
     SubmissionCreate, SubmissionRead, SubmissionUpdate, SubmissionList,
     SubmissionWithEvaluation, SubmissionWithRelations, SubmissionStats
 )
-from app.tasks.ai_tasks import calc_ai_similarity_task
+from app.services.fingerprints import save_fingerprint
+from app.tasks.ai_tasks import update_submission_similarity_task
+from app.utils.pagination import paginate
 
 router = APIRouter(prefix="/api/submissions", tags=["submissions"])
 
@@ -79,10 +82,14 @@ async def create_submission(
         # Create new submission
         submission = Submission(**submission_dict)
         db.add(submission)
+        await db.flush()
+        
+        # Store similarity fingerprint together with the code
+        await save_fingerprint(db, submission.code, task.language.value, submission_id=submission.id)
         await db.commit()
-        await db.refresh(submission)
-        # Trigger AI similarity calculation task
-        calc_ai_similarity_task.delay(submission.id)
+        await refresh_columns(db, submission)
+        # Compare the new submission with its peers and AI solutions
+        update_submission_similarity_task.delay(submission.id)
         
         return {
             "data": SubmissionRead.model_validate(submission),
@@ -106,6 +113,8 @@ async def get_submissions(
     task_id: Optional[int] = Query(None, description="Filter by task"),
     student_id: Optional[int] = Query(None, description="Filter by student"),
     has_evaluation: Optional[bool] = Query(None, description="Filter by evaluation status"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page (overrides page)"),
+    include_total: bool = Query(True, description="Include the (cached) total count"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -119,6 +128,7 @@ async def get_submissions(
     try:
         # Build base query
         query = select(Submission).options(
+            *SUBMISSION_CODE,
             selectinload(Submission.task),
             selectinload(Submission.student)
         )
@@ -156,40 +166,22 @@ async def get_submissions(
             else:
                 query = query.where(~Submission.evaluation.has())
         
-        # Get total count with same filters
-        count_query = select(func.count(Submission.id))
-        
-        # Apply same role-based filtering to count
-        if current_user.role == "student":
-            count_query = count_query.where(Submission.student_id == current_user.id)
-        elif current_user.role == "teacher":
-            count_query = count_query.select_from(Submission).join(Task).join(Lesson).where(Lesson.teacher_id == current_user.id)
-        
-        if task_id:
-            count_query = count_query.where(Submission.task_id == task_id)
-        if student_id and current_user.role != "student":
-            count_query = count_query.where(Submission.student_id == student_id)
-        
-        total_result = await db.execute(count_query)
-        total = total_result.scalar()
-        
-        # Get paginated results
-        offset = (page - 1) * size
-        query = query.offset(offset).limit(size).order_by(Submission.created_at.desc())
-        
-        result = await db.execute(query)
-        submissions = result.scalars().all()
+        # Get the page after the cursor; the total counts the same filtered query
+        result = await paginate(db, query, Submission, size, cursor=cursor, page=page, include_total=include_total)
         
         return {
             "data": SubmissionList(
-                submissions=[SubmissionRead.model_validate(submission) for submission in submissions],
-                total=total,
+                submissions=[SubmissionRead.model_validate(submission) for submission in result.items],
+                total=result.total,
                 page=page,
-                size=size
+                size=size,
+                next_cursor=result.next_cursor
             ),
             "status": "success"
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -213,19 +205,19 @@ async def get_submission(
     Admins can view any submission.
     """
     try:
-        query = select(Submission)
+        query = select(Submission).options(*SUBMISSION_CODE)
         
         if include_evaluation and include_relations:
             query = query.options(
-                selectinload(Submission.evaluation),
-                selectinload(Submission.task),
+                selectinload(Submission.evaluation).options(*EVALUATION_RATIONALE),
+                selectinload(Submission.task).options(*TASK_LIST),
                 selectinload(Submission.student)
             )
         elif include_evaluation:
-            query = query.options(selectinload(Submission.evaluation))
+            query = query.options(selectinload(Submission.evaluation).options(*EVALUATION_RATIONALE))
         elif include_relations:
             query = query.options(
-                selectinload(Submission.task),
+                selectinload(Submission.task).options(*TASK_LIST),
                 selectinload(Submission.student)
             )
         
@@ -318,12 +310,16 @@ async def update_submission(
         for field, value in update_data.items():
             setattr(submission, field, value)
         
+        # Refresh the fingerprint (no-op when the content hash is unchanged)
+        if 'code' in update_data:
+            await save_fingerprint(db, submission.code, submission.task.language.value, submission_id=submission.id)
+        
         await db.commit()
-        await db.refresh(submission)
+        await refresh_columns(db, submission)
         
-        # Trigger AI similarity recalculation if code was updated
-        if 'code' in submission_data.model_dump(exclude_unset=True):
-            calc_ai_similarity_task.delay(submission.id)
+        # Incrementally update similarities if code was updated
+        if 'code' in update_data:
+            update_submission_similarity_task.delay(submission.id)
         
         return {
             "data": SubmissionRead.model_validate(submission),
@@ -10,7 +10,6 @@ from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
 
 from app.core.database import get_db
 from app.core.auth import get_current_user, teacher_required, admin_required, require_roles
@@ -20,8 +19,13 @@ from app.models.submission import Submission
 from app.models.ai_solution import AISolution
 from app.models.evaluation import Evaluation
 from app.models.user import User
+from app.models.loading import (
+    AI_SOLUTION_CODE, TASK_LIST, TASK_WITH_LESSON, TASK_DETAIL, TASK_WITH_SUBMISSIONS, TASK_WITH_RELATIONS,
+    refresh_columns
+)
 from app.schemas.task import TaskCreate, TaskRead, TaskUpdate, TaskList, TaskWithSubmissions, TaskWithRelations
 from app.tasks.ai_tasks import generate_ai_solutions_task, grade_task
+from app.utils.pagination import paginate
 
 router = APIRouter(prefix="/api/tasks", tags=["tasks"])
 
@@ -58,7 +62,7 @@ async def create_task(
         task = Task(**task_data.model_dump())
         db.add(task)
         await db.commit()
-        await db.refresh(task)
+        await refresh_columns(db, task)
 
         # FIXED: Manually construct TaskRead without removed fields (submission_count, has_ai_solutions)
         # Safe properties (is_expired, is_active, time_remaining) are computed from task model
@@ -70,6 +74,7 @@ async def create_task(
                 language=task.language,
                 lesson_id=task.lesson_id,
                 deadline_at=task.deadline_at,
+                grading_rubric=task.grading_rubric,
                 created_at=task.created_at,
                 updated_at=task.updated_at,
                 is_expired=task.is_expired,
@@ -94,6 +99,8 @@ async def get_tasks(
     lesson_id: Optional[int] = Query(None, description="Filter by lesson"),
     language: Optional[str] = Query(None, description="Filter by programming language"),
     active_only: bool = Query(False, description="Show only active (non-expired) tasks"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page (overrides page)"),
+    include_total: bool = Query(True, description="Include the (cached) total count"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -106,7 +113,7 @@ async def get_tasks(
     """
     try:
         # Build base query
-        query = select(Task).options(selectinload(Task.lesson))
+        query = select(Task).options(*TASK_LIST)
         
         # Apply role-based filtering
         if current_user.role == "teacher":
@@ -133,35 +140,22 @@ async def get_tasks(
         if active_only:
             query = query.where(Task.deadline_at > datetime.now(timezone.utc))
         
-        # Get total count
-        count_query = select(func.count(Task.id))
-        if lesson_id:
-            count_query = count_query.where(Task.lesson_id == lesson_id)
-        if language:
-            count_query = count_query.where(Task.language == language)
-        if active_only:
-            count_query = count_query.where(Task.deadline_at > datetime.now(timezone.utc))
-        
-        total_result = await db.execute(count_query)
-        total = total_result.scalar()
-        
-        # Get paginated results
-        offset = (page - 1) * size
-        query = query.offset(offset).limit(size).order_by(Task.created_at.desc())
-        
-        result = await db.execute(query)
-        tasks = result.scalars().all()
+        # Get the page after the cursor; the total counts the same filtered query
+        result = await paginate(db, query, Task, size, cursor=cursor, page=page, include_total=include_total)
         
         return {
             "data": TaskList(
-                tasks=[TaskRead.model_validate(task) for task in tasks],
-                total=total,
+                tasks=[TaskRead.model_validate(task) for task in result.items],
+                total=result.total,
                 page=page,
-                size=size
+                size=size,
+                next_cursor=result.next_cursor
             ),
             "status": "success"
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -188,14 +182,14 @@ async def get_task(
     """
     try:
         # Always include lesson with materials
-        query = select(Task).options(
-            selectinload(Task.lesson).selectinload(Lesson.materials)
-        )
-
-        if include_submissions:
-            query = query.options(selectinload(Task.submissions))
+        if include_submissions and include_relations:
+            profile = TASK_WITH_RELATIONS
+        elif include_submissions:
+            profile = TASK_WITH_SUBMISSIONS
+        else:
+            profile = TASK_DETAIL
 
-        query = query.where(Task.id == task_id)
+        query = select(Task).options(*profile).where(Task.id == task_id)
         result = await db.execute(query)
         task = result.scalar_one_or_none()
 
@@ -257,7 +251,7 @@ async def update_task(
     try:
         # Get existing task with lesson information
         result = await db.execute(
-            select(Task).join(Lesson).where(Task.id == task_id)
+            select(Task).options(*TASK_WITH_LESSON).where(Task.id == task_id)
         )
         task = result.scalar_one_or_none()
         
@@ -293,7 +287,7 @@ async def update_task(
             setattr(task, field, value)
         
         await db.commit()
-        await db.refresh(task)
+        await refresh_columns(db, task)
         
         return {
             "data": TaskRead.model_validate(task),
@@ -325,7 +319,7 @@ async def delete_task(
     try:
         # Get existing task with lesson information
         result = await db.execute(
-            select(Task).join(Lesson).where(Task.id == task_id)
+            select(Task).options(*TASK_WITH_LESSON).where(Task.id == task_id)
         )
         task = result.scalar_one_or_none()
         
@@ -401,7 +395,7 @@ async def get_task_ai_solutions(
     try:
         # Check if task exists and verify permissions
         task_result = await db.execute(
-            select(Task).join(Lesson).where(Task.id == task_id)
+            select(Task).options(*TASK_WITH_LESSON).where(Task.id == task_id)
         )
         task = task_result.scalar_one_or_none()
         
@@ -420,7 +414,7 @@ async def get_task_ai_solutions(
         
         # Get AI solutions
         ai_solutions_result = await db.execute(
-            select(AISolution).where(AISolution.task_id == task_id).order_by(AISolution.variant_index)
+            select(AISolution).options(*AI_SOLUTION_CODE).where(AISolution.task_id == task_id).order_by(AISolution.variant_index)
         )
         ai_solutions = ai_solutions_result.scalars().all()
         
@@ -471,7 +465,7 @@ async def prepare_ai_solutions(
     try:
         # Check if task exists and verify permissions
         task_result = await db.execute(
-            select(Task).join(Lesson).where(Task.id == task_id)
+            select(Task).options(*TASK_WITH_LESSON).where(Task.id == task_id)
         )
         task = task_result.scalar_one_or_none()
         
@@ -547,7 +541,7 @@ async def grade_task_submissions(
     try:
         # Check if task exists and verify permissions
         task_result = await db.execute(
-            select(Task).join(Lesson).where(Task.id == task_id)
+            select(Task).options(*TASK_WITH_LESSON).where(Task.id == task_id)
         )
         task = task_result.scalar_one_or_none()
         
@@ -8,14 +8,15 @@ Handles user management for admins, teachers, and students.
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select
 
 from app.core.database import get_db
 from app.core.auth import admin_required, get_password_hash
 from app.models.user import User
+from app.models.loading import USER_READ
 from app.schemas.user import UserCreate, UserRead, UserUpdate, UserList
 from app.schemas.group import GroupRead
+from app.utils.pagination import paginate
 
 router = APIRouter(tags=["users"])
 
@@ -74,6 +75,8 @@ async def get_users(
     size: int = Query(10, ge=1, le=100, description="Page size"),
     role: Optional[str] = Query(None, description="Filter by role"),
     group_id: Optional[int] = Query(None, description="Filter by group"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page (overrides page)"),
+    include_total: bool = Query(True, description="Include the (cached) total count"),
     db: AsyncSession = Depends(get_db),
     current_admin: str = Depends(admin_required)
 ):
@@ -87,40 +90,29 @@ async def get_users(
     """
     try:
         # Build query with filters
-        query = select(User).options(selectinload(User.group))
+        query = select(User).options(*USER_READ)
         
         if role:
             query = query.where(User.role == role)
         if group_id:
             query = query.where(User.group_id == group_id)
         
-        # Get total count
-        count_query = select(func.count(User.id))
-        if role:
-            count_query = count_query.where(User.role == role)
-        if group_id:
-            count_query = count_query.where(User.group_id == group_id)
-        
-        total_result = await db.execute(count_query)
-        total = total_result.scalar()
-        
-        # Get paginated results
-        offset = (page - 1) * size
-        query = query.offset(offset).limit(size).order_by(User.created_at.desc())
-        
-        result = await db.execute(query)
-        users = result.scalars().all()
+        # Get the page after the cursor; the total counts the same filtered query
+        result = await paginate(db, query, User, size, cursor=cursor, page=page, include_total=include_total)
         
         return {
             "data": UserList(
-                users=[UserRead.model_validate(user) for user in users],
-                total=total,
+                users=[UserRead.model_validate(user) for user in result.items],
+                total=result.total,
                 page=page,
-                size=size
+                size=size,
+                next_cursor=result.next_cursor
             ),
             "status": "success"
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -140,7 +132,7 @@ async def get_user(
     - **user_id**: User ID
     """
     try:
-        query = select(User).options(selectinload(User.group)).where(User.id == user_id)
+        query = select(User).options(*USER_READ).where(User.id == user_id)
         result = await db.execute(query)
         user = result.scalar_one_or_none()
         
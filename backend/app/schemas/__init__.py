@@ -10,10 +10,13 @@ from app.schemas.group import GroupBase, GroupCreate, GroupRead
 from app.schemas.subject import SubjectBase, SubjectCreate, SubjectRead
 from app.schemas.lesson import LessonBase, LessonCreate, LessonRead
 from app.schemas.lesson_material import LessonMaterialBase, LessonMaterialCreate, LessonMaterialRead, MaterialType
-from app.schemas.task import TaskBase, TaskCreate, TaskRead
+from app.schemas.task import TaskBase, TaskCreate, TaskRead, GradingRubric
 from app.schemas.submission import SubmissionBase, SubmissionCreate, SubmissionRead
 from app.schemas.evaluation import EvaluationBase, EvaluationCreate, EvaluationRead
 from app.schemas.ai_solution import AISolutionBase, AISolutionCreate, AISolutionRead
+from app.schemas.submission_similarity import (
+    SubmissionSimilarityRead, SubmissionSimilarityList, DuplicateCluster, DuplicateClusterList
+)
 
 __all__ = [
     # User schemas
@@ -27,11 +30,13 @@ __all__ = [
     # Lesson Material schemas
     "LessonMaterialBase", "LessonMaterialCreate", "LessonMaterialRead", "MaterialType",
     # Task schemas
-    "TaskBase", "TaskCreate", "TaskRead",
+    "TaskBase", "TaskCreate", "TaskRead", "GradingRubric",
     # Submission schemas
     "SubmissionBase", "SubmissionCreate", "SubmissionRead",
     # Evaluation schemas
     "EvaluationBase", "EvaluationCreate", "EvaluationRead",
     # AISolution schemas
-    "AISolutionBase", "AISolutionCreate", "AISolutionRead"
+    "AISolutionBase", "AISolutionCreate", "AISolutionRead",
+    # Submission similarity schemas
+    "SubmissionSimilarityRead", "SubmissionSimilarityList", "DuplicateCluster", "DuplicateClusterList"
 ]
\ No newline at end of file
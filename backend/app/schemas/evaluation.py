@@ -12,7 +12,7 @@ from pydantic import BaseModel, Field
 class EvaluationBase(BaseModel):
     """Base Evaluation schema with common fields."""
     submission_id: int = Field(..., description="Submission ID")
-    ai_similarity: float = Field(..., ge=0.0, le=1.0, description="AI similarity score (0.0-1.0)")
+    ai_similarity: float = Field(..., ge=0.0, le=1.0, description="Highest hybrid similarity to any AI solution (0.0-1.0)")
     intra_group_similarity: float = Field(..., ge=0.0, le=1.0, description="Group similarity score (0.0-1.0)")
     final_score: int = Field(..., ge=1, le=100, description="Final grade (1-100)")
     rationale: str = Field(..., min_length=1, description="AI-generated grading rationale")
@@ -26,6 +26,8 @@ class EvaluationCreate(EvaluationBase):
 class EvaluationRead(EvaluationBase):
     """Schema for reading evaluation data."""
     id: int = Field(..., description="Evaluation ID")
+    ai_embedding_similarity: Optional[float] = Field(None, description="Highest embedding similarity to any AI solution (0.0-1.0)")
+    correctness_score: Optional[float] = Field(None, description="Test correctness score the grade was based on (0-100)")
     created_at: datetime = Field(..., description="Creation timestamp")
     updated_at: datetime = Field(..., description="Last update timestamp")
     
@@ -51,9 +53,10 @@ class EvaluationUpdate(BaseModel):
 class EvaluationList(BaseModel):
     """Schema for paginated evaluation list response."""
     evaluations: List[EvaluationRead]
-    total: int
+    total: Optional[int] = Field(None, description="Total matching rows (cached; omitted when include_total is false)")
     page: int
     size: int
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page (null on the last page)")
 
 
 class EvaluationWithSubmission(EvaluationRead):
@@ -87,10 +90,9 @@ class EvaluationStats(BaseModel):
 class TaskEvaluationSummary(BaseModel):
     """Schema for task evaluation summary."""
     task_id: int
-    task_title: str
-    total_submissions: int
-    evaluated_submissions: int
-    average_score: Optional[float]
-    highest_score: Optional[int]
-    lowest_score: Optional[int]
-    suspicious_submissions: int
\ No newline at end of file
+    total_evaluations: int
+    average_score: float
+    average_ai_similarity: float
+    average_group_similarity: float
+    suspicious_count: int
+    grade_distribution: dict = Field(default_factory=dict, description="Distribution of letter grades")
\ No newline at end of file
@@ -40,9 +40,10 @@ class GroupUpdate(BaseModel):
 class GroupList(BaseModel):
     """Schema for paginated group list response."""
     groups: List[GroupRead]
-    total: int
+    total: Optional[int] = Field(None, description="Total matching rows (cached; omitted when include_total is false)")
     page: int
     size: int
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page (null on the last page)")
 
 
 class GroupWithUsers(GroupRead):
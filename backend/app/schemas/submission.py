@@ -53,9 +53,10 @@ class SubmissionUpdate(BaseModel):
 class SubmissionList(BaseModel):
     """Schema for paginated submission list response."""
     submissions: List[SubmissionRead]
-    total: int
+    total: Optional[int] = Field(None, description="Total matching rows (cached; omitted when include_total is false)")
     page: int
     size: int
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page (null on the last page)")
 
 
 class SubmissionWithEvaluation(SubmissionRead):
@@ -0,0 +1,51 @@
+"""
+EduCode Backend - Submission Similarity Schemas
+
+Pydantic schemas for stored pairwise submission similarities.
+"""
+
+from datetime import datetime
+from typing import List
+from pydantic import BaseModel, Field
+
+
+class SubmissionSimilarityRead(BaseModel):
+    """Schema for reading a stored submission pair similarity."""
+    submission_a_id: int = Field(..., description="Submission with the lower ID")
+    submission_b_id: int = Field(..., description="Submission with the higher ID")
+    student_a_id: int = Field(..., description="Author of submission A")
+    student_b_id: int = Field(..., description="Author of submission B")
+    similarity: float = Field(..., ge=0.0, le=1.0, description="Similarity score (0.0-1.0)")
+    identical: bool = Field(..., description="Whether both submissions have identical code")
+    method: str = Field(..., description="Similarity method used")
+    content_hash_a: str = Field(..., description="Content hash of submission A when scored")
+    content_hash_b: str = Field(..., description="Content hash of submission B when scored")
+    computed_at: datetime = Field(..., description="When the score was computed")
+
+    class Config:
+        from_attributes = True
+
+
+class SubmissionSimilarityList(BaseModel):
+    """Schema for a list of similar submission pairs of a task."""
+    task_id: int
+    method: str
+    pairs: List[SubmissionSimilarityRead]
+    total: int
+    page: int
+    size: int
+
+
+class DuplicateCluster(BaseModel):
+    """Schema for a group of submissions with identical code."""
+    program_hash: str = Field(..., description="Hash of the normalized program")
+    submission_ids: List[int] = Field(..., description="Submissions in the cluster")
+    student_ids: List[int] = Field(..., description="Authors of the submissions")
+
+
+class DuplicateClusterList(BaseModel):
+    """Schema for the exact-duplicate clusters of a task."""
+    task_id: int
+    total_submissions: int
+    distinct_programs: int
+    clusters: List[DuplicateCluster]
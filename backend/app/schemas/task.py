@@ -4,13 +4,39 @@ EduCode Backend - Task Schemas
 Pydantic schemas for Task model validation and serialization.
 """
 
+import json
 from datetime import datetime
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field, field_serializer, field_validator, model_validator
 
 from app.models.task import ProgrammingLanguage
 
 
+class GradingRubric(BaseModel):
+    """
+    Declarative local grading rubric of a task.
+
+    The score is the test correctness score (blended with full marks by
+    correctness_weight) minus one penalty per similarity, growing linearly
+    from its threshold to its full value at similarity 1.0, clamped to
+    [min_score, max_score].
+    """
+    grader: Optional[Literal["llm", "rubric"]] = Field(None, description="Primary grader (defaults to the GRADING_MODE setting)")
+    correctness_weight: float = Field(1.0, ge=0.0, le=1.0, description="Share of the score determined by test correctness")
+    ai_similarity_threshold: float = Field(0.0, ge=0.0, lt=1.0, description="AI similarity up to which no penalty applies")
+    ai_similarity_penalty: float = Field(30.0, ge=0.0, le=100.0, description="Points deducted at AI similarity 1.0")
+    group_similarity_threshold: float = Field(0.0, ge=0.0, lt=1.0, description="Group similarity up to which no penalty applies")
+    group_similarity_penalty: float = Field(20.0, ge=0.0, le=100.0, description="Points deducted at group similarity 1.0")
+    min_score: int = Field(1, ge=1, le=100, description="Lowest possible score")
+    max_score: int = Field(100, ge=1, le=100, description="Highest possible score")
+
+    @model_validator(mode='after')
+    def check_score_range(self):
+        if self.min_score > self.max_score:
+            raise ValueError("min_score must not exceed max_score")
+        return self
+
+
 class TaskBase(BaseModel):
     """Base Task schema with common fields."""
     title: str = Field(..., min_length=1, max_length=255, description="Task title")
@@ -18,11 +44,22 @@ class TaskBase(BaseModel):
     language: ProgrammingLanguage = Field(..., description="Programming language")
     lesson_id: int = Field(..., description="Lesson ID")
     deadline_at: datetime = Field(..., description="Submission deadline")
+    grading_rubric: Optional[GradingRubric] = Field(None, description="Local grading rubric (defaults apply when omitted)")
+
+    @field_validator('grading_rubric', mode='before')
+    @classmethod
+    def parse_grading_rubric(cls, value):
+        """Accept the JSON string stored on the Task model."""
+        return json.loads(value) if isinstance(value, str) else value
 
 
 class TaskCreate(TaskBase):
     """Schema for creating a new task."""
-    pass
+
+    @field_serializer('grading_rubric')
+    def serialize_grading_rubric(self, rubric: Optional[GradingRubric]) -> Optional[str]:
+        """Dump the rubric as the JSON string stored on the Task model."""
+        return rubric.model_dump_json() if rubric is not None else None
 
 
 class TaskRead(TaskBase):
@@ -55,14 +92,21 @@ class TaskUpdate(BaseModel):
     body: Optional[str] = Field(None, min_length=1)
     language: Optional[ProgrammingLanguage] = Field(None)
     deadline_at: Optional[datetime] = Field(None)
+    grading_rubric: Optional[GradingRubric] = Field(None)
+
+    @field_serializer('grading_rubric')
+    def serialize_grading_rubric(self, rubric: Optional[GradingRubric]) -> Optional[str]:
+        """Dump the rubric as the JSON string stored on the Task model."""
+        return rubric.model_dump_json() if rubric is not None else None
 
 
 class TaskList(BaseModel):
     """Schema for paginated task list response."""
     tasks: List[TaskRead]
-    total: int
+    total: Optional[int] = Field(None, description="Total matching rows (cached; omitted when include_total is false)")
     page: int
     size: int
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page (null on the last page)")
 
 
 class TaskWithSubmissions(TaskRead):
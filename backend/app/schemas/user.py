@@ -51,6 +51,7 @@ class UserUpdate(BaseModel):
 class UserList(BaseModel):
     """Schema for paginated user list response."""
     users: List[UserRead]
-    total: int
+    total: Optional[int] = Field(None, description="Total matching rows (cached; omitted when include_total is false)")
     page: int
-    size: int
\ No newline at end of file
+    size: int
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page (null on the last page)")
\ No newline at end of file
@@ -6,6 +6,7 @@ Integrates with OpenAI (ChatGPT) and Anthropic (Claude) APIs.
 """
 
 import asyncio
+import importlib.util
 import json
 import logging
 from typing import Dict, List, Optional, Any
@@ -18,7 +19,14 @@ from sqlalchemy import select
 from app.core.database import get_db
 from app.models.task import Task
 from app.models.ai_solution import AISolution, AIProvider
+from app.models.loading import TASK_BODY
 from app.core.config import settings
+from app.services.fingerprints import save_fingerprint
+from app.services.llm_cache import (
+    cached_llm_call, get_cached_llm_responses, llm_cache_key
+)
+from app.services.llm_limits import TokenBucket, gather_limited
+from app.services.rubric import rubric_grade
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +51,61 @@ class AIService:
         self.anthropic_api_key = settings.ANTHROPIC_API_KEY
         self.openai_base_url = "https://api.openai.com/v1"
         self.anthropic_base_url = "https://api.anthropic.com/v1"
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._provider_limits: Dict[AIProvider, asyncio.Semaphore] = {}
+    
+    def _create_client(self) -> httpx.AsyncClient:
+        """Create the pooled keep-alive client shared by all AI API calls."""
+        http2 = settings.AI_HTTP_HTTP2 and importlib.util.find_spec("h2") is not None
+        if settings.AI_HTTP_HTTP2 and not http2:
+            logger.warning("[AI] h2 package not installed, using HTTP/1.1 for AI API calls")
+        
+        return httpx.AsyncClient(
+            http2=http2,
+            timeout=httpx.Timeout(settings.AI_HTTP_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=settings.AI_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.AI_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=settings.AI_HTTP_KEEPALIVE_SECONDS
+            )
+        )
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Get the process-wide HTTP client.
+        
+        Connections belong to the event loop that opened them, so a client
+        is (re)created when first used from a different loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = self._create_client()
+            self._client_loop = loop
+            self._provider_limits = {}
+        return self._client
+    
+    def _provider_limit(self, provider: AIProvider) -> asyncio.Semaphore:
+        """Per-provider cap on concurrent solution requests in this process."""
+        self._get_client()
+        if provider not in self._provider_limits:
+            limit = (
+                settings.AI_SOLUTION_OPENAI_CONCURRENCY if provider == AIProvider.OPENAI
+                else settings.AI_SOLUTION_ANTHROPIC_CONCURRENCY
+            )
+            self._provider_limits[provider] = asyncio.Semaphore(max(1, limit))
+        return self._provider_limits[provider]
+    
+    async def startup(self) -> None:
+        """Open the HTTP client pool (FastAPI lifespan / Celery worker init)."""
+        self._get_client()
+        logger.info("[AI] HTTP client pool ready")
+    
+    async def aclose(self) -> None:
+        """Close the HTTP client pool and its connections."""
+        client, self._client, self._client_loop = self._client, None, None
+        if client is not None and not client.is_closed:
+            await client.aclose()
         
     async def generate_ai_solutions(self, task_id: int, db: AsyncSession) -> List[AISolution]:
         """
@@ -74,16 +137,39 @@ class AIService:
             logger.warning(f"[AI] Solutions already exist for task {task_id}")
             return existing_list
         
-        solutions = []
+        # Issue all four requests at once; the per-provider limits in the
+        # API call helpers bound how many run concurrently
+        requests = [
+            (AIProvider.OPENAI, index, prompt)
+            for index, prompt in enumerate(self._openai_prompts(task), 1)
+        ]
+        requests.append((AIProvider.ANTHROPIC, 1, self._anthropic_prompt(task)))
         
         try:
-            # Generate 3 OpenAI solutions in sequence
-            openai_solutions = await self._generate_openai_solutions(task, db)
-            solutions.extend(openai_solutions)
+            responses = await asyncio.gather(
+                *(
+                    self._call_openai_api(prompt) if provider == AIProvider.OPENAI else self._call_anthropic_api(prompt)
+                    for provider, _, prompt in requests
+                ),
+                return_exceptions=True
+            )
+            for (provider, index, _), response in zip(requests, responses):
+                if isinstance(response, Exception):
+                    logger.error(f"[AI] Failed to generate {provider.value} solution {index}: {str(response)}")
+                    raise response
             
-            # Generate 1 Anthropic solution
-            anthropic_solution = await self._generate_anthropic_solution(task, db)
-            solutions.append(anthropic_solution)
+            # Persist all solutions and their fingerprints in one transaction
+            solutions = [
+                self._build_solution(task, provider, index, prompt, response)
+                for (provider, index, prompt), response in zip(requests, responses)
+            ]
+            db.add_all(solutions)
+            await db.flush()
+            for solution in solutions:
+                await save_fingerprint(db, solution.code, task.language.value, ai_solution_id=solution.id)
+            await db.commit()
+            for solution in solutions:
+                await db.refresh(solution)
             
             logger.info(f"[AI] Generated {len(solutions)} reference codes for task {task_id}")
             return solutions
@@ -93,79 +179,40 @@ class AIService:
             await db.rollback()
             raise AIServiceError(f"Solution generation failed: {str(e)}")
     
-    async def _generate_openai_solutions(self, task: Task, db: AsyncSession) -> List[AISolution]:
-        """Generate 3 OpenAI solutions with different approaches."""
-        solutions = []
-        
-        prompts = [
+    def _openai_prompts(self, task: Task) -> List[str]:
+        """Prompts for the 3 OpenAI solutions with different approaches."""
+        return [
             f"Solve this {task.language} programming problem:\n\nTitle: {task.title}\n\nDescription: {task.body}\n\nProvide a clean, working solution with comments.",
             f"Solve this {task.language} programming problem using a different approach:\n\nTitle: {task.title}\n\nDescription: {task.body}\n\nUse a different algorithm or data structure than a typical solution.",
             f"Solve this {task.language} programming problem in yet another distinct way:\n\nTitle: {task.title}\n\nDescription: {task.body}\n\nFocus on code readability and efficiency."
         ]
-        
-        for i, prompt in enumerate(prompts, 1):
-            try:
-                response = await self._call_openai_api(prompt)
-                
-                solution = AISolution(
-                    task_id=task.id,
-                    provider=AIProvider.OPENAI,
-                    variant_index=i,
-                    code=response["code"],
-                    meta=json.dumps({
-                        "model": response.get("model", "gpt-4.1-mini"),
-                        "prompt": prompt,
-                        "tokens": response.get("tokens", 0),
-                        "timestamp": datetime.now(timezone.utc).isoformat()
-                    })
-                )
-                
-                db.add(solution)
-                await db.commit()
-                await db.refresh(solution)
-                solutions.append(solution)
-                
-                logger.info(f"[AI] Generated OpenAI solution {i}/3 for task {task.id}")
-                
-                # Small delay between requests
-                await asyncio.sleep(1)
-                
-            except Exception as e:
-                logger.error(f"[AI] Failed to generate OpenAI solution {i}: {str(e)}")
-                raise
-        
-        return solutions
     
-    async def _generate_anthropic_solution(self, task: Task, db: AsyncSession) -> AISolution:
-        """Generate 1 Anthropic solution."""
-        prompt = f"Solve this {task.language} programming problem:\n\nTitle: {task.title}\n\nDescription: {task.body}\n\nProvide a clean, efficient solution with clear comments explaining the approach."
-        
-        try:
-            response = await self._call_anthropic_api(prompt)
-            
-            solution = AISolution(
-                task_id=task.id,
-                provider=AIProvider.ANTHROPIC,
-                variant_index=1,
-                code=response["code"],
-                meta=json.dumps({
-                    "model": response.get("model", "claude-3-sonnet-20240229"),
-                    "prompt": prompt,
-                    "tokens": response.get("tokens", 0),
-                    "timestamp": datetime.now(timezone.utc).isoformat()
-                })
-            )
-            
-            db.add(solution)
-            await db.commit()
-            await db.refresh(solution)
-            
-            logger.info(f"[AI] Generated Anthropic solution for task {task.id}")
-            return solution
-            
-        except Exception as e:
-            logger.error(f"[AI] Failed to generate Anthropic solution: {str(e)}")
-            raise
+    def _anthropic_prompt(self, task: Task) -> str:
+        """Prompt for the Anthropic solution."""
+        return f"Solve this {task.language} programming problem:\n\nTitle: {task.title}\n\nDescription: {task.body}\n\nProvide a clean, efficient solution with clear comments explaining the approach."
+    
+    def _build_solution(
+        self,
+        task: Task,
+        provider: AIProvider,
+        variant_index: int,
+        prompt: str,
+        response: Dict[str, Any]
+    ) -> AISolution:
+        """Create an (unsaved) AISolution from an API response."""
+        default_model = "gpt-4.1-mini" if provider == AIProvider.OPENAI else "claude-3-sonnet-20240229"
+        return AISolution(
+            task_id=task.id,
+            provider=provider,
+            variant_index=variant_index,
+            code=response["code"],
+            meta=json.dumps({
+                "model": response.get("model", default_model),
+                "prompt": prompt,
+                "tokens": response.get("tokens", 0),
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            })
+        )
     
     async def _call_openai_api(self, prompt: str) -> Dict[str, Any]:
         """Call OpenAI API with retry logic."""
@@ -184,14 +231,16 @@ class AIService:
             "temperature": 0.7
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async def request() -> Dict[str, Any]:
+            client = self._get_client()
             for attempt in range(3):
                 try:
-                    response = await client.post(
-                        f"{self.openai_base_url}/chat/completions",
-                        headers=headers,
-                        json=payload
-                    )
+                    async with self._provider_limit(AIProvider.OPENAI):
+                        response = await client.post(
+                            f"{self.openai_base_url}/chat/completions",
+                            headers=headers,
+                            json=payload
+                        )
                     response.raise_for_status()
                     
                     data = response.json()
@@ -208,6 +257,8 @@ class AIService:
                     if attempt == 2:
                         raise
                     await asyncio.sleep(2 ** attempt)
+        
+        return await cached_llm_call("openai", payload, request)
     
     async def _call_anthropic_api(self, prompt: str) -> Dict[str, Any]:
         """Call Anthropic API with retry logic."""
@@ -225,14 +276,16 @@ class AIService:
             ]
         }
         
-        async with httpx.AsyncClient(timeout=30.0) as client:
+        async def request() -> Dict[str, Any]:
+            client = self._get_client()
             for attempt in range(3):
                 try:
-                    response = await client.post(
-                        f"{self.anthropic_base_url}/messages",
-                        headers=headers,
-                        json=payload
-                    )
+                    async with self._provider_limit(AIProvider.ANTHROPIC):
+                        response = await client.post(
+                            f"{self.anthropic_base_url}/messages",
+                            headers=headers,
+                            json=payload
+                        )
                     response.raise_for_status()
                     
                     data = response.json()
@@ -249,6 +302,8 @@ class AIService:
                     if attempt == 2:
                         raise
                     await asyncio.sleep(2 ** attempt)
+        
+        return await cached_llm_call("anthropic", payload, request)
     
     async def get_ai_reference_codes(self, task_id: int, db: AsyncSession) -> List[str]:
         """
@@ -262,25 +317,12 @@ class AIService:
             List of AI-generated code strings
         """
         solutions = await db.execute(
-            select(AISolution).where(AISolution.task_id == task_id)
+            select(AISolution.code).where(AISolution.task_id == task_id)
         )
-        return [solution.code for solution in solutions.scalars().all()]
+        return list(solutions.scalars().all())
     
-    async def request_final_grade(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        """
-        Request final grade from ChatGPT using structured prompt.
-        
-        Args:
-            context: Grading context with metrics
-            
-        Returns:
-            Dict with score (1-100) and rationale
-            
-        Raises:
-            AIServiceError: If grading request fails
-        """
-        logger.info(f"[AI] Requesting final grade for submission")
-        
+    def _grade_payload(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the ChatGPT grading request for a grading context."""
         prompt = f"""You are a strict but fair programming teacher grading student code originality.
 
 Task: {context.get('task_title', 'Programming Assignment')}
@@ -296,76 +338,316 @@ Grade the submission considering:
 Return JSON response:
 {{"score": <integer 1-100>, "rationale": "<brief explanation>"}}"""
 
-        try:
-            headers = {
-                "Authorization": f"Bearer {self.openai_api_key}",
-                "Content-Type": "application/json"
-            }
+        return {
+            "model": "gpt-4.1-mini",
+            "messages": [
+                {"role": "system", "content": "You are a programming teacher. Always respond with valid JSON only."},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": 200,
+            "temperature": 0.3
+        }
+    
+    async def request_final_grade(self, context: Dict[str, Any], lookup: bool = True) -> Dict[str, Any]:
+        """
+        Request final grade from ChatGPT using structured prompt.
+        
+        Args:
+            context: Grading context with metrics
+            lookup: Check the LLM response cache first
+            
+        Returns:
+            Dict with score (1-100) and rationale; fallback scoring if the
+            request fails or the response cannot be parsed
+        """
+        logger.info(f"[AI] Requesting final grade for submission")
+        
+        payload = self._grade_payload(context)
+        headers = {
+            "Authorization": f"Bearer {self.openai_api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        async def request() -> Dict[str, Any]:
+            response = await self._get_client().post(
+                f"{self.openai_base_url}/chat/completions",
+                headers=headers,
+                json=payload
+            )
+            response.raise_for_status()
             
-            payload = {
-                "model": "gpt-4.1-mini",
-                "messages": [
-                    {"role": "system", "content": "You are a programming teacher. Always respond with valid JSON only."},
-                    {"role": "user", "content": prompt}
-                ],
-                "max_tokens": 200,
-                "temperature": 0.3
-            }
+            data = response.json()
+            content = data["choices"][0]["message"]["content"].strip()
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.openai_base_url}/chat/completions",
-                    headers=headers,
-                    json=payload
-                )
-                response.raise_for_status()
+            # Parse JSON response
+            try:
+                result = json.loads(content)
                 
-                data = response.json()
-                content = data["choices"][0]["message"]["content"].strip()
+                # Validate response format
+                if "score" not in result or "rationale" not in result:
+                    raise ValueError("Invalid response format")
                 
-                # Parse JSON response
-                try:
-                    result = json.loads(content)
-                    
-                    # Validate response format
-                    if "score" not in result or "rationale" not in result:
-                        raise ValueError("Invalid response format")
-                    
-                    # Clamp score to valid range
-                    result["score"] = max(1, min(100, int(result["score"])))
-                    
-                    logger.info(f"[AI] Generated grade: {result['score']}/100")
-                    return result
-                    
-                except (json.JSONDecodeError, ValueError) as e:
-                    logger.error(f"[AI] Failed to parse grading response: {content}")
-                    # Fallback scoring
-                    return self._fallback_grade(context)
-                    
+                # Clamp score to valid range
+                result["score"] = max(1, min(100, int(result["score"])))
+                
+            except (json.JSONDecodeError, ValueError, TypeError):
+                logger.error(f"[AI] Failed to parse grading response: {content}")
+                raise
+            
+            return {"score": result["score"], "rationale": result["rationale"]}
+        
+        try:
+            result = await cached_llm_call("openai", payload, request, lookup=lookup)
+            logger.info(f"[AI] Generated grade: {result['score']}/100")
+            return result
+            
         except Exception as e:
             logger.error(f"[AI] Failed to request final grade: {str(e)}")
             return self._fallback_grade(context)
     
-    def _fallback_grade(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        """Fallback grading logic when AI is unavailable."""
-        correctness = context.get('correctness_score', 100)
-        ai_similarity = context.get('ai_similarity', 0.0)
-        group_similarity = context.get('intra_group_similarity', 0.0)
+    def _batch_grade_payload(self, contexts: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build one ChatGPT request grading several submissions."""
+        items = "\n\n".join(
+            f"""Submission {index}:
+Task: {context.get('task_title', 'Programming Assignment')}
+Correctness score: {context.get('correctness_score', 100)}/100
+AI similarity: {context.get('ai_similarity', 0.0):.3f}
+Group similarity: {context.get('intra_group_similarity', 0.0):.3f}"""
+            for index, context in enumerate(contexts, 1)
+        )
         
-        # Simple penalty-based scoring
-        ai_penalty = int(ai_similarity * 30)  # Up to 30 points penalty
-        group_penalty = int(group_similarity * 20)  # Up to 20 points penalty
+        prompt = f"""You are a strict but fair programming teacher grading student code originality.
+Grade each of the {len(contexts)} submissions below independently.
+
+{items}
+
+Grade each submission considering:
+- Correctness (how well it solves the problem)
+- Originality (lower similarity to AI/peers is better)
+- Code quality and style
+
+Return a JSON array with one entry per submission:
+[{{"id": <submission number>, "score": <integer 1-100>, "rationale": "<brief explanation>"}}]"""
+
+        return {
+            "model": "gpt-4.1-mini",
+            "messages": [
+                {"role": "system", "content": "You are a programming teacher. Always respond with valid JSON only."},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": 150 * len(contexts),
+            "temperature": 0.3
+        }
+    
+    def _parse_batch_grades(self, content: str, count: int) -> List[Optional[Dict[str, Any]]]:
+        """
+        Parse a batched grading response, validating each entry on its own.
         
-        final_score = max(1, correctness - ai_penalty - group_penalty)
+        Returns:
+            Grade dicts aligned with the submissions; None for submissions
+            without a valid entry
+            
+        Raises:
+            ValueError: If the response is not a JSON array of grades
+        """
+        if content.startswith("```"):
+            content = content.strip("`").removeprefix("json").strip()
+        data = json.loads(content)
+        if isinstance(data, dict):
+            data = data.get("grades")
+        if not isinstance(data, list):
+            raise ValueError("Invalid batch response format")
         
-        return {
-            "score": final_score,
-            "rationale": f"Fallback scoring: {correctness} correctness - {ai_penalty} AI penalty - {group_penalty} group penalty = {final_score}"
+        grades: List[Optional[Dict[str, Any]]] = [None] * count
+        for item in data:
+            try:
+                index = int(item["id"]) - 1
+                if not 0 <= index < count or grades[index] is not None or not isinstance(item["rationale"], str):
+                    continue
+                grades[index] = {"score": max(1, min(100, int(item["score"]))), "rationale": item["rationale"]}
+            except (KeyError, TypeError, ValueError):
+                continue
+        return grades
+    
+    async def request_final_grade_batch(self, contexts: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Grade several submissions with one ChatGPT request.
+        
+        The response is cached under the batch request itself, never under
+        the submissions' single-item requests: a batch grade comes from a
+        different prompt and depends on the other submissions in the batch.
+        
+        Args:
+            contexts: Grading contexts
+            
+        Returns:
+            Grade dicts aligned with ``contexts``; None for submissions the
+            response did not grade validly (the caller grades them singly)
+        """
+        logger.info(f"[AI] Requesting final grades for {len(contexts)} submissions in one request")
+        
+        payload = self._batch_grade_payload(contexts)
+        headers = {
+            "Authorization": f"Bearer {self.openai_api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        async def request() -> Dict[str, Any]:
+            response = await self._get_client().post(
+                f"{self.openai_base_url}/chat/completions",
+                headers=headers,
+                json=payload
+            )
+            response.raise_for_status()
+            
+            data = response.json()
+            content = data["choices"][0]["message"]["content"].strip()
+            
+            try:
+                grades = self._parse_batch_grades(content, len(contexts))
+                if not any(grades):
+                    raise ValueError("No valid grades in batch response")
+            except (json.JSONDecodeError, ValueError):
+                logger.error(f"[AI] Failed to parse batch grading response: {content}")
+                raise
+            
+            return {"grades": grades}
+        
+        try:
+            result = await cached_llm_call("openai", payload, request)
+            return result["grades"]
+            
+        except Exception as e:
+            logger.error(f"[AI] Failed to request batch grade: {str(e)}")
+            return [None] * len(contexts)
+    
+    async def request_final_grades(self, contexts: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Request final grades for many submissions concurrently.
+        
+        Cached grades are looked up in one query first. The rest are graded
+        GRADING_BATCH_SIZE per request; submissions a batch did not grade
+        validly are then graded one request each. At most
+        GRADING_CONCURRENCY requests are in flight and new requests start at
+        no more than GRADING_RATE_PER_SECOND (after a burst of
+        GRADING_RATE_BURST).
+        
+        Args:
+            contexts: Grading contexts, one per submission
+            
+        Returns:
+            Grade dicts aligned with ``contexts``; a submission whose request
+            failed gets the fallback grade
+        """
+        keys = [llm_cache_key("openai", self._grade_payload(context)) for context in contexts]
+        cached = await get_cached_llm_responses(keys)
+        results = [cached.get(key) for key in keys]
+        
+        misses = [index for index, key in enumerate(keys) if key not in cached]
+        if cached:
+            logger.info(f"[AI] {len(contexts) - len(misses)}/{len(contexts)} grades served from the LLM cache")
+        
+        bucket = TokenBucket(settings.GRADING_RATE_PER_SECOND, settings.GRADING_RATE_BURST)
+        batch_size = settings.GRADING_BATCH_SIZE
+        
+        if batch_size > 1 and len(misses) > 1:
+            batches = [misses[start:start + batch_size] for start in range(0, len(misses), batch_size)]
+            batch_grades = await gather_limited(
+                lambda batch: self.request_final_grade_batch([contexts[index] for index in batch]),
+                batches,
+                settings.GRADING_CONCURRENCY,
+                bucket
+            )
+            for batch, grades in zip(batches, batch_grades):
+                if not isinstance(grades, Exception):
+                    for index, grade in zip(batch, grades):
+                        results[index] = grade
+            
+            misses = [index for index in misses if results[index] is None]
+            if misses:
+                logger.info(f"[AI] Grading {len(misses)} submissions singly after batch grading")
+        
+        single_grades = await gather_limited(
+            lambda index: self.request_final_grade(contexts[index], lookup=False),
+            misses,
+            settings.GRADING_CONCURRENCY,
+            bucket
+        )
+        for index, result in zip(misses, single_grades):
+            results[index] = result
+        return results
+    
+    async def request_grade_rationale(self, context: Dict[str, Any], score: int) -> str:
+        """
+        Ask ChatGPT to explain an existing score (e.g. one from rubric grading).
+        
+        Args:
+            context: Grading context with metrics
+            score: Final score to explain
+            
+        Returns:
+            Rationale text
+            
+        Raises:
+            AIServiceError: If the request fails or returns no rationale
+        """
+        correctness = context.get('correctness_score')
+        correctness_line = f"{correctness:.1f}/100" if correctness is not None else "not recorded"
+        prompt = f"""You are a strict but fair programming teacher explaining a grade to a student.
+
+Task: {context.get('task_title', 'Programming Assignment')}
+Correctness score: {correctness_line}
+AI similarity: {context.get('ai_similarity', 0.0):.3f}
+Group similarity: {context.get('intra_group_similarity', 0.0):.3f}
+Final score: {score}/100
+
+Explain the final score briefly, considering correctness, originality (lower
+similarity to AI/peers is better) and code quality. Do not change the score.
+
+Return JSON response:
+{{"rationale": "<brief explanation>"}}"""
+
+        payload = {
+            "model": "gpt-4.1-mini",
+            "messages": [
+                {"role": "system", "content": "You are a programming teacher. Always respond with valid JSON only."},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": 200,
+            "temperature": 0.3
         }
+        headers = {
+            "Authorization": f"Bearer {self.openai_api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        async def request() -> Dict[str, Any]:
+            response = await self._get_client().post(
+                f"{self.openai_base_url}/chat/completions",
+                headers=headers,
+                json=payload
+            )
+            response.raise_for_status()
+            
+            data = response.json()
+            result = json.loads(data["choices"][0]["message"]["content"].strip())
+            if not isinstance(result, dict) or not isinstance(result.get("rationale"), str) or not result["rationale"].strip():
+                raise ValueError("Invalid response format")
+            return {"rationale": result["rationale"].strip()}
+        
+        try:
+            return (await cached_llm_call("openai", payload, request))["rationale"]
+        except Exception as e:
+            logger.error(f"[AI] Failed to request grade rationale: {str(e)}")
+            raise AIServiceError(f"Rationale request failed: {str(e)}")
+    
+    def _fallback_grade(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Fallback grading with the task's rubric (the default rubric if none is given)."""
+        return rubric_grade(context, context.get("rubric"), label="Fallback rubric grading")
     
     async def _get_task(self, task_id: int, db: AsyncSession) -> Optional[Task]:
-        """Get task by ID."""
-        result = await db.execute(select(Task).where(Task.id == task_id))
+        """Get task by ID, with the body used in solution prompts."""
+        result = await db.execute(select(Task).options(*TASK_BODY).where(Task.id == task_id))
         return result.scalar_one_or_none()
 
 
@@ -15,6 +15,7 @@ from anthropic import AsyncAnthropic
 
 from app.core.config import settings
 from app.models.task import ProgrammingLanguage
+from app.services.llm_cache import cached_llm_call
 
 logger = logging.getLogger(__name__)
 
@@ -183,23 +184,25 @@ Return ONLY the JSON array, no additional text."""
 
     async def _generate_with_openai(self, prompt: str) -> List[Dict[str, Any]]:
         """Generate tasks using OpenAI GPT-4."""
-        try:
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-4-turbo-preview",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert programming instructor. Always respond with valid JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.7,
-                max_tokens=4000,
-                response_format={"type": "json_object"}
-            )
+        request = {
+            "model": "gpt-4-turbo-preview",
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are an expert programming instructor. Always respond with valid JSON."
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.7,
+            "max_tokens": 4000,
+            "response_format": {"type": "json_object"}
+        }
+
+        async def generate() -> Dict[str, Any]:
+            response = await self.openai_client.chat.completions.create(**request)
 
             content = response.choices[0].message.content
             result = json.loads(content)
@@ -212,7 +215,10 @@ Return ONLY the JSON array, no additional text."""
             else:
                 raise ValueError("Unexpected response format")
 
-            return self._validate_tasks(tasks)
+            return {"tasks": self._validate_tasks(tasks)}
+
+        try:
+            return (await cached_llm_call("openai", request, generate))["tasks"]
 
         except Exception as e:
             logger.error(f"OpenAI generation failed: {str(e)}")
@@ -220,18 +226,20 @@ Return ONLY the JSON array, no additional text."""
 
     async def _generate_with_anthropic(self, prompt: str) -> List[Dict[str, Any]]:
         """Generate tasks using Anthropic Claude."""
-        try:
-            response = await self.anthropic_client.messages.create(
-                model="claude-3-5-sonnet-20241022",
-                max_tokens=4000,
-                temperature=0.7,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
+        request = {
+            "model": "claude-3-5-sonnet-20241022",
+            "max_tokens": 4000,
+            "temperature": 0.7,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        }
+
+        async def generate() -> Dict[str, Any]:
+            response = await self.anthropic_client.messages.create(**request)
 
             content = response.content[0].text
 
@@ -255,7 +263,10 @@ Return ONLY the JSON array, no additional text."""
             else:
                 raise ValueError("Unexpected response format")
 
-            return self._validate_tasks(tasks)
+            return {"tasks": self._validate_tasks(tasks)}
+
+        try:
+            return (await cached_llm_call("anthropic", request, generate))["tasks"]
 
         except Exception as e:
             logger.error(f"Anthropic generation failed: {str(e)}")
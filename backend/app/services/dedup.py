@@ -0,0 +1,110 @@
+"""
+EduCode Backend - Submission Deduplication
+
+Groups submissions that contain the same program so per-program work
+(similarity features, test execution, LLM grading) runs once per distinct
+program and its results are fanned back out to every copy. The grouping key
+only ignores differences that cannot change behavior (line endings,
+trailing whitespace, a byte order mark), so copies always share results.
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+def normalize_program(code: str) -> str:
+    """Normalize code without changing its behavior (line endings, trailing whitespace, BOM)."""
+    code = code.lstrip("﻿").replace("\r\n", "\n").replace("\r", "\n")
+    return "\n".join(line.rstrip() for line in code.split("\n")).strip("\n")
+
+
+def program_hash(code: str) -> str:
+    """SHA-256 of the normalized program."""
+    return hashlib.sha256(normalize_program(code).encode("utf-8")).hexdigest()
+
+
+class SubmissionClusters:
+    """
+    Submissions grouped by program hash.
+
+    Each cluster is represented by its lowest submission ID; clusters keep
+    the order in which their first member appears in the input.
+    """
+
+    def __init__(self, codes: Dict[int, str]):
+        self._group({submission_id: program_hash(code) for submission_id, code in codes.items()})
+
+    @classmethod
+    def from_hashes(cls, hash_by_submission: Dict[int, str]) -> "SubmissionClusters":
+        """Group submissions by already computed program hashes (e.g. stored fingerprints)."""
+        clusters = cls.__new__(cls)
+        clusters._group(dict(hash_by_submission))
+        return clusters
+
+    def _group(self, hash_by_submission: Dict[int, str]) -> None:
+        self.hash_by_submission = hash_by_submission
+        self.members: "OrderedDict[str, List[int]]" = OrderedDict()
+        for submission_id, code_hash in self.hash_by_submission.items():
+            self.members.setdefault(code_hash, []).append(submission_id)
+        for members in self.members.values():
+            members.sort()
+
+        self.representatives = [members[0] for members in self.members.values()]
+        self._rep_index = {code_hash: index for index, code_hash in enumerate(self.members)}
+
+    def __len__(self) -> int:
+        return len(self.members)
+
+    @property
+    def duplicate_clusters(self) -> List[List[int]]:
+        """Clusters with more than one submission (exact copies)."""
+        return [members for members in self.members.values() if len(members) > 1]
+
+    def duplicates_of(self, submission_id: int) -> List[int]:
+        """Other submissions with the same program."""
+        return [peer for peer in self.members[self.hash_by_submission[submission_id]] if peer != submission_id]
+
+    def expand_matrix(self, matrix: np.ndarray, submission_ids: List[int]) -> np.ndarray:
+        """
+        Fan a representatives x representatives matrix out to all submissions.
+
+        Args:
+            matrix: Square matrix ordered like ``representatives``
+            submission_ids: Order of the rows/columns of the result
+
+        Returns:
+            len(submission_ids) x len(submission_ids) matrix
+        """
+        index = np.array([self._rep_index[self.hash_by_submission[sid]] for sid in submission_ids], dtype=int)
+        return matrix[np.ix_(index, index)]
+
+    def expand_pairs(
+        self,
+        pair_scores: Dict[Tuple[int, int], float],
+        submission_ids: List[int]
+    ) -> Dict[Tuple[int, int], float]:
+        """
+        Fan scores of representative pairs out to all submission pairs.
+
+        Pairs of copies of the same program are not included.
+
+        Args:
+            pair_scores: Scores keyed by (i, j) indexes into ``representatives``
+            submission_ids: Order the indexes of the result refer to
+
+        Returns:
+            Scores keyed by (i, j) indexes into ``submission_ids`` with i < j
+        """
+        positions: List[List[int]] = [[] for _ in self.representatives]
+        for position, submission_id in enumerate(submission_ids):
+            positions[self._rep_index[self.hash_by_submission[submission_id]]].append(position)
+
+        expanded = {}
+        for (rep_a, rep_b), score in pair_scores.items():
+            for a in positions[rep_a]:
+                for b in positions[rep_b]:
+                    expanded[(min(a, b), max(a, b))] = score
+        return expanded
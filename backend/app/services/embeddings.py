@@ -0,0 +1,183 @@
+"""
+EduCode Backend - Code Embedding Service
+
+Embedding-based ("cosine_embedding") code similarity using a local
+sentence-transformers model. The model is loaded once per worker process,
+documents are embedded in batches and every vector is cached on disk under
+the SHA-256 of its code, so each distinct submission is embedded only once.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_METHOD = "cosine_embedding"
+
+# In-memory vectors kept per process in front of the disk cache
+_MEMORY_CACHE_SIZE = 8192
+
+_model = None
+_model_lock = threading.Lock()
+_memory_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+
+def get_embedding_model():
+    """
+    Load the embedding model once per process.
+
+    Returns:
+        SentenceTransformer instance
+
+    Raises:
+        Exception: If sentence-transformers is missing or the model cannot be loaded
+    """
+    global _model
+
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+
+                    logger.info(f"Loading embedding model {settings.EMBEDDING_MODEL_NAME}")
+                    _model = SentenceTransformer(settings.EMBEDDING_MODEL_NAME, device=settings.EMBEDDING_DEVICE)
+
+                except Exception as e:
+                    logger.error(f"Failed to load embedding model: {str(e)}")
+                    raise Exception(f"Embedding model unavailable: {str(e)}")
+
+    return _model
+
+
+def _cache_key(code: str) -> str:
+    """Cache key of a code document for the configured model."""
+    return hashlib.sha256(f"{settings.EMBEDDING_MODEL_NAME}\x00{code}".encode("utf-8")).hexdigest()
+
+
+def _cache_path(key: str) -> str:
+    """On-disk location of a cached vector (sharded by key prefix)."""
+    return os.path.join(settings.EMBEDDING_CACHE_DIR, key[:2], f"{key}.npy")
+
+
+def _remember(key: str, vector: np.ndarray) -> None:
+    """Store a vector in the in-process LRU cache."""
+    _memory_cache[key] = vector
+    _memory_cache.move_to_end(key)
+    while len(_memory_cache) > _MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+
+
+def _load_cached(key: str) -> Optional[np.ndarray]:
+    """Look a vector up in memory, then on disk."""
+    vector = _memory_cache.get(key)
+    if vector is not None:
+        _memory_cache.move_to_end(key)
+        return vector
+
+    path = _cache_path(key)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        vector = np.load(path)
+    except Exception as e:
+        logger.warning(f"Discarding unreadable embedding cache entry {path}: {str(e)}")
+        return None
+
+    _remember(key, vector)
+    return vector
+
+
+def _store_cached(key: str, vector: np.ndarray) -> None:
+    """Persist a vector; written atomically so concurrent workers never read partial files."""
+    _remember(key, vector)
+
+    path = _cache_path(key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, vector)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"Failed to persist embedding cache entry {path}: {str(e)}")
+
+
+def embed_codes(codes: List[str]) -> np.ndarray:
+    """
+    Embed code documents, reusing cached vectors.
+
+    Only cache misses are sent to the model, in batches of
+    EMBEDDING_BATCH_SIZE, and duplicates within the input are embedded once.
+
+    Args:
+        codes: Code documents
+
+    Returns:
+        L2-normalized embeddings, one row per document
+    """
+    keys = [_cache_key(code) for code in codes]
+    vectors = {}
+    missing = {}
+
+    for key, code in zip(keys, codes):
+        if key in vectors or key in missing:
+            continue
+        cached = _load_cached(key)
+        if cached is not None:
+            vectors[key] = cached
+        else:
+            missing[key] = code
+
+    if missing:
+        logger.info(f"Embedding {len(missing)} code documents ({len(vectors)} cached)")
+        model = get_embedding_model()
+        embedded = model.encode(
+            list(missing.values()),
+            batch_size=settings.EMBEDDING_BATCH_SIZE,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        for key, vector in zip(missing, embedded):
+            vector = np.asarray(vector, dtype=np.float32)
+            vectors[key] = vector
+            _store_cached(key, vector)
+
+    if not keys:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    return np.vstack([vectors[key] for key in keys])
+
+
+def embedding_similarity_matrix(codes: List[str], references: Optional[List[str]] = None) -> np.ndarray:
+    """
+    Cosine similarity of every code against every reference (or against each other).
+
+    All documents are embedded in one batch and compared with a single
+    matrix multiplication.
+
+    Args:
+        codes: Code documents (rows)
+        references: Reference documents (columns); defaults to ``codes``
+
+    Returns:
+        Similarity matrix with scores clipped to [0, 1]
+    """
+    if not codes or (references is not None and not references):
+        return np.zeros((len(codes), len(references or [])))
+
+    vectors = embed_codes(codes + (references or []))
+    rows = vectors[:len(codes)]
+    cols = vectors[len(codes):] if references is not None else rows
+
+    return np.clip(rows @ cols.T, 0.0, 1.0)
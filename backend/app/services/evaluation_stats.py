@@ -0,0 +1,266 @@
+"""
+EduCode Backend - Evaluation Statistics
+
+Evaluation aggregates for the summary endpoints, kept in the
+task_evaluation_stats and global_evaluation_stats rollups so dashboards
+read one row by primary key instead of scanning evaluations.
+
+The rollups are refreshed in the transaction that changes them: session
+listeners note every flushed insert, delete or stats-relevant update of an
+Evaluation (and deleted submissions and tasks), and before the commit the
+affected tasks' rows are recomputed with one aggregate query (``count(*)
+FILTER`` for the thresholds, a ``CASE`` over the final score for the grade
+histogram). The change of those task rows is added to the global row in one
+``UPDATE ... SET col = col + delta``, so a write costs the same however
+many tasks exist and holds the global row only from that statement to the
+commit; the global row is re-summed from all task rows only when a task was
+deleted or the row is new. Task rows are locked first, so concurrent
+writers to one task serialize and the later one aggregates the earlier
+one's committed evaluations. Bulk UPDATE
+statements bypass the session's tracking and must call
+``mark_evaluation_stats_stale``.
+"""
+
+import itertools
+from typing import Dict, Iterable, NamedTuple, Sequence
+
+from sqlalchemy import case, event, func, inspect, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.evaluation import Evaluation
+from app.models.evaluation_stats import (
+    GLOBAL_STATS_ID, GRADE_LETTERS, GlobalEvaluationStats, TaskEvaluationStats
+)
+from app.models.submission import Submission
+from app.models.task import Task
+
+# Similarity above this marks an evaluation as suspicious (see Evaluation.is_suspicious)
+SUSPICIOUS_SIMILARITY = 0.8
+
+# SQL counterpart of Evaluation.grade_letter
+GRADE_LETTER = case(
+    (Evaluation.final_score >= 90, "A"),
+    (Evaluation.final_score >= 80, "B"),
+    (Evaluation.final_score >= 70, "C"),
+    (Evaluation.final_score >= 60, "D"),
+    else_="F"
+)
+
+HIGH_AI_SIMILARITY = Evaluation.ai_similarity > SUSPICIOUS_SIMILARITY
+HIGH_GROUP_SIMILARITY = Evaluation.intra_group_similarity > SUSPICIOUS_SIMILARITY
+
+# Rollup column -> aggregate over evaluations (zero for a task without any)
+STATS_AGGREGATES = {
+    "evaluation_count": func.count(Evaluation.id),
+    "score_sum": func.coalesce(func.sum(Evaluation.final_score), 0),
+    "ai_similarity_sum": func.coalesce(func.sum(Evaluation.ai_similarity), 0.0),
+    "group_similarity_sum": func.coalesce(func.sum(Evaluation.intra_group_similarity), 0.0),
+    "high_ai_similarity_count": func.count(Evaluation.id).filter(HIGH_AI_SIMILARITY),
+    "high_group_similarity_count": func.count(Evaluation.id).filter(HIGH_GROUP_SIMILARITY),
+    "suspicious_count": func.count(Evaluation.id).filter(or_(HIGH_AI_SIMILARITY, HIGH_GROUP_SIMILARITY)),
+    **{
+        f"grade_{letter.lower()}_count": func.count(Evaluation.id).filter(GRADE_LETTER == letter)
+        for letter in GRADE_LETTERS
+    }
+}
+
+# Evaluation columns the rollups depend on
+STATS_FIELDS = ("submission_id", "final_score", "ai_similarity", "intra_group_similarity")
+
+_STALE_SUBMISSIONS = "evaluation_stats_stale_submissions"
+_STALE_TASKS = "evaluation_stats_stale_tasks"
+
+
+class EvaluationAggregates(NamedTuple):
+    """Aggregates over a set of evaluations."""
+    total_evaluations: int
+    average_score: float
+    average_ai_similarity: float
+    average_group_similarity: float
+    high_ai_similarity_count: int
+    high_group_similarity_count: int
+    suspicious_count: int
+    grade_distribution: Dict[str, int]
+
+
+EMPTY_AGGREGATES = EvaluationAggregates(0, 0.0, 0.0, 0.0, 0, 0, 0, {})
+
+
+def _aggregates(stats) -> EvaluationAggregates:
+    if stats is None:
+        return EMPTY_AGGREGATES
+    return EvaluationAggregates(
+        total_evaluations=stats.evaluation_count,
+        average_score=stats.average_score,
+        average_ai_similarity=stats.average_ai_similarity,
+        average_group_similarity=stats.average_group_similarity,
+        high_ai_similarity_count=stats.high_ai_similarity_count,
+        high_group_similarity_count=stats.high_group_similarity_count,
+        suspicious_count=stats.suspicious_count,
+        grade_distribution=stats.grade_distribution
+    )
+
+
+async def task_evaluation_aggregates(db: AsyncSession, task_id: int) -> EvaluationAggregates:
+    """Aggregates of one task's evaluations, read from its rollup row."""
+    return _aggregates(await db.get(TaskEvaluationStats, task_id))
+
+
+async def global_evaluation_aggregates(db: AsyncSession) -> EvaluationAggregates:
+    """Aggregates of every evaluation, read from the global rollup row."""
+    return _aggregates(await db.get(GlobalEvaluationStats, GLOBAL_STATS_ID))
+
+
+def _task_stats_totals(db: Session, task_ids: Sequence[int]) -> Dict[str, float]:
+    """Sum of each rollup column over these tasks' rows."""
+    return db.execute(select(*[
+        func.coalesce(func.sum(getattr(TaskEvaluationStats, name)), 0).label(name)
+        for name in STATS_AGGREGATES
+    ]).where(TaskEvaluationStats.task_id.in_(task_ids))).one()._asdict()
+
+
+def refresh_evaluation_stats(db: Session, task_ids: Iterable[int]) -> None:
+    """
+    Recompute the rollups of these tasks and apply their change to the global rollup.
+
+    Runs automatically before a session commits evaluation changes. The
+    caller is responsible for committing the session.
+
+    Args:
+        db: Database session
+        task_ids: Tasks whose evaluations changed (deleted tasks are skipped)
+    """
+    task_ids = sorted(set(task_ids))
+    deltas = {name: 0 for name in STATS_AGGREGATES}
+    resum = False
+
+    if task_ids:
+        # Create missing rows, then lock them in a fixed order
+        db.execute(
+            insert(TaskEvaluationStats)
+            .from_select(["task_id"], select(Task.id).where(Task.id.in_(task_ids)))
+            .on_conflict_do_nothing(index_elements=["task_id"])
+        )
+        locked = db.execute(
+            select(TaskEvaluationStats.task_id)
+            .where(TaskEvaluationStats.task_id.in_(task_ids))
+            .order_by(TaskEvaluationStats.task_id)
+            .with_for_update()
+        ).scalars().all()
+
+        # A deleted task's row is already gone with its totals
+        resum = len(locked) < len(task_ids)
+        before = _task_stats_totals(db, task_ids)
+
+        aggregates = select(
+            Task.id.label("task_id"),
+            *[aggregate.label(name) for name, aggregate in STATS_AGGREGATES.items()]
+        ).select_from(Task).outerjoin(
+            Submission, Submission.task_id == Task.id
+        ).outerjoin(
+            Evaluation, Evaluation.submission_id == Submission.id
+        ).where(Task.id.in_(task_ids)).group_by(Task.id).subquery()
+
+        db.execute(
+            update(TaskEvaluationStats)
+            .where(TaskEvaluationStats.task_id == aggregates.c.task_id)
+            .values({name: aggregates.c[name] for name in STATS_AGGREGATES})
+            .execution_options(synchronize_session=False)
+        )
+
+        after = _task_stats_totals(db, task_ids)
+        deltas = {name: after[name] - before[name] for name in STATS_AGGREGATES}
+
+    if not resum:
+        if not any(deltas.values()):
+            return
+        # No row updated means the global row does not exist yet
+        resum = db.execute(
+            update(GlobalEvaluationStats)
+            .where(GlobalEvaluationStats.id == GLOBAL_STATS_ID)
+            .values({name: getattr(GlobalEvaluationStats, name) + delta for name, delta in deltas.items() if delta})
+            .execution_options(synchronize_session=False)
+        ).rowcount == 0
+
+    if resum:
+        db.execute(
+            insert(GlobalEvaluationStats)
+            .values(id=GLOBAL_STATS_ID)
+            .on_conflict_do_nothing(index_elements=["id"])
+        )
+        db.execute(
+            select(GlobalEvaluationStats.id).where(GlobalEvaluationStats.id == GLOBAL_STATS_ID).with_for_update()
+        )
+        totals = db.execute(select(*[
+            func.coalesce(func.sum(getattr(TaskEvaluationStats, name)), 0).label(name)
+            for name in STATS_AGGREGATES
+        ])).one()
+        db.execute(
+            update(GlobalEvaluationStats)
+            .where(GlobalEvaluationStats.id == GLOBAL_STATS_ID)
+            .values(**totals._mapping)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def mark_evaluation_stats_stale(db: Session, submission_ids: Iterable[int] = (), task_ids: Iterable[int] = ()) -> None:
+    """
+    Refresh the rollups of these submissions' tasks when ``db`` commits.
+
+    Only needed after bulk UPDATE statements on evaluations; changes made
+    through ORM objects are tracked automatically.
+    """
+    db.info.setdefault(_STALE_SUBMISSIONS, set()).update(submission_ids)
+    db.info.setdefault(_STALE_TASKS, set()).update(task_ids)
+
+
+def _stats_changed(evaluation: Evaluation) -> bool:
+    state = inspect(evaluation)
+    return any(state.attrs[field].history.has_changes() for field in STATS_FIELDS)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_evaluation_changes(session: Session, flush_context) -> None:
+    submission_ids = set()
+    task_ids = set()
+
+    for instance in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(instance, Evaluation):
+            if instance in session.dirty and not _stats_changed(instance):
+                continue
+            submission_ids.add(instance.submission_id)
+            submission_ids.update(inspect(instance).attrs.submission_id.history.deleted)
+        elif isinstance(instance, Submission) and instance in session.deleted:
+            task_ids.add(instance.task_id)
+        elif isinstance(instance, Task) and instance in session.deleted:
+            task_ids.add(instance.id)
+
+    if submission_ids or task_ids:
+        mark_evaluation_stats_stale(session, submission_ids, task_ids)
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_stale_evaluation_stats(session: Session) -> None:
+    # Commit flushes only after this hook; flush now so pending changes are tracked
+    session.flush()
+    if not (session.info.get(_STALE_SUBMISSIONS) or session.info.get(_STALE_TASKS)):
+        return
+
+    submission_ids = session.info.pop(_STALE_SUBMISSIONS, set())
+    task_ids = session.info.pop(_STALE_TASKS, set())
+
+    if submission_ids:
+        task_ids.update(session.execute(
+            select(Submission.task_id).where(Submission.id.in_(submission_ids)).distinct()
+        ).scalars())
+
+    refresh_evaluation_stats(session, task_ids)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_stale_evaluation_stats(session: Session, previous_transaction) -> None:
+    if previous_transaction.parent is None:
+        session.info.pop(_STALE_SUBMISSIONS, None)
+        session.info.pop(_STALE_TASKS, None)
@@ -0,0 +1,540 @@
+"""
+EduCode Backend - Test Execution Engine
+
+Runs submissions against their task's TaskTest cases in sandboxed
+subprocesses and turns the outcomes into a weighted correctness score.
+
+Every Celery worker process keeps a warm pool of sandbox workers
+(``app.services.sandbox_worker``): bare interpreters that fork one
+resource-limited harness per submission, which loads the code once and runs
+all test inputs through it. Interpreter startup is paid once per pool slot
+and process spawns drop to one per submission. Test input is fed on stdin
+and stdout is compared with the expected output (as JSON values when both
+sides parse, otherwise as whitespace-normalized text).
+
+Submissions are untrusted, so every sandbox worker runs under bubblewrap
+(``bwrap``) in its own user, pid, network, ipc and mount namespaces, as
+TEST_SANDBOX_UID, with only read-only system directories mounted: no
+network, no view of the application, its files or its processes. The
+worker checks this on startup and the engine refuses any worker that is not
+isolated; when no isolated sandbox can be started the tests are not run at
+all (the report is untested) rather than run unconfined.
+"""
+
+import ast
+import atexit
+import json
+import logging
+import math
+import os
+import select
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.services.sandbox_worker import HARD_KILL_GRACE, read_message, write_message
+
+logger = logging.getLogger(__name__)
+
+# Languages the sandbox can execute
+SUPPORTED_LANGUAGES = {"python"}
+
+# Correctness assumed when a submission cannot be tested (no tests, unsupported language)
+DEFAULT_CORRECTNESS_SCORE = 85.0
+
+_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+# Where the worker script is mounted inside the sandbox
+_SANDBOX_SCRIPT = "/sandbox/sandbox_worker.py"
+
+# Application checkout, which must not be visible inside the sandbox
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(_WORKER_SCRIPT)))
+
+# Namespaces the sandbox must not share with the engine
+_ISOLATED_NAMESPACES = ("user", "pid", "net", "ipc", "mnt")
+
+# Seconds a new sandbox worker gets to report its isolation
+_STARTUP_SECONDS = 10.0
+
+# Extra time the engine waits for a sandbox worker beyond the worker's own deadline
+_RESPONSE_GRACE_SECONDS = 5.0
+
+# Characters of actual output kept in test results
+_OUTPUT_PREVIEW = 1000
+
+
+class SandboxError(Exception):
+    """A sandbox worker died or stopped answering."""
+
+
+class SandboxUnavailable(SandboxError):
+    """No isolated sandbox worker can be started, so tests must not run."""
+
+
+class ExecutionResult(NamedTuple):
+    """Outcome of one sandboxed program run."""
+    status: str  # ok, error, timeout, memory_limit, output_limit
+    exit_code: Optional[int]
+    stdout: str
+    stderr: str
+    duration: float
+
+
+class TestResult(NamedTuple):
+    """Outcome of one TaskTest for a submission."""
+    test_id: Optional[int]
+    test_name: str
+    passed: bool
+    status: str
+    weight: int
+    duration: float
+    actual_output: str
+    error: Optional[str]
+
+
+class TestRunReport(NamedTuple):
+    """All test outcomes of a submission and the weighted score (None if untested)."""
+    score: Optional[float]
+    passed: int
+    total: int
+    results: List[TestResult]
+
+    @property
+    def correctness_score(self) -> float:
+        """Score for grading, falling back to the default when nothing was tested."""
+        return DEFAULT_CORRECTNESS_SCORE if self.score is None else self.score
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "score": self.score,
+            "passed": self.passed,
+            "total": self.total,
+            "results": [result._asdict() for result in self.results],
+        }
+
+
+UNTESTED_REPORT = TestRunReport(score=None, passed=0, total=0, results=[])
+
+
+def _isolation_checks() -> Dict[str, Any]:
+    """What a sandbox worker must differ from: the engine's uid, namespaces and files."""
+    try:
+        namespaces = {name: os.stat(f"/proc/self/ns/{name}").st_ino for name in _ISOLATED_NAMESPACES}
+    except OSError as e:
+        raise SandboxUnavailable(f"Cannot inspect the engine's namespaces: {str(e)}")
+    return {"engine_uid": os.getuid(), "namespaces": namespaces, "hidden_paths": [_APP_ROOT]}
+
+
+def _sandbox_command() -> List[str]:
+    """bubblewrap command line that starts one isolated sandbox worker."""
+    bwrap = shutil.which(settings.TEST_SANDBOX_BWRAP)
+    if bwrap is None:
+        raise SandboxUnavailable(f"Sandbox launcher '{settings.TEST_SANDBOX_BWRAP}' is not installed")
+
+    uid = str(settings.TEST_SANDBOX_UID)
+    command = [
+        bwrap,
+        "--unshare-all", "--unshare-user", "--die-with-parent", "--new-session",
+        "--uid", uid, "--gid", uid, "--cap-drop", "ALL",
+        "--ro-bind", "/usr", "/usr",
+    ]
+    for path in ("/bin", "/lib", "/lib64", "/sbin"):
+        if os.path.islink(path):
+            command += ["--symlink", os.readlink(path), path]
+        elif os.path.isdir(path):
+            command += ["--ro-bind", path, path]
+    prefix = os.path.realpath(sys.base_prefix)
+    if not prefix.startswith("/usr/"):
+        command += ["--ro-bind", prefix, prefix]
+    command += [
+        "--ro-bind-try", "/etc/ld.so.cache", "/etc/ld.so.cache",
+        "--ro-bind", _WORKER_SCRIPT, _SANDBOX_SCRIPT,
+        "--proc", "/proc",
+        "--dev", "/dev",
+        "--tmpfs", "/tmp",
+        "--chdir", "/tmp",
+        "--clearenv", "--setenv", "PATH", os.defpath,
+        os.path.realpath(sys.executable), "-I", "-S", "-B", "-X", "utf8", _SANDBOX_SCRIPT,
+        json.dumps(_isolation_checks()),
+    ]
+    return command
+
+
+class _SandboxWorker:
+    """One warm sandbox worker process, verified to be isolated."""
+
+    def __init__(self):
+        self.process = subprocess.Popen(
+            _sandbox_command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env={"PATH": os.defpath},
+            close_fds=True
+        )
+
+        try:
+            status = self._read_message(time.monotonic() + _STARTUP_SECONDS)
+        except SandboxError as e:
+            self._kill()
+            raise SandboxUnavailable(f"Sandbox worker failed to start: {str(e)}")
+        if not status.get("isolated"):
+            self._kill()
+            raise SandboxUnavailable(f"Sandbox is not isolated: {'; '.join(status.get('problems', []))}")
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run_job(self, job: Dict[str, Any], results: List[Dict[str, Any]], wait_seconds: float) -> None:
+        """
+        Send a job and collect its streamed per-test results into ``results``.
+
+        ``wait_seconds`` bounds the wait for each result, not the whole job.
+        """
+        try:
+            write_message(self.process.stdin, job)
+        except (BrokenPipeError, OSError) as e:
+            raise SandboxError(f"Sandbox worker is gone: {str(e)}")
+
+        while True:
+            message = self._read_message(time.monotonic() + wait_seconds)
+            if message.get("done"):
+                return
+            results.append(message)
+
+    def _read_message(self, deadline: float) -> Dict[str, Any]:
+        header = self._read_exact(4, deadline)
+        length = int.from_bytes(header, "big")
+        return json.loads(self._read_exact(length, deadline).decode("utf-8"))
+
+    def _read_exact(self, size: int, deadline: float) -> bytes:
+        fd = self.process.stdout.fileno()
+        data = bytearray()
+        while len(data) < size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise SandboxError("Sandbox worker did not answer in time")
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(fd, size - len(data))
+            if not chunk:
+                raise SandboxError("Sandbox worker exited unexpectedly")
+            data += chunk
+        return bytes(data)
+
+    def _kill(self) -> None:
+        self.process.kill()
+        self.process.wait()
+
+    def close(self) -> None:
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=2)
+        except Exception:
+            self.process.kill()
+
+
+class SandboxPool:
+    """
+    Fixed-size pool of warm sandbox workers, safe to share between threads.
+
+    Workers are started on demand up to ``size`` and replaced when they die.
+    """
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self._idle: List[_SandboxWorker] = []
+        self._created = 0
+        self._condition = threading.Condition()
+
+    def warm(self) -> None:
+        """
+        Start all workers ahead of a large batch.
+
+        Raises:
+            SandboxUnavailable: If no isolated worker can be started
+        """
+        workers = []
+        with self._condition:
+            missing = self.size - self._created
+            self._created += missing
+        try:
+            for _ in range(missing):
+                workers.append(_SandboxWorker())
+        finally:
+            with self._condition:
+                self._created -= missing - len(workers)
+                self._idle.extend(workers)
+                self._condition.notify_all()
+
+    def _acquire(self) -> _SandboxWorker:
+        with self._condition:
+            while not self._idle and self._created >= self.size:
+                self._condition.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._created += 1
+
+        try:
+            return _SandboxWorker()
+        except Exception:
+            with self._condition:
+                self._created -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, worker: _SandboxWorker) -> None:
+        with self._condition:
+            if worker.alive:
+                self._idle.append(worker)
+            else:
+                self._created -= 1
+            self._condition.notify()
+
+    def run_batch(self, code: str, inputs: Sequence[Tuple[str, float]], memory_mb: Optional[int] = None) -> List[ExecutionResult]:
+        """
+        Run a program against several inputs in one sandboxed harness.
+
+        Args:
+            code: Python source executed as ``__main__`` once per input
+            inputs: (stdin text, timeout in seconds) per run; each timeout
+                is enforced individually
+            memory_mb: Address-space limit (defaults to TEST_SANDBOX_MEMORY_MB)
+
+        Returns:
+            ExecutionResult per input, in input order
+
+        Raises:
+            SandboxUnavailable: If no isolated worker can be started
+        """
+        if not inputs:
+            return []
+
+        job = {
+            "code": code,
+            "tests": [{"stdin": stdin, "timeout": float(timeout)} for stdin, timeout in inputs],
+            "memory_mb": memory_mb or settings.TEST_SANDBOX_MEMORY_MB,
+            "max_output": settings.TEST_SANDBOX_MAX_OUTPUT_KB * 1024,
+        }
+        wait_seconds = max(timeout for _, timeout in inputs) + HARD_KILL_GRACE + _RESPONSE_GRACE_SECONDS
+
+        replies: List[Dict[str, Any]] = []
+        worker = self._acquire()
+        try:
+            worker.run_job(job, replies, wait_seconds)
+        except SandboxError as e:
+            logger.error(f"Sandbox worker failed, replacing it: {str(e)}")
+            worker._kill()
+            replies.extend(
+                {"status": "error", "exit_code": None, "stdout": "", "stderr": str(e), "duration": 0.0}
+                for _ in range(len(inputs) - len(replies))
+            )
+        finally:
+            self._release(worker)
+
+        return [
+            ExecutionResult(**{field: reply.get(field) for field in ExecutionResult._fields})
+            for reply in replies[:len(inputs)]
+        ]
+
+    def close(self) -> None:
+        with self._condition:
+            workers, self._idle = self._idle, []
+            self._created -= len(workers)
+        for worker in workers:
+            worker.close()
+
+
+_pool: Optional[SandboxPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool() -> SandboxPool:
+    """Sandbox pool of the current process (a forked process gets its own)."""
+    global _pool, _pool_pid
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = SandboxPool(settings.TEST_SANDBOX_POOL_SIZE)
+            _pool_pid = os.getpid()
+            atexit.register(_pool.close)
+        return _pool
+
+
+def _parse_value(text: str) -> Any:
+    """Parse program output or test data as JSON, then as a Python literal; else keep the text."""
+    text = text.strip()
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return text
+
+
+def _normalize_text(text: str) -> str:
+    return "\n".join(line.rstrip() for line in text.strip().splitlines())
+
+
+def _values_equal(actual: Any, expected: Any) -> bool:
+    if isinstance(expected, bool) or isinstance(actual, bool):
+        return actual is expected
+    if isinstance(expected, (int, float)) and isinstance(actual, (int, float)):
+        return math.isclose(actual, expected, rel_tol=1e-6, abs_tol=1e-9)
+    if isinstance(expected, (list, tuple)) and isinstance(actual, (list, tuple)):
+        return len(actual) == len(expected) and all(_values_equal(a, e) for a, e in zip(actual, expected))
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        return (
+            {str(key) for key in actual} == {str(key) for key in expected}
+            and all(_values_equal(actual[key], expected[key]) for key in actual if key in expected)
+        )
+    if isinstance(expected, str) and isinstance(actual, str):
+        return _normalize_text(actual) == _normalize_text(expected)
+    return actual == expected
+
+
+def stdin_for_test(test_input: str) -> str:
+    """Program input for a test: a JSON string is unwrapped, anything else is passed verbatim."""
+    try:
+        value = json.loads(test_input)
+    except ValueError:
+        value = test_input
+    text = value if isinstance(value, str) else test_input
+    return text if text.endswith("\n") else text + "\n"
+
+
+def outputs_match(actual: str, expected: str) -> bool:
+    """
+    Compare program output with a test's expected output.
+
+    A JSON string expectation is compared as text; any other JSON value is
+    compared structurally with the parsed output (numbers with a tolerance).
+    """
+    expected_value = _parse_value(expected)
+    if isinstance(expected_value, str):
+        return _normalize_text(actual) == _normalize_text(expected_value)
+    return _values_equal(_parse_value(actual), expected_value)
+
+
+def _test_result(test, execution: ExecutionResult) -> TestResult:
+    passed = execution.status == "ok" and outputs_match(execution.stdout, test.expected_output)
+    error = None
+    if execution.status != "ok":
+        error = execution.stderr.strip().splitlines()[-1] if execution.stderr.strip() else execution.status
+
+    return TestResult(
+        test_id=getattr(test, "id", None),
+        test_name=test.test_name,
+        passed=passed,
+        status=execution.status,
+        weight=test.weight or 0,
+        duration=execution.duration,
+        actual_output=execution.stdout[:_OUTPUT_PREVIEW],
+        error=error
+    )
+
+
+def weighted_score(results: Sequence[TestResult]) -> Optional[float]:
+    """Percentage of test weight passed (equal weights if none are set)."""
+    if not results:
+        return None
+    total_weight = sum(result.weight for result in results)
+    if total_weight <= 0:
+        return round(100.0 * sum(result.passed for result in results) / len(results), 2)
+    return round(100.0 * sum(result.weight for result in results if result.passed) / total_weight, 2)
+
+
+def _test_inputs(tests: Sequence) -> List[Tuple[str, float]]:
+    return [(stdin_for_test(test.test_input), float(test.timeout_seconds or 5)) for test in tests]
+
+
+def run_tests(code: str, language: Any, tests: Sequence, pool: Optional[SandboxPool] = None) -> TestRunReport:
+    """
+    Run a submission against a task's tests.
+
+    All tests run in one sandboxed process that loads the submission once;
+    each test's ``timeout_seconds`` is enforced individually.
+
+    Args:
+        code: Submission source code
+        language: Task language (ProgrammingLanguage or its value)
+        tests: TaskTest rows (or objects with the same attributes)
+        pool: Sandbox pool (defaults to the process-wide pool)
+
+    Returns:
+        TestRunReport; ``score`` is None when the submission could not be
+        tested (no tests, unsupported language or no isolated sandbox)
+    """
+    language = getattr(language, "value", language)
+    if not tests or language not in SUPPORTED_LANGUAGES:
+        if tests:
+            logger.info(f"Skipping test execution: language '{language}' is not supported by the sandbox")
+        return UNTESTED_REPORT
+
+    pool = pool or get_sandbox_pool()
+    try:
+        executions = pool.run_batch(code, _test_inputs(tests))
+    except SandboxUnavailable as e:
+        logger.error(f"Skipping test execution: {str(e)}")
+        return UNTESTED_REPORT
+    results = [_test_result(test, execution) for test, execution in zip(tests, executions)]
+
+    return TestRunReport(
+        score=weighted_score(results),
+        passed=sum(result.passed for result in results),
+        total=len(results),
+        results=results
+    )
+
+
+def run_submissions_tests(
+    codes: Dict[Hashable, str],
+    language: Any,
+    tests: Sequence,
+    pool: Optional[SandboxPool] = None
+) -> Dict[Hashable, TestRunReport]:
+    """
+    Run many submissions of one task against its tests.
+
+    Submissions are spread over the warm sandbox pool with one harness
+    process each, so a task costs one process spawn per submission.
+
+    Args:
+        codes: Submission code keyed by e.g. submission ID
+        language: Task language (ProgrammingLanguage or its value)
+        tests: TaskTest rows shared by all submissions
+        pool: Sandbox pool (defaults to the process-wide pool)
+
+    Returns:
+        TestRunReport per key of ``codes``
+    """
+    language = getattr(language, "value", language)
+    if not codes:
+        return {}
+    if not tests or language not in SUPPORTED_LANGUAGES:
+        return {key: run_tests(code, language, tests) for key, code in codes.items()}
+
+    pool = pool or get_sandbox_pool()
+    try:
+        pool.warm()
+    except SandboxUnavailable as e:
+        logger.error(f"Skipping test execution for {len(codes)} submissions: {str(e)}")
+        return {key: UNTESTED_REPORT for key in codes}
+    tests = list(tests)
+    keys = list(codes)
+
+    with ThreadPoolExecutor(max_workers=min(pool.size, len(keys))) as executor:
+        reports = list(executor.map(lambda key: run_tests(codes[key], language, tests, pool), keys))
+
+    logger.info(f"Ran {len(tests)} tests for {len(keys)} submissions")
+    return dict(zip(keys, reports))
@@ -0,0 +1,173 @@
+"""
+EduCode Backend - Test Execution Cache
+
+Memoizes sandboxed test runs in the cached_test_runs table, keyed by the
+normalized submission hash plus a hash of the task's test set. Regrading and
+identical resubmissions reuse stored results; execution reruns only when the
+code, the tests or the sandbox limits change. Unused entries are evicted by
+age and by a total size cap.
+"""
+
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Hashable, Sequence
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.cached_test_run import CachedTestRun
+from app.services.dedup import program_hash
+from app.services.execution import (
+    SUPPORTED_LANGUAGES, TestResult, TestRunReport, run_submissions_tests
+)
+
+logger = logging.getLogger(__name__)
+
+# Bump when the harness or output comparison changes so old results are not reused
+EXECUTION_CACHE_VERSION = 1
+
+
+def test_set_hash(language: str, tests: Sequence) -> str:
+    """SHA-256 of everything besides the code that determines a test run's outcome."""
+    payload = {
+        "version": EXECUTION_CACHE_VERSION,
+        "language": language,
+        "memory_mb": settings.TEST_SANDBOX_MEMORY_MB,
+        "max_output_kb": settings.TEST_SANDBOX_MAX_OUTPUT_KB,
+        "tests": [
+            [test.id, test.test_input, test.expected_output, test.weight, test.timeout_seconds]
+            for test in tests
+        ],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _is_cacheable(report: TestRunReport) -> bool:
+    """Timeouts depend on machine load and sandbox failures are transient: rerun those."""
+    return report.score is not None and all(
+        result.status != "timeout" and not (result.error or "").startswith("Sandbox")
+        for result in report.results
+    )
+
+
+def _report_from_row(row: CachedTestRun) -> TestRunReport:
+    return TestRunReport(
+        score=row.score,
+        passed=row.passed,
+        total=row.total,
+        results=[TestResult(**result) for result in row.results_data]
+    )
+
+
+def run_submissions_tests_cached(
+    db: Session,
+    codes: Dict[Hashable, str],
+    language: Any,
+    tests: Sequence
+) -> Dict[Hashable, TestRunReport]:
+    """
+    Run submissions against a task's tests, reusing cached results.
+
+    Identical code (after normalization) is executed at most once, both
+    within the batch and across grading runs. The caller is responsible for
+    committing the session.
+
+    Args:
+        db: Synchronous database session
+        codes: Submission code keyed by e.g. submission ID
+        language: Task language (ProgrammingLanguage or its value)
+        tests: TaskTest rows shared by all submissions
+
+    Returns:
+        TestRunReport per key of ``codes``
+    """
+    language = getattr(language, "value", language)
+    if not codes or not tests or language not in SUPPORTED_LANGUAGES:
+        return run_submissions_tests(codes, language, tests)
+
+    tests = list(tests)
+    set_hash = test_set_hash(language, tests)
+    code_hashes = {key: program_hash(code) for key, code in codes.items()}
+
+    cached = {
+        row.code_hash: row
+        for row in db.query(CachedTestRun).filter(
+            CachedTestRun.test_set_hash == set_hash,
+            CachedTestRun.code_hash.in_(set(code_hashes.values()))
+        ).all()
+    }
+    reports = {code_hash: _report_from_row(row) for code_hash, row in cached.items()}
+
+    if cached:
+        db.query(CachedTestRun).filter(
+            CachedTestRun.id.in_([row.id for row in cached.values()])
+        ).update({
+            "last_used_at": func.now(),
+            "hit_count": CachedTestRun.hit_count + 1
+        }, synchronize_session=False)
+
+    # Run each distinct missing code version once
+    missing = {}
+    for key, code_hash in code_hashes.items():
+        if code_hash not in reports and code_hash not in missing:
+            missing[code_hash] = codes[key]
+
+    if missing:
+        fresh = run_submissions_tests(missing, language, tests)
+        reports.update(fresh)
+
+        rows = [
+            {
+                "code_hash": code_hash,
+                "test_set_hash": set_hash,
+                "score": report.score,
+                "passed": report.passed,
+                "total": report.total,
+                "results": json.dumps([result._asdict() for result in report.results]),
+            }
+            for code_hash, report in fresh.items()
+            if _is_cacheable(report)
+        ]
+        if rows:
+            db.execute(insert(CachedTestRun).values(rows).on_conflict_do_nothing(
+                constraint="unique_cached_test_run_key"
+            ))
+
+    logger.info(
+        f"Test results for {len(codes)} submissions: {len(cached)} cached, "
+        f"{len(missing)} executed"
+    )
+    return {key: reports[code_hash] for key, code_hash in code_hashes.items()}
+
+
+def evict_cached_test_runs(db: Session) -> int:
+    """
+    Evict cache entries unused for TEST_RESULT_CACHE_TTL_DAYS, then the least
+    recently used ones beyond TEST_RESULT_CACHE_MAX_ENTRIES.
+
+    The caller is responsible for committing the session.
+
+    Returns:
+        Number of evicted entries
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.TEST_RESULT_CACHE_TTL_DAYS)
+    evicted = db.query(CachedTestRun).filter(
+        CachedTestRun.last_used_at < cutoff
+    ).delete(synchronize_session=False)
+
+    overflow = db.query(func.count(CachedTestRun.id)).scalar() - settings.TEST_RESULT_CACHE_MAX_ENTRIES
+    if overflow > 0:
+        oldest = db.query(CachedTestRun.id).order_by(
+            CachedTestRun.last_used_at, CachedTestRun.id
+        ).limit(overflow).subquery()
+        evicted += db.query(CachedTestRun).filter(
+            CachedTestRun.id.in_(oldest.select())
+        ).delete(synchronize_session=False)
+
+    if evicted:
+        logger.info(f"Evicted {evicted} cached test runs")
+    return evicted
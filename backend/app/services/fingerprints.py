@@ -0,0 +1,260 @@
+"""
+EduCode Backend - Fingerprint Service
+
+Computes and persists per-document similarity fingerprints for submissions
+and AI solutions. Fingerprints are written together with the code and are
+invalidated by version, content hash and task language, so grading and
+similarity jobs can work from stored features instead of re-processing raw
+source code.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.ai_solution import AISolution
+from app.models.code_fingerprint import CodeFingerprint
+from app.models.submission import Submission
+from app.models.task import Task
+from app.services.dedup import program_hash
+from app.services.similarity import DocumentFeatures, similarity_calculator
+from app.utils.lexer import lex
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the feature extraction changes so stored fingerprints are rebuilt
+FINGERPRINT_VERSION = 8
+
+# MinHash configuration (fixed seed keeps signatures comparable across workers)
+MINHASH_PERMUTATIONS = 128
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_random = np.random.RandomState(1)
+_PERM_A = _random.randint(1, 1 << 31, size=MINHASH_PERMUTATIONS).astype(np.uint64)
+_PERM_B = _random.randint(0, 1 << 31, size=MINHASH_PERMUTATIONS).astype(np.uint64)
+
+
+def hash_code(code: str) -> str:
+    """Return the SHA-256 hex digest of a code string."""
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def sql_hash_code(column):
+    """SQL counterpart of ``hash_code``, so current hashes are checked without loading the code."""
+    return func.encode(func.sha256(func.convert_to(column, literal_column("'UTF8'"))), "hex")
+
+
+def minhash_signature(values: Iterable[int], num_perm: int = MINHASH_PERMUTATIONS) -> List[int]:
+    """
+    Compute a MinHash signature for a set of 32-bit hashed shingles.
+
+    Args:
+        values: Shingle hashes of the document (e.g. winnowed k-gram fingerprints)
+        num_perm: Number of hash permutations (signature length)
+
+    Returns:
+        Signature as a list of integers; all-max for an empty document
+    """
+    hashes = np.array(sorted(set(values)), dtype=np.uint64)
+
+    if hashes.size == 0:
+        return [int(_MAX_HASH)] * num_perm
+
+    permuted = (hashes[:, None] * _PERM_A[None, :num_perm] + _PERM_B[None, :num_perm]) % _MERSENNE_PRIME
+    return (permuted & _MAX_HASH).min(axis=0).astype(np.int64).tolist()
+
+
+def compute_fingerprint(code: str, language: str = "python") -> Dict[str, Any]:
+    """
+    Compute all fingerprint features of a code document.
+
+    Args:
+        code: Source code
+        language: Programming language of the code
+
+    Returns:
+        Dict with the CodeFingerprint column values (JSON fields serialized)
+    """
+    tokens = lex(code, language)
+    features = similarity_calculator.build_document(code, tokens, language)
+    normalized = " ".join(token.text for token in tokens)
+
+    return {
+        "version": FINGERPRINT_VERSION,
+        "language": language,
+        "content_hash": hash_code(code),
+        "program_hash": program_hash(code),
+        "normalized_hash": hash_code(normalized),
+        "token_counts": json.dumps(dict(features.tokens)),
+        "subtree_hashes": json.dumps(sorted(features.subtrees.elements())),
+        "minhash": json.dumps(minhash_signature(features.fingerprints)),
+        "winnow": json.dumps(sorted(features.fingerprints)),
+    }
+
+
+def _is_current(fingerprint: Optional[CodeFingerprint], content_hash: str, language: str) -> bool:
+    return (
+        fingerprint is not None
+        and fingerprint.version == FINGERPRINT_VERSION
+        and fingerprint.content_hash == content_hash
+        and fingerprint.language == language
+    )
+
+
+def is_fingerprint_current(fingerprint: Optional[CodeFingerprint], code: str, language: str = "python") -> bool:
+    """Check whether a stored fingerprint still matches the given code and language."""
+    return _is_current(fingerprint, hash_code(code), language)
+
+
+def fingerprint_to_features(fingerprint: CodeFingerprint) -> DocumentFeatures:
+    """Rebuild similarity document features from a stored fingerprint."""
+    return DocumentFeatures(
+        empty=fingerprint.normalized_hash == hash_code(""),
+        tokens=fingerprint.token_counts_data,
+        subtrees=fingerprint.subtree_hashes_data,
+        fingerprints=fingerprint.winnow_data
+    )
+
+
+def _apply_fingerprint(fingerprint: Optional[CodeFingerprint], code: str, language: str, **owner) -> CodeFingerprint:
+    """Create or refresh a fingerprint object in place."""
+    values = compute_fingerprint(code, language)
+
+    if fingerprint is None:
+        return CodeFingerprint(**owner, **values)
+
+    for field, value in values.items():
+        setattr(fingerprint, field, value)
+    return fingerprint
+
+
+async def save_fingerprint(
+    db: AsyncSession,
+    code: str,
+    language: str = "python",
+    submission_id: Optional[int] = None,
+    ai_solution_id: Optional[int] = None
+) -> CodeFingerprint:
+    """
+    Create or refresh the fingerprint of a submission or AI solution.
+
+    The fingerprint is only recomputed when the code's content hash or the
+    language changed.
+    The caller is responsible for committing the session.
+
+    Args:
+        db: Database session
+        code: Current code of the owner
+        language: Programming language of the code
+        submission_id: Owning submission ID
+        ai_solution_id: Owning AI solution ID
+
+    Returns:
+        The up-to-date CodeFingerprint
+    """
+    if (submission_id is None) == (ai_solution_id is None):
+        raise ValueError("Exactly one of submission_id or ai_solution_id must be provided")
+
+    if submission_id is not None:
+        owner = {"submission_id": submission_id}
+        query = select(CodeFingerprint).where(CodeFingerprint.submission_id == submission_id)
+    else:
+        owner = {"ai_solution_id": ai_solution_id}
+        query = select(CodeFingerprint).where(CodeFingerprint.ai_solution_id == ai_solution_id)
+
+    result = await db.execute(query)
+    fingerprint = result.scalar_one_or_none()
+
+    if is_fingerprint_current(fingerprint, code, language):
+        return fingerprint
+
+    fingerprint = _apply_fingerprint(fingerprint, code, language, **owner)
+    db.add(fingerprint)
+    return fingerprint
+
+
+def load_fingerprints(
+    db: Session,
+    submission_ids: Iterable[int] = (),
+    ai_solution_ids: Iterable[int] = ()
+) -> Tuple[Dict[int, CodeFingerprint], Dict[int, CodeFingerprint]]:
+    """
+    Load fingerprints for submissions and AI solutions (synchronous, for workers).
+
+    Missing fingerprints, and those whose version, content hash or language
+    no longer match the owner, are backfilled from the owner's code. Current
+    hashes are computed in the database, so only stale rows ever have their
+    source loaded. The caller is responsible for committing the session.
+
+    Args:
+        db: Synchronous database session
+        submission_ids: Submission IDs to load
+        ai_solution_ids: AI solution IDs to load
+
+    Returns:
+        Tuple of (submission_id -> fingerprint, ai_solution_id -> fingerprint)
+    """
+    submission_ids = list(submission_ids)
+    ai_solution_ids = list(ai_solution_ids)
+
+    by_submission: Dict[int, CodeFingerprint] = {}
+    by_ai_solution: Dict[int, CodeFingerprint] = {}
+
+    if submission_ids:
+        for fingerprint in db.query(CodeFingerprint).filter(CodeFingerprint.submission_id.in_(submission_ids)):
+            by_submission[fingerprint.submission_id] = fingerprint
+    if ai_solution_ids:
+        for fingerprint in db.query(CodeFingerprint).filter(CodeFingerprint.ai_solution_id.in_(ai_solution_ids)):
+            by_ai_solution[fingerprint.ai_solution_id] = fingerprint
+
+    stale_submissions = []
+    if submission_ids:
+        rows = db.query(Submission.id, sql_hash_code(Submission.code), Task.language).join(
+            Task, Submission.task_id == Task.id
+        ).filter(Submission.id.in_(submission_ids))
+        stale_submissions = [
+            submission_id for submission_id, content_hash, language in rows
+            if not _is_current(by_submission.get(submission_id), content_hash, language.value)
+        ]
+
+    stale_ai_solutions = []
+    if ai_solution_ids:
+        rows = db.query(AISolution.id, sql_hash_code(AISolution.code), Task.language).join(
+            Task, AISolution.task_id == Task.id
+        ).filter(AISolution.id.in_(ai_solution_ids))
+        stale_ai_solutions = [
+            ai_solution_id for ai_solution_id, content_hash, language in rows
+            if not _is_current(by_ai_solution.get(ai_solution_id), content_hash, language.value)
+        ]
+
+    if stale_submissions:
+        logger.info(f"Backfilling fingerprints for {len(stale_submissions)} submissions")
+        rows = db.query(Submission.id, Submission.code, Task.language).join(
+            Task, Submission.task_id == Task.id
+        ).filter(Submission.id.in_(stale_submissions))
+        for submission_id, code, language in rows:
+            fingerprint = _apply_fingerprint(
+                by_submission.get(submission_id), code, language.value, submission_id=submission_id
+            )
+            db.add(fingerprint)
+            by_submission[submission_id] = fingerprint
+
+    if stale_ai_solutions:
+        logger.info(f"Backfilling fingerprints for {len(stale_ai_solutions)} AI solutions")
+        rows = db.query(AISolution.id, AISolution.code, Task.language).join(
+            Task, AISolution.task_id == Task.id
+        ).filter(AISolution.id.in_(stale_ai_solutions))
+        for ai_solution_id, code, language in rows:
+            fingerprint = _apply_fingerprint(
+                by_ai_solution.get(ai_solution_id), code, language.value, ai_solution_id=ai_solution_id
+            )
+            db.add(fingerprint)
+            by_ai_solution[ai_solution_id] = fingerprint
+
+    return by_submission, by_ai_solution
@@ -0,0 +1,176 @@
+"""
+EduCode Backend - LLM Response Cache
+
+Content-addressed cache of LLM responses in the cached_llm_responses table.
+The key is a hash of the provider and the complete request payload (model,
+temperature, token limit and prompt messages), so only byte-identical
+requests share a response. Only responses that parsed and validated are
+stored. Entries expire after LLM_CACHE_TTL_DAYS and the table is capped at
+LLM_CACHE_MAX_ENTRIES by the periodic cleanup task.
+
+The cache is best effort: if the database is unavailable the provider is
+called as if the cache were empty.
+"""
+
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Sequence, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import create_session_factory
+from app.models.cached_llm_response import CachedLLMResponse
+
+logger = logging.getLogger(__name__)
+
+# Bump when cached response shapes change so old entries are not reused
+LLM_CACHE_VERSION = 2
+
+
+def llm_cache_key(provider: str, request: Dict[str, Any]) -> str:
+    """SHA-256 of the provider and the full request payload."""
+    payload = {"version": LLM_CACHE_VERSION, "provider": provider, "request": request}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _ttl_cutoff() -> datetime:
+    return datetime.now(timezone.utc) - timedelta(days=settings.LLM_CACHE_TTL_DAYS)
+
+
+async def get_cached_llm_responses(keys: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Look up unexpired responses for many cache keys in one query.
+
+    Args:
+        keys: Cache keys from ``llm_cache_key``
+
+    Returns:
+        Cached responses by key (misses are absent)
+    """
+    if not settings.LLM_CACHE_ENABLED or not keys:
+        return {}
+
+    try:
+        session_factory = create_session_factory()
+        async with session_factory() as db:
+            result = await db.execute(
+                select(CachedLLMResponse).where(
+                    CachedLLMResponse.cache_key.in_(set(keys)),
+                    CachedLLMResponse.created_at >= _ttl_cutoff()
+                )
+            )
+            rows = result.scalars().all()
+            if rows:
+                await db.execute(
+                    update(CachedLLMResponse)
+                    .where(CachedLLMResponse.id.in_([row.id for row in rows]))
+                    .values(last_used_at=func.now(), hit_count=CachedLLMResponse.hit_count + 1)
+                )
+                await db.commit()
+            return {row.cache_key: row.response_data for row in rows}
+
+    except Exception as e:
+        logger.warning(f"[AI] LLM cache lookup failed: {str(e)}")
+        return {}
+
+
+async def store_llm_responses(entries: Sequence[Tuple[str, str, Dict[str, Any], Dict[str, Any]]]) -> None:
+    """
+    Store validated responses in one statement; existing entries are kept.
+
+    Args:
+        entries: (cache key, provider, request, response) tuples
+    """
+    if not settings.LLM_CACHE_ENABLED or not entries:
+        return
+
+    rows = {
+        key: {
+            "cache_key": key,
+            "provider": provider,
+            "model": request.get("model"),
+            "temperature": request.get("temperature"),
+            "response": json.dumps(response)
+        }
+        for key, provider, request, response in entries
+    }
+
+    try:
+        session_factory = create_session_factory()
+        async with session_factory() as db:
+            await db.execute(insert(CachedLLMResponse).values(list(rows.values())).on_conflict_do_nothing(
+                constraint="unique_cached_llm_response_key"
+            ))
+            await db.commit()
+
+    except Exception as e:
+        logger.warning(f"[AI] LLM cache store failed: {str(e)}")
+
+
+async def store_llm_response(key: str, provider: str, request: Dict[str, Any], response: Dict[str, Any]) -> None:
+    """Store one validated response; an existing entry for the key is kept."""
+    await store_llm_responses([(key, provider, request, response)])
+
+
+async def cached_llm_call(
+    provider: str,
+    request: Dict[str, Any],
+    call: Callable[[], Awaitable[Dict[str, Any]]],
+    lookup: bool = True
+) -> Dict[str, Any]:
+    """
+    Return the cached response to ``request`` or call the provider and cache it.
+
+    Args:
+        provider: AI provider name
+        request: Complete request payload sent to the provider
+        call: Performs the request and returns the parsed, validated
+            response (JSON-serializable); exceptions are not cached
+        lookup: Skip the lookup when the caller already checked the cache
+
+    Returns:
+        Response dict
+    """
+    key = llm_cache_key(provider, request)
+    if lookup:
+        cached = (await get_cached_llm_responses([key])).get(key)
+        if cached is not None:
+            logger.info(f"[AI] LLM cache hit for {provider} request {key[:12]}")
+            return cached
+
+    response = await call()
+    await store_llm_response(key, provider, request, response)
+    return response
+
+
+def evict_cached_llm_responses(db: Session) -> int:
+    """
+    Evict responses older than LLM_CACHE_TTL_DAYS, then the least recently
+    used ones beyond LLM_CACHE_MAX_ENTRIES.
+
+    The caller is responsible for committing the session.
+
+    Returns:
+        Number of evicted entries
+    """
+    evicted = db.query(CachedLLMResponse).filter(
+        CachedLLMResponse.created_at < _ttl_cutoff()
+    ).delete(synchronize_session=False)
+
+    overflow = db.query(func.count(CachedLLMResponse.id)).scalar() - settings.LLM_CACHE_MAX_ENTRIES
+    if overflow > 0:
+        oldest = db.query(CachedLLMResponse.id).order_by(
+            CachedLLMResponse.last_used_at, CachedLLMResponse.id
+        ).limit(overflow).subquery()
+        evicted += db.query(CachedLLMResponse).filter(
+            CachedLLMResponse.id.in_(oldest.select())
+        ).delete(synchronize_session=False)
+
+    if evicted:
+        logger.info(f"Evicted {evicted} cached LLM responses")
+    return evicted
@@ -0,0 +1,75 @@
+"""
+EduCode Backend - LLM Request Limits
+
+Client-side limits for fanning out LLM API calls: a token bucket that
+bounds the request rate and a helper that runs coroutines with a cap on how
+many are in flight. Both are created inside the event loop that uses them.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Callable, List, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    Async token bucket.
+
+    Holds up to ``burst`` tokens and refills at ``rate`` tokens per second;
+    ``acquire`` waits until a token is available. A rate of 0 disables the
+    limit.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+
+        # Waiters queue on the lock, so tokens are handed out in FIFO order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+async def gather_limited(
+    function: Callable[..., Awaitable[T]],
+    items: Sequence,
+    concurrency: int,
+    bucket: Optional[TokenBucket] = None
+) -> List[object]:
+    """
+    Await ``function(item)`` for every item, at most ``concurrency`` at a time.
+
+    Args:
+        function: Coroutine function called with each item
+        items: Arguments, one call per item
+        concurrency: Maximum number of calls in flight
+        bucket: Optional rate limit; one token is taken per call
+
+    Returns:
+        Results aligned with ``items``; a call that raised is represented by
+        its exception
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(item):
+        async with semaphore:
+            if bucket is not None:
+                await bucket.acquire()
+            return await function(item)
+
+    return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
@@ -0,0 +1,187 @@
+"""
+EduCode Backend - MinHash LSH Index
+
+Locality-sensitive hashing over MinHash signatures of winnowed token k-grams.
+Used to find near-duplicate submission candidates in roughly linear time so
+that the exact (and expensive) hybrid similarity only runs on those pairs.
+"""
+
+import logging
+from collections import defaultdict
+from itertools import combinations
+from typing import Dict, List, Hashable, Iterable, Set, Tuple
+
+import numpy as np
+
+from app.services.parallel_similarity import pair_similarities_parallel
+from app.services.similarity import DocumentFeatures
+
+logger = logging.getLogger(__name__)
+
+
+def _false_positive_probability(threshold: float, bands: int, rows: int) -> float:
+    """Probability that a pair below the threshold becomes a candidate."""
+    xs = np.linspace(0.0, threshold, 50)
+    return float(np.mean(1 - (1 - xs ** rows) ** bands) * threshold)
+
+
+def _false_negative_probability(threshold: float, bands: int, rows: int) -> float:
+    """Probability that a pair above the threshold is missed."""
+    xs = np.linspace(threshold, 1.0, 50)
+    return float(np.mean((1 - xs ** rows) ** bands) * (1.0 - threshold))
+
+
+def optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Choose the (bands, rows) split minimizing false positives plus false negatives.
+
+    Args:
+        threshold: Estimated Jaccard threshold for candidate pairs
+        num_perm: Signature length
+
+    Returns:
+        Tuple of (bands, rows per band)
+    """
+    best, best_error = (1, num_perm), float("inf")
+
+    for bands in range(1, num_perm + 1):
+        max_rows = num_perm // bands
+        for rows in range(1, max_rows + 1):
+            error = (
+                _false_positive_probability(threshold, bands, rows) +
+                _false_negative_probability(threshold, bands, rows)
+            )
+            if error < best_error:
+                best, best_error = (bands, rows), error
+
+    return best
+
+
+class MinHashLSH:
+    """
+    Banded LSH index over MinHash signatures.
+
+    Signatures are split into bands; two documents become a candidate pair
+    when all rows of at least one band agree.
+    """
+
+    _band_cache: Dict[Tuple[float, int], Tuple[int, int]] = {}
+
+    def __init__(self, threshold: float = 0.5, num_perm: int = 128):
+        self.threshold = threshold
+        self.num_perm = num_perm
+
+        key = (round(threshold, 3), num_perm)
+        if key not in self._band_cache:
+            self._band_cache[key] = optimal_bands(threshold, num_perm)
+        self.bands, self.rows = self._band_cache[key]
+
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [defaultdict(list) for _ in range(self.bands)]
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def insert(self, key: Hashable, signature: Iterable[int]) -> None:
+        """Add a document signature to the index."""
+        signature = np.asarray(list(signature), dtype=np.int64)
+        if signature.size != self.num_perm:
+            raise ValueError(f"Signature length {signature.size} does not match num_perm {self.num_perm}")
+
+        self._signatures[key] = signature
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows]
+            self._buckets[band][chunk.tobytes()].append(key)
+
+    def query(self, signature: Iterable[int]) -> Set[Hashable]:
+        """Return keys of indexed documents that collide with a signature in any band."""
+        signature = np.asarray(list(signature), dtype=np.int64)
+        matches: Set[Hashable] = set()
+
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows]
+            matches.update(self._buckets[band].get(chunk.tobytes(), ()))
+
+        return matches
+
+    def candidate_pairs(self) -> Set[Tuple[Hashable, Hashable]]:
+        """
+        Return all candidate pairs whose estimated similarity reaches the threshold.
+
+        Bucket collisions are verified against the full signatures, so the
+        result contains no pairs from accidental single-band matches below the
+        threshold. Pairs are ordered by index insertion order.
+        """
+        order = {key: position for position, key in enumerate(self._signatures)}
+        pairs: Set[Tuple[Hashable, Hashable]] = set()
+
+        for buckets in self._buckets:
+            for keys in buckets.values():
+                if len(keys) < 2:
+                    continue
+                for a, b in combinations(keys, 2):
+                    pair = (a, b) if order[a] < order[b] else (b, a)
+                    if pair not in pairs and self.estimate(*pair) >= self.threshold:
+                        pairs.add(pair)
+
+        return pairs
+
+    def estimate(self, key_a: Hashable, key_b: Hashable) -> float:
+        """Estimated Jaccard similarity of two indexed documents."""
+        return estimate_jaccard(self._signatures[key_a], self._signatures[key_b])
+
+
+def estimate_jaccard(signature_a: Iterable[int], signature_b: Iterable[int]) -> float:
+    """Estimate Jaccard similarity as the fraction of agreeing MinHash values."""
+    a = np.asarray(list(signature_a))
+    b = np.asarray(list(signature_b))
+    return float(np.mean(a == b)) if a.size else 0.0
+
+
+def find_candidate_pairs(
+    signatures: Dict[Hashable, Iterable[int]],
+    threshold: float = 0.5,
+    num_perm: int = 128
+) -> Set[Tuple[Hashable, Hashable]]:
+    """
+    Find near-duplicate candidate pairs among documents.
+
+    Args:
+        signatures: Mapping of document key to MinHash signature
+        threshold: Estimated Jaccard threshold
+        num_perm: Signature length
+
+    Returns:
+        Set of (key_a, key_b) candidate pairs
+    """
+    index = MinHashLSH(threshold=threshold, num_perm=num_perm)
+    for key, signature in signatures.items():
+        index.insert(key, signature)
+
+    pairs = index.candidate_pairs()
+    logger.info(f"LSH found {len(pairs)} candidate pairs among {len(index)} documents")
+    return pairs
+
+
+def score_candidate_pairs(
+    documents: List[DocumentFeatures],
+    signatures: List[Iterable[int]],
+    threshold: float = 0.5,
+    method: str = "hybrid"
+) -> Dict[Tuple[int, int], float]:
+    """
+    Run the exact similarity only on LSH candidate pairs.
+
+    Args:
+        documents: Prepared documents
+        signatures: MinHash signatures aligned with ``documents``
+        threshold: Estimated Jaccard threshold for candidates
+        method: Exact similarity method applied to candidates
+
+    Returns:
+        Mapping of (i, j) index pairs (i < j) to exact similarity scores
+    """
+    pairs = sorted(find_candidate_pairs(dict(enumerate(signatures)), threshold))
+    scores = pair_similarities_parallel(documents, pairs, method)
+    return {pair: float(score) for pair, score in zip(pairs, scores)}
+
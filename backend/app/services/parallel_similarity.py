@@ -0,0 +1,185 @@
+"""
+EduCode Backend - Parallel Similarity Execution
+
+Shards CPU-bound similarity work (feature extraction, similarity matrices
+and candidate pair scoring) across a process pool. Every shard fits its
+features over the whole corpus and shards are merged in input order, so the
+result is identical to the serial computation. Small workloads and
+single-CPU workers run in-process.
+
+Daemonic processes cannot start a process pool, and the children of
+Celery's default prefork pool are daemonic. Similarity work therefore runs
+serially there, with a warning; the similarity tasks are routed to
+``similarity_queue``, whose worker must use a non-daemonic pool
+(``--pool=solo``, see DEPLOYMENT.md) for SIMILARITY_WORKERS to take effect.
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.similarity import SIMILARITY_METHODS, DocumentFeatures, similarity_calculator
+
+logger = logging.getLogger(__name__)
+
+# Documents shared with pool workers through the initializer, so they are
+# transferred once per worker instead of once per shard
+_worker_documents: List[DocumentFeatures] = []
+
+_warned_daemonic = False
+
+
+def similarity_workers() -> int:
+    """
+    Number of processes used for similarity work.
+
+    Always 1 inside a daemonic process (e.g. a Celery prefork pool child),
+    which is not allowed to start the pool.
+    """
+    global _warned_daemonic
+
+    workers = settings.SIMILARITY_WORKERS if settings.SIMILARITY_WORKERS > 0 else os.cpu_count() or 1
+
+    if workers > 1 and multiprocessing.current_process().daemon:
+        if not _warned_daemonic:
+            logger.warning(
+                f"Similarity work runs serially: SIMILARITY_WORKERS={workers} needs a non-daemonic "
+                f"worker process (run the similarity_queue worker with --pool=solo)"
+            )
+            _warned_daemonic = True
+        return 1
+
+    return workers
+
+
+def _shard_bounds(count: int, shards: int) -> List[Tuple[int, int]]:
+    """Split ``range(count)`` into at most ``shards`` contiguous, near-equal ranges."""
+    shards = max(1, min(shards, count))
+    edges = np.linspace(0, count, shards + 1).astype(int)
+    return [(int(start), int(stop)) for start, stop in zip(edges[:-1], edges[1:]) if stop > start]
+
+
+def _should_parallelize(document_count: int, workers: int) -> bool:
+    return workers > 1 and document_count >= settings.SIMILARITY_PARALLEL_MIN_DOCUMENTS
+
+
+def _init_worker(documents: List[DocumentFeatures]) -> None:
+    global _worker_documents
+    _worker_documents = documents
+
+
+def _prepare_shard(shard: Tuple[List[str], List[str]]) -> List[DocumentFeatures]:
+    codes, languages = shard
+    return similarity_calculator.prepare_documents(codes, languages)
+
+
+def _score_rows_shard(shard: Tuple[int, int, str]) -> np.ndarray:
+    start, stop, method = shard
+    return similarity_calculator.calculate_row_similarities(_worker_documents, np.arange(start, stop), method)
+
+
+def _score_pairs_shard(shard: Tuple[List[Tuple[int, int]], str]) -> np.ndarray:
+    pairs, method = shard
+    return similarity_calculator.calculate_pair_similarities(_worker_documents, pairs, method)
+
+
+def _run_sharded(
+    function: Callable,
+    shards: Sequence,
+    workers: int,
+    documents: Optional[List[DocumentFeatures]] = None
+) -> list:
+    """
+    Map ``function`` over shards in a process pool.
+
+    Pool failures propagate to the caller's task.
+
+    Returns:
+        Shard results in input order
+    """
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(shards)),
+        initializer=_init_worker,
+        initargs=(documents or [],)
+    ) as executor:
+        return list(executor.map(function, shards))
+
+
+def prepare_documents_parallel(codes: List[str], languages: Optional[List[str]] = None) -> List[DocumentFeatures]:
+    """
+    Prepare similarity features for many code snippets in parallel.
+
+    Args:
+        codes: Code snippets
+        languages: Programming language of each snippet (Python by default)
+
+    Returns:
+        Prepared documents aligned with ``codes``
+    """
+    languages = languages or ["python"] * len(codes)
+    workers = similarity_workers()
+
+    if _should_parallelize(len(codes), workers):
+        # Several shards per worker balance uneven snippet sizes
+        shards = [(codes[start:stop], languages[start:stop]) for start, stop in _shard_bounds(len(codes), workers * 4)]
+        results = _run_sharded(_prepare_shard, shards, workers)
+        return [document for shard in results for document in shard]
+
+    return similarity_calculator.prepare_documents(codes, languages)
+
+
+def feature_matrix_parallel(documents: List[DocumentFeatures], num_rows: int, method: str = "hybrid") -> np.ndarray:
+    """
+    Parallel version of ``SimilarityCalculator.calculate_feature_matrix``.
+
+    Rows are split into one contiguous block per worker and stacked in order.
+
+    Args:
+        documents: Prepared documents; the first ``num_rows`` are compared
+            against all of them
+        num_rows: Number of leading documents used as matrix rows
+        method: Similarity method
+
+    Returns:
+        Array of shape (num_rows, len(documents)) with scores in [0, 1]
+    """
+    workers = similarity_workers()
+
+    if num_rows > 1 and method in SIMILARITY_METHODS and _should_parallelize(len(documents), workers):
+        shards = [(start, stop, method) for start, stop in _shard_bounds(num_rows, workers)]
+        results = _run_sharded(_score_rows_shard, shards, workers, documents)
+        logger.info(f"Scored {num_rows}x{len(documents)} similarity matrix in {len(shards)} shards")
+        return np.vstack(results)
+
+    return similarity_calculator.calculate_feature_matrix(documents, num_rows, method)
+
+
+def pair_similarities_parallel(
+    documents: List[DocumentFeatures],
+    pairs: List[Tuple[int, int]],
+    method: str = "hybrid"
+) -> np.ndarray:
+    """
+    Parallel version of ``SimilarityCalculator.calculate_pair_similarities``.
+
+    Args:
+        documents: Prepared documents
+        pairs: (i, j) index pairs into ``documents``
+        method: Similarity method
+
+    Returns:
+        Array of len(pairs) scores in [0, 1], aligned with ``pairs``
+    """
+    workers = similarity_workers()
+
+    if len(pairs) > 1 and method in SIMILARITY_METHODS and _should_parallelize(len(documents), workers):
+        shards = [(pairs[start:stop], method) for start, stop in _shard_bounds(len(pairs), workers)]
+        results = _run_sharded(_score_pairs_shard, shards, workers, documents)
+        return np.concatenate(results)
+
+    return similarity_calculator.calculate_pair_similarities(documents, pairs, method)
@@ -0,0 +1,130 @@
+"""
+EduCode Backend - Rubric Grading
+
+Deterministic local grader. A task's GradingRubric combines the test
+correctness score with AI and group similarity penalties; all submissions
+of a task are scored in one vectorized pass. The rubric is the primary
+grader when the task's rubric or GRADING_MODE selects it, and the fallback
+for every LLM grading failure, so all fallback paths score alike.
+"""
+
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+from app.schemas.task import GradingRubric
+
+logger = logging.getLogger(__name__)
+
+GRADERS = ("llm", "rubric")
+
+
+class RubricScores(NamedTuple):
+    """Vectorized rubric results, one entry per submission."""
+    score: np.ndarray
+    correctness: np.ndarray
+    ai_penalty: np.ndarray
+    group_penalty: np.ndarray
+
+
+def load_rubric(task: Any) -> GradingRubric:
+    """The task's rubric, or the default rubric if it has none or it is invalid."""
+    raw = getattr(task, "grading_rubric", None)
+    if not raw:
+        return GradingRubric()
+    try:
+        return GradingRubric.model_validate_json(raw) if isinstance(raw, str) else GradingRubric.model_validate(raw)
+    except ValueError as e:
+        logger.warning(f"Invalid grading rubric for task {getattr(task, 'id', None)}, using defaults: {str(e)}")
+        return GradingRubric()
+
+
+def primary_grader(rubric: GradingRubric) -> str:
+    """Grader that produces scores: the rubric's choice, else GRADING_MODE."""
+    grader = rubric.grader or settings.GRADING_MODE
+    return grader if grader in GRADERS else "llm"
+
+
+def _penalty(similarity: np.ndarray, threshold: float, points: float) -> np.ndarray:
+    return points * np.clip((similarity - threshold) / (1.0 - threshold), 0.0, 1.0)
+
+
+def score_submissions(
+    rubric: GradingRubric,
+    correctness: Sequence[float],
+    ai_similarity: Sequence[float],
+    group_similarity: Sequence[float]
+) -> RubricScores:
+    """
+    Score many submissions with a rubric.
+
+    Args:
+        rubric: Grading rubric
+        correctness: Test correctness scores (0-100)
+        ai_similarity: AI similarity scores (0-1)
+        group_similarity: Group similarity scores (0-1)
+
+    Returns:
+        Integer scores and their components, aligned with the inputs
+    """
+    correctness = np.nan_to_num(np.asarray(correctness, dtype=float), nan=0.0)
+    ai_similarity = np.nan_to_num(np.asarray(ai_similarity, dtype=float), nan=0.0)
+    group_similarity = np.nan_to_num(np.asarray(group_similarity, dtype=float), nan=0.0)
+
+    base = rubric.correctness_weight * correctness + (1.0 - rubric.correctness_weight) * 100.0
+    ai_penalty = _penalty(ai_similarity, rubric.ai_similarity_threshold, rubric.ai_similarity_penalty)
+    group_penalty = _penalty(group_similarity, rubric.group_similarity_threshold, rubric.group_similarity_penalty)
+    score = np.clip(np.rint(base - ai_penalty - group_penalty), rubric.min_score, rubric.max_score).astype(int)
+
+    return RubricScores(score=score, correctness=base, ai_penalty=ai_penalty, group_penalty=group_penalty)
+
+
+def rubric_rationale(scores: RubricScores, index: int, label: str = "Rubric grading") -> str:
+    """Explain one rubric score by its components."""
+    return (
+        f"{label}: {scores.correctness[index]:.1f} correctness - {scores.ai_penalty[index]:.1f} AI similarity penalty "
+        f"- {scores.group_penalty[index]:.1f} group similarity penalty = {scores.score[index]}"
+    )
+
+
+def grade_contexts(
+    contexts: List[Dict[str, Any]],
+    rubric: Optional[GradingRubric] = None,
+    label: str = "Rubric grading"
+) -> List[Dict[str, Any]]:
+    """
+    Grade LLM grading contexts locally.
+
+    Args:
+        contexts: Dicts with correctness_score, ai_similarity and
+            intra_group_similarity
+        rubric: Grading rubric (defaults when omitted)
+        label: Rationale prefix
+
+    Returns:
+        Grade dicts (score, rationale) aligned with ``contexts``
+    """
+    if not contexts:
+        return []
+
+    scores = score_submissions(
+        rubric or GradingRubric(),
+        [context.get("correctness_score", 100) for context in contexts],
+        [context.get("ai_similarity") or 0.0 for context in contexts],
+        [context.get("intra_group_similarity") or 0.0 for context in contexts]
+    )
+    return [
+        {"score": int(scores.score[index]), "rationale": rubric_rationale(scores, index, label)}
+        for index in range(len(contexts))
+    ]
+
+
+def rubric_grade(
+    context: Dict[str, Any],
+    rubric: Optional[GradingRubric] = None,
+    label: str = "Rubric grading"
+) -> Dict[str, Any]:
+    """Grade a single grading context locally."""
+    return grade_contexts([context], rubric, label)[0]
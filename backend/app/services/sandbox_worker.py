@@ -0,0 +1,369 @@
+"""
+EduCode Backend - Sandbox Worker Process
+
+Standalone fork server used by the test runner (``app.services.execution``).
+It is started as ``python -I -S sandbox_worker.py CHECKS`` inside the
+isolation the engine sets up (bubblewrap: own user, pid, network, ipc and
+mount namespaces, a separate uid and only read-only system directories) and
+deliberately imports nothing from the application, so a warm worker is just
+a bare interpreter.
+
+On startup the worker verifies its isolation against ``CHECKS`` (the
+engine's uid and namespaces and paths that must be invisible) and reports
+the outcome as its first message; if anything is missing it exits without
+accepting jobs, so submissions never run unconfined.
+
+Each job carries one submission and all of its test inputs. The worker forks
+a single harness child per job that:
+- moves into a fresh temporary directory and its own process group,
+- applies CPU, address-space, file-size, open-file and process limits,
+- compiles the submission once and executes it as ``__main__`` for every
+  test input, with in-memory stdin/stdout and a per-test timer.
+
+Results are streamed back one JSON line per test. If the harness dies or
+hangs (e.g. in C code that ignores the timer) it is killed, the current test
+is failed and a fresh harness continues with the remaining tests. Expected
+outputs never enter the sandbox. Messages between the engine and the worker
+are length-prefixed JSON.
+"""
+
+import builtins
+import io
+import json
+import math
+import os
+import resource
+import select
+import shutil
+import signal
+import socket
+import struct
+import sys
+import tempfile
+import time
+import traceback
+
+# Bytes of stderr returned to the caller (the tail is the useful part)
+STDERR_TAIL = 2048
+
+# Seconds a harness may exceed a test's timeout before it is killed
+HARD_KILL_GRACE = 1.0
+
+# Interval at which an expired test timer fires again (defeats bare excepts)
+_TIMER_REPEAT = 0.05
+
+_HEADER = struct.Struct(">I")
+_RESULTS_FD = 3
+
+
+def read_message(stream):
+    """Read one length-prefixed JSON message, or None at end of stream."""
+    header = stream.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    (length,) = _HEADER.unpack(header)
+    return json.loads(stream.read(length).decode("utf-8"))
+
+
+def write_message(stream, message) -> None:
+    """Write one length-prefixed JSON message."""
+    data = json.dumps(message).encode("utf-8")
+    stream.write(_HEADER.pack(len(data)) + data)
+    stream.flush()
+
+
+class _TestTimeout(BaseException):
+    """Raised by the test timer inside the harness."""
+
+
+class _OutputLimit(BaseException):
+    """Raised when a test writes more than the output cap."""
+
+
+class _CappedBuffer(io.BytesIO):
+    """In-memory byte stream that refuses to grow beyond a limit."""
+
+    def __init__(self, limit: int):
+        super().__init__()
+        self.limit = limit
+
+    def write(self, data) -> int:
+        if self.tell() + len(data) > self.limit:
+            raise _OutputLimit()
+        return super().write(data)
+
+
+def _on_timer(signum, frame):
+    raise _TestTimeout()
+
+
+def _set_limit(name: str, value: int) -> None:
+    limit = getattr(resource, name, None)
+    if limit is not None:
+        try:
+            resource.setrlimit(limit, (value, value))
+        except (ValueError, OSError):
+            pass
+
+
+def _test_result(index: int, status: str, exit_code, stdout: str, stderr: str, duration: float):
+    return {
+        "index": index,
+        "status": status,
+        "exit_code": exit_code,
+        "stdout": stdout,
+        "stderr": stderr[-STDERR_TAIL:],
+        "duration": round(duration, 4),
+    }
+
+
+def _run_test(code, index: int, test, max_output: int):
+    """Execute the compiled submission once for a test input (inside the harness)."""
+    stdout_buffer = _CappedBuffer(max_output)
+    stderr_buffer = _CappedBuffer(max_output)
+    sys.stdin = io.TextIOWrapper(io.BytesIO(test["stdin"].encode("utf-8")), encoding="utf-8")
+    sys.stdout = io.TextIOWrapper(stdout_buffer, encoding="utf-8", write_through=True)
+    sys.stderr = io.TextIOWrapper(stderr_buffer, encoding="utf-8", write_through=True)
+
+    status, exit_code = "ok", 0
+    started = time.monotonic()
+    try:
+        signal.setitimer(signal.ITIMER_REAL, test["timeout"], _TIMER_REPEAT)
+        try:
+            exec(code, {"__name__": "__main__", "__builtins__": builtins})
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    except _TestTimeout:
+        status, exit_code = "timeout", None
+    except _OutputLimit:
+        status, exit_code = "output_limit", None
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            exit_code = e.code or 0
+        else:
+            exit_code = 1
+            stderr_buffer.seek(0, io.SEEK_END)
+            stderr_buffer.write(str(e.code).encode("utf-8")[:max_output - stderr_buffer.tell()])
+        status = "ok" if exit_code == 0 else "error"
+    except MemoryError:
+        status, exit_code = "memory_limit", 1
+    except BaseException:
+        status, exit_code = "error", 1
+        try:
+            traceback.print_exc()
+        except _OutputLimit:
+            pass
+    duration = time.monotonic() - started
+
+    return _test_result(
+        index, status, exit_code,
+        stdout_buffer.getvalue().decode("utf-8", errors="replace"),
+        stderr_buffer.getvalue().decode("utf-8", errors="replace"),
+        duration
+    )
+
+
+def _run_harness(job, start: int, workdir: str, results_fd: int) -> None:
+    """Harness child: confine the process and run tests ``start..`` in order. Never returns."""
+    status = 1
+    try:
+        os.setsid()
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+        os.dup2(results_fd, _RESULTS_FD)
+        os.closerange(_RESULTS_FD + 1, 65536)
+        os.chdir(workdir)
+
+        tests = job["tests"]
+        cpu_seconds = int(math.ceil(sum(test["timeout"] for test in tests[start:]))) + 1
+        _set_limit("RLIMIT_CPU", cpu_seconds)
+        _set_limit("RLIMIT_AS", job["memory_mb"] * 1024 * 1024)
+        _set_limit("RLIMIT_FSIZE", 1024 * 1024)
+        _set_limit("RLIMIT_NOFILE", 64)
+        _set_limit("RLIMIT_NPROC", 0)
+        _set_limit("RLIMIT_CORE", 0)
+
+        signal.signal(signal.SIGALRM, _on_timer)
+        sys.argv = ["submission"]
+        results = os.fdopen(_RESULTS_FD, "w", encoding="utf-8")
+
+        try:
+            code = compile(job["code"], "<submission>", "exec")
+        except (SyntaxError, ValueError) as e:
+            message = "".join(traceback.format_exception_only(type(e), e))
+            for index in range(start, len(tests)):
+                results.write(json.dumps(_test_result(index, "error", 1, "", message, 0.0)) + "\n")
+            results.flush()
+            status = 0
+            return
+
+        for index in range(start, len(tests)):
+            result = _run_test(code, index, tests[index], job["max_output"])
+            results.write(json.dumps(result) + "\n")
+            results.flush()
+
+        status = 0
+    finally:
+        os._exit(status)
+
+
+def _kill_group(pid: int) -> None:
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+def _run_batch(job, start: int, emit) -> int:
+    """
+    Run tests from ``start`` in one harness, emitting each result as it arrives.
+
+    Returns:
+        Index of the first test that still has to run
+    """
+    tests = job["tests"]
+    workdir = tempfile.mkdtemp(prefix="educode-run-")
+    try:
+        results_r, results_w = os.pipe()
+        started = time.monotonic()
+        pid = os.fork()
+        if pid == 0:
+            os.close(results_r)
+            _run_harness(job, start, workdir, results_w)
+        os.close(results_w)
+
+        index = start
+        pending = b""
+        failure = None
+        test_started = started
+        try:
+            while index < len(tests):
+                remaining = test_started + tests[index]["timeout"] + HARD_KILL_GRACE - time.monotonic()
+                if remaining <= 0:
+                    failure = "timeout"
+                    break
+                ready, _, _ = select.select([results_r], [], [], remaining)
+                if not ready:
+                    continue
+
+                chunk = os.read(results_r, 65536)
+                if not chunk:
+                    failure = "error"
+                    break
+                pending += chunk
+                if len(pending) > 4 * job["max_output"] + 65536:
+                    failure = "output_limit"
+                    break
+
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    try:
+                        result = json.loads(line)
+                    except ValueError:
+                        result = None
+                    if not isinstance(result, dict) or result.get("index") != index:
+                        failure = "error"
+                        break
+                    emit(result)
+                    index += 1
+                    test_started = time.monotonic()
+                if failure:
+                    break
+        finally:
+            os.close(results_r)
+            _kill_group(pid)
+
+        _, wait_status = os.waitpid(pid, 0)
+
+        if index < len(tests):
+            exit_code = os.waitstatus_to_exitcode(wait_status)
+            if failure == "error" and exit_code == -signal.SIGXCPU:
+                failure = "timeout"
+            message = f"Test harness stopped ({failure}, exit code {exit_code})"
+            emit(_test_result(index, failure or "error", exit_code, "", message, time.monotonic() - test_started))
+            index += 1
+
+        return index
+
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def execute(job, emit) -> None:
+    """
+    Run a submission against all of a job's tests.
+
+    Args:
+        job: Dict with code, tests (list of {stdin, timeout}), memory_mb
+            and max_output (bytes)
+        emit: Called with each test result dict (index, status ('ok',
+            'error', 'timeout', 'memory_limit', 'output_limit'), exit_code,
+            stdout, stderr, duration) in test order
+    """
+    index = 0
+    while index < len(job["tests"]):
+        try:
+            index = _run_batch(job, index, emit)
+        except Exception as e:
+            emit(_test_result(index, "error", None, "", f"Sandbox failure: {e}", 0.0))
+            index += 1
+
+
+def isolation_problems(checks) -> list:
+    """
+    Reasons this process is not isolated from the engine (empty when it is).
+
+    Args:
+        checks: Dict with engine_uid, namespaces ({name: inode} of the
+            engine's /proc/self/ns entries) and hidden_paths
+    """
+    problems = []
+
+    uid = os.getuid()
+    if uid == 0 or uid == checks["engine_uid"]:
+        problems.append(f"runs as uid {uid}")
+
+    for name, inode in checks["namespaces"].items():
+        try:
+            if os.stat(f"/proc/self/ns/{name}").st_ino == inode:
+                problems.append(f"shares the engine's {name} namespace")
+        except OSError:
+            problems.append(f"cannot inspect its {name} namespace")
+
+    try:
+        interfaces = [name for _, name in socket.if_nameindex() if name != "lo"]
+    except OSError:
+        interfaces = ["<unknown>"]
+    if interfaces:
+        problems.append(f"has network interfaces {', '.join(interfaces)}")
+
+    problems.extend(f"can see {path}" for path in checks["hidden_paths"] if os.path.exists(path))
+    return problems
+
+
+def serve(checks) -> None:
+    """Verify the isolation, then answer jobs from stdin until the parent closes the pipe."""
+    requests = os.fdopen(os.dup(0), "rb")
+    replies = os.fdopen(os.dup(1), "wb")
+
+    # Keep the protocol pipes away from anything that writes to fd 0/1
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+
+    problems = isolation_problems(checks) if checks else ["no isolation checks given"]
+    write_message(replies, {"isolated": not problems, "problems": problems})
+    if problems:
+        return
+
+    while True:
+        job = read_message(requests)
+        if job is None:
+            break
+        execute(job, lambda result: write_message(replies, result))
+        write_message(replies, {"done": True})
+
+
+if __name__ == "__main__":
+    serve(json.loads(sys.argv[1]) if len(sys.argv) > 1 else None)
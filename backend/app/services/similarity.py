@@ -2,66 +2,184 @@
 EduCode Backend - Similarity Service
 
 Code similarity analysis using multiple methods:
-- Token-based similarity (Jaccard coefficient)
-- Semantic similarity (using TF-IDF and cosine similarity)
-- Structural similarity (AST-based comparison)
+- Token-based similarity (Jaccard coefficient of canonical token n-grams)
+- Semantic similarity (TF-IDF of canonical token n-grams and cosine similarity)
+- Structural similarity (multiset of Merkle-style AST subtree hashes)
+- Winnowing similarity (MOSS-style k-gram fingerprint overlap)
 - Hybrid similarity (weighted combination)
+
+Pairwise methods compare two snippets at a time; the batch API
+(``calculate_similarity_matrix``) prepares every document once and computes
+the full N x (N + M) matrix with sparse matrix products.
 """
 
 import re
 import ast
+import hashlib
 import logging
-from typing import Dict, List, Any, Optional
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Iterable, Tuple
 
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+from scipy import sparse
+from sklearn.feature_extraction import DictVectorizer
+from sklearn.feature_extraction.text import TfidfTransformer
 from sklearn.metrics.pairwise import cosine_similarity
 
+from app.utils.code_norm import hash_kgrams, winnow
+from app.utils.lexer import Token, lex, token_ids
+
 logger = logging.getLogger(__name__)
 
+# Weights used to combine the individual methods into the hybrid score
+HYBRID_WEIGHTS = {"token": 0.4, "semantic": 0.4, "structural": 0.2}
 
-class SimilarityCalculator:
-    """Handles different types of code similarity calculations."""
+SIMILARITY_METHODS = ["token", "semantic", "structural", "winnow", "hybrid"]
+
+# Lengths of the canonical token-id n-grams compared by the token and semantic methods
+TOKEN_NGRAM_SIZES = (1, 2, 3)
+
+# Winnowing parameters: k-gram size (noise threshold) and window size
+WINNOW_K = 5
+WINNOW_WINDOW = 4
+
+# AST nodes folded into their parent's label instead of forming subtrees
+_AST_ANNOTATION_NODES = (ast.expr_context, ast.operator, ast.boolop, ast.cmpop, ast.unaryop)
+
+# Number of parsed documents whose subtree hashes are kept in memory
+SUBTREE_CACHE_SIZE = 4096
+
+
+def _stable_hash(label: str) -> int:
+    """Stable 32-bit hash (identical across processes, unlike ``hash``)."""
+    return int.from_bytes(hashlib.blake2b(label.encode("utf-8"), digest_size=4).digest(), "little")
+
+
+def _hash_subtrees(node: ast.AST, hashes: List[int]) -> Tuple[int, int]:
+    """
+    Hash a subtree bottom-up and collect the hashes of all non-trivial subtrees.
     
-    def __init__(self):
-        self.tfidf_vectorizer = TfidfVectorizer(
-            token_pattern=r'\b\w+\b',
-            lowercase=True,
-            stop_words=None
-        )
+    A node's hash combines its type with the ordered hashes of its children,
+    so equal hashes mean structurally identical subtrees. Identifiers and
+    literal values are ignored; single-node subtrees (names, constants) are
+    not collected since every program contains them.
     
-    def normalize_code(self, code: str) -> str:
-        """Normalize code by removing comments, extra whitespace, and standardizing formatting."""
-        # Remove single-line comments
-        code = re.sub(r'//.*$', '', code, flags=re.MULTILINE)
-        code = re.sub(r'#.*$', '', code, flags=re.MULTILINE)
-        
-        # Remove multi-line comments
-        code = re.sub(r'/\*.*?\*/', '', code, flags=re.DOTALL)
-        code = re.sub(r'""".*?"""', '', code, flags=re.DOTALL)
-        code = re.sub(r"'''.*?'''", '', code, flags=re.DOTALL)
-        
-        # Normalize whitespace
-        code = re.sub(r'\s+', ' ', code)
-        
-        # Remove extra spaces around operators and punctuation
-        code = re.sub(r'\s*([{}();,=+\-*/])\s*', r'\1', code)
+    Returns:
+        Tuple of (subtree hash, subtree size)
+    """
+    label = [type(node).__name__]
+    size = 1
+    
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, _AST_ANNOTATION_NODES):
+            label.append(type(child).__name__)
+            continue
+        child_hash, child_size = _hash_subtrees(child, hashes)
+        label.append(str(child_hash))
+        size += child_size
+    
+    subtree_hash = _stable_hash(":".join(label))
+    if size > 1:
+        hashes.append(subtree_hash)
+    return subtree_hash, size
+
+
+@lru_cache(maxsize=SUBTREE_CACHE_SIZE)
+def _parse_subtree_hashes(code: str) -> Optional[Tuple[int, ...]]:
+    """Sorted subtree hashes of Python code, or None if it does not parse."""
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+    
+    hashes: List[int] = []
+    _hash_subtrees(tree, hashes)
+    return tuple(sorted(hashes))
+
+
+def multiset_items(counts: Counter) -> List[Tuple[Any, int]]:
+    """
+    Expand a multiset into distinct (item, occurrence) pairs.
+    
+    The set Jaccard of the expanded items equals the multiset Jaccard
+    (sum of minimum counts over sum of maximum counts) of the originals.
+    """
+    return [(item, occurrence) for item, count in counts.items() for occurrence in range(count)]
+
+
+def token_ngrams(ids: np.ndarray, sizes: Iterable[int] = TOKEN_NGRAM_SIZES) -> Counter:
+    """
+    Count the n-grams of a canonical token-id array (see app.utils.lexer.token_ids).
+    
+    Identifiers and literals are canonicalized in the ids, so renaming
+    variables leaves the n-grams unchanged; the longer n-grams keep the
+    token order that a bag of canonical tokens would lose.
+    
+    Args:
+        ids: Token id array
+        sizes: N-gram lengths
         
-        return code.strip().lower()
+    Returns:
+        Counter keyed by the dot-joined ids of each n-gram
+    """
+    ids = [str(token_id) for token_id in ids.tolist()]
+    return Counter(
+        ".".join(ids[start:start + size])
+        for size in sizes
+        for start in range(len(ids) - size + 1)
+    )
+
+
+class DocumentFeatures:
+    """
+    Pre-computed features of a single code document.
+    
+    Built once per document so that batch comparisons never re-normalize,
+    re-tokenize or re-parse the same source.
     
-    def tokenize_code(self, code: str) -> List[str]:
+    Attributes:
+        empty: Whether the normalized source is empty
+        tokens: Canonical token n-gram multiset used by the Jaccard token
+            method and, as term counts, by the TF-IDF semantic method
+        subtrees: Multiset of AST subtree hashes used by the structural method
+        fingerprints: Winnowed k-gram hashes used by the winnow method
+    """
+    
+    __slots__ = ("empty", "tokens", "subtrees", "fingerprints")
+    
+    def __init__(
+        self,
+        empty: bool,
+        tokens: Iterable[str],
+        subtrees: Iterable[int],
+        fingerprints: Iterable[int] = ()
+    ):
+        self.empty = empty
+        self.tokens = Counter(tokens)
+        self.subtrees = Counter(subtrees)
+        self.fingerprints = set(fingerprints)
+
+
+class SimilarityCalculator:
+    """Handles different types of code similarity calculations."""
+    
+    def normalize_code(self, code: str, language: str = "python") -> str:
+        """Normalize code by removing comments and extra whitespace (single lexer pass)."""
+        return " ".join(self.tokenize_code(code, language))
+    
+    def tokenize_code(self, code: str, language: str = "python") -> List[str]:
         """Extract meaningful tokens from code."""
-        normalized = self.normalize_code(code)
-        
-        # Extract identifiers, keywords, operators, and literals
-        tokens = re.findall(r'\b\w+\b|[{}();,=+\-*/]', normalized)
-        
-        return [token for token in tokens if len(token) > 1 or token in '{}();,=+-*/']
+        return [token.text for token in lex(code, language)]
+    
+    def token_ngrams(self, code: str, language: str = "python") -> Counter:
+        """Canonical token n-gram counts of a code snippet (one lexer pass)."""
+        return token_ngrams(token_ids(lex(code, language)))
     
     def calculate_token_similarity(self, code1: str, code2: str) -> Dict[str, Any]:
-        """Calculate similarity based on token overlap (Jaccard coefficient)."""
-        tokens1 = set(self.tokenize_code(code1))
-        tokens2 = set(self.tokenize_code(code2))
+        """Calculate similarity based on canonical token n-gram overlap (Jaccard coefficient)."""
+        tokens1 = set(self.token_ngrams(code1))
+        tokens2 = set(self.token_ngrams(code2))
         
         if not tokens1 and not tokens2:
             return {"similarity": 1.0, "method": "token", "tokens1": 0, "tokens2": 0, "intersection": 0}
@@ -84,10 +202,10 @@ class SimilarityCalculator:
         }
     
     def calculate_semantic_similarity(self, code1: str, code2: str) -> Dict[str, Any]:
-        """Calculate semantic similarity using TF-IDF and cosine similarity."""
+        """Calculate semantic similarity using TF-IDF over canonical token n-grams and cosine similarity."""
         try:
             # Prepare documents
-            docs = [self.normalize_code(code1), self.normalize_code(code2)]
+            docs = [self.token_ngrams(code1), self.token_ngrams(code2)]
             
             if not docs[0] and not docs[1]:
                 return {"similarity": 1.0, "method": "semantic"}
@@ -96,7 +214,7 @@ class SimilarityCalculator:
                 return {"similarity": 0.0, "method": "semantic"}
             
             # Calculate TF-IDF vectors
-            tfidf_matrix = self.tfidf_vectorizer.fit_transform(docs)
+            tfidf_matrix = TfidfTransformer().fit_transform(DictVectorizer().fit_transform(docs))
             
             # Calculate cosine similarity
             similarity_matrix = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])
@@ -114,11 +232,11 @@ class SimilarityCalculator:
             return self.calculate_token_similarity(code1, code2)
     
     def calculate_structural_similarity(self, code1: str, code2: str) -> Dict[str, Any]:
-        """Calculate structural similarity based on AST comparison."""
+        """Calculate structural similarity based on shared AST subtrees."""
         try:
-            # Parse AST for both code snippets
-            ast1 = self._get_ast_structure(code1)
-            ast2 = self._get_ast_structure(code2)
+            # Subtree hashes for both code snippets (cached per document)
+            ast1 = self.get_subtree_hashes(code1)
+            ast2 = self.get_subtree_hashes(code2)
             
             if not ast1 and not ast2:
                 return {"similarity": 1.0, "method": "structural"}
@@ -141,20 +259,26 @@ class SimilarityCalculator:
             # Fallback to token similarity
             return self.calculate_token_similarity(code1, code2)
     
-    def _get_ast_structure(self, code: str) -> List[str]:
-        """Extract AST node types from code."""
-        try:
-            tree = ast.parse(code)
-            nodes = []
-            
-            for node in ast.walk(tree):
-                nodes.append(type(node).__name__)
-            
-            return nodes
+    def get_subtree_hashes(self, code: str, language: str = "python") -> List[int]:
+        """
+        Hash every AST subtree of the code bottom-up (Merkle-style).
+        
+        Parses are cached by code, so repeated comparisons of the same
+        document only walk its AST once.
+        
+        Args:
+            code: Source code snippet
+            language: Programming language; only Python is parsed into an AST
             
-        except SyntaxError:
-            # If Python parsing fails, try to extract basic structural elements
-            return self._extract_basic_structure(code)
+        Returns:
+            Sorted subtree hashes (with repeats)
+        """
+        hashes = _parse_subtree_hashes(code) if language == "python" else None
+        if hashes is not None:
+            return list(hashes)
+        
+        # Without a Python AST, hash basic structural elements instead
+        return sorted(_stable_hash(construct) for construct in self._extract_basic_structure(code))
     
     def _extract_basic_structure(self, code: str) -> List[str]:
         """Extract basic structural elements when AST parsing fails."""
@@ -178,21 +302,54 @@ class SimilarityCalculator:
         
         return structure
     
-    def _compare_ast_structures(self, ast1: List[str], ast2: List[str]) -> float:
-        """Compare two AST structures using set similarity."""
-        set1 = set(ast1)
-        set2 = set(ast2)
+    def _compare_ast_structures(self, ast1: List[int], ast2: List[int]) -> float:
+        """Compare two subtree hash multisets (sum of min counts over sum of max counts)."""
+        counts1 = Counter(ast1)
+        counts2 = Counter(ast2)
         
-        if not set1 and not set2:
+        if not counts1 and not counts2:
             return 1.0
         
-        if not set1 or not set2:
+        if not counts1 or not counts2:
             return 0.0
         
-        intersection = set1.intersection(set2)
-        union = set1.union(set2)
+        intersection = sum((counts1 & counts2).values())
+        union = sum((counts1 | counts2).values())
+        
+        return intersection / union if union else 0.0
+    
+    def winnow_fingerprints(self, tokens: List[Token]) -> List[int]:
+        """Select winnowed k-gram fingerprints from lexed tokens (identifier-insensitive)."""
+        return self._winnow_ids(token_ids(tokens))
+    
+    @staticmethod
+    def _winnow_ids(ids: np.ndarray) -> List[int]:
+        """Select winnowed k-gram fingerprints from a canonical token-id array."""
+        return winnow(hash_kgrams(ids, WINNOW_K), WINNOW_WINDOW)
+    
+    def calculate_winnow_similarity(self, code1: str, code2: str) -> Dict[str, Any]:
+        """Calculate MOSS-style similarity from the overlap of winnowed k-gram fingerprints."""
+        fingerprints1 = set(self.winnow_fingerprints(lex(code1)))
+        fingerprints2 = set(self.winnow_fingerprints(lex(code2)))
+        
+        if not fingerprints1 and not fingerprints2:
+            return {"similarity": 1.0, "method": "winnow", "fingerprints1": 0, "fingerprints2": 0, "shared": 0}
+        
+        if not fingerprints1 or not fingerprints2:
+            return {"similarity": 0.0, "method": "winnow", "fingerprints1": len(fingerprints1), "fingerprints2": len(fingerprints2), "shared": 0}
+        
+        shared = fingerprints1.intersection(fingerprints2)
+        union = fingerprints1.union(fingerprints2)
         
-        return len(intersection) / len(union) if union else 0.0
+        return {
+            "similarity": len(shared) / len(union),
+            "method": "winnow",
+            "fingerprints1": len(fingerprints1),
+            "fingerprints2": len(fingerprints2),
+            "shared": len(shared),
+            "k": WINNOW_K,
+            "window": WINNOW_WINDOW
+        }
     
     def calculate_hybrid_similarity(self, code1: str, code2: str) -> Dict[str, Any]:
         """Calculate hybrid similarity combining multiple methods."""
@@ -201,7 +358,7 @@ class SimilarityCalculator:
         structural_result = self.calculate_structural_similarity(code1, code2)
         
         # Weighted combination
-        weights = {"token": 0.4, "semantic": 0.4, "structural": 0.2}
+        weights = HYBRID_WEIGHTS
         
         hybrid_similarity = (
             weights["token"] * token_result["similarity"] +
@@ -227,7 +384,7 @@ class SimilarityCalculator:
         Args:
             code1: First code snippet
             code2: Second code snippet
-            method: Similarity method ('token', 'semantic', 'structural', 'hybrid')
+            method: Similarity method ('token', 'semantic', 'structural', 'winnow', 'hybrid')
             
         Returns:
             Similarity score between 0.0 and 1.0
@@ -238,10 +395,12 @@ class SimilarityCalculator:
             result = self.calculate_semantic_similarity(code1, code2)
         elif method == "structural":
             result = self.calculate_structural_similarity(code1, code2)
+        elif method == "winnow":
+            result = self.calculate_winnow_similarity(code1, code2)
         elif method == "hybrid":
             result = self.calculate_hybrid_similarity(code1, code2)
         else:
-            raise ValueError(f"Invalid method '{method}'. Use 'token', 'semantic', 'structural', or 'hybrid'")
+            raise ValueError(f"Invalid method '{method}'. Use 'token', 'semantic', 'structural', 'winnow', or 'hybrid'")
         
         # Ensure similarity is between 0 and 1
         return max(0.0, min(1.0, result["similarity"]))
@@ -253,7 +412,7 @@ class SimilarityCalculator:
         Args:
             code1: First code snippet
             code2: Second code snippet
-            method: Similarity method ('token', 'semantic', 'structural', 'hybrid')
+            method: Similarity method ('token', 'semantic', 'structural', 'winnow', 'hybrid')
             
         Returns:
             Detailed comparison results with similarity score and metadata
@@ -264,16 +423,245 @@ class SimilarityCalculator:
             result = self.calculate_semantic_similarity(code1, code2)
         elif method == "structural":
             result = self.calculate_structural_similarity(code1, code2)
+        elif method == "winnow":
+            result = self.calculate_winnow_similarity(code1, code2)
         elif method == "hybrid":
             result = self.calculate_hybrid_similarity(code1, code2)
         else:
-            raise ValueError(f"Invalid method '{method}'. Use 'token', 'semantic', 'structural', or 'hybrid'")
+            raise ValueError(f"Invalid method '{method}'. Use 'token', 'semantic', 'structural', 'winnow', or 'hybrid'")
         
         # Ensure similarity is between 0 and 1
         result["similarity"] = max(0.0, min(1.0, result["similarity"]))
         
         return result
 
+    def prepare_document(self, code: str, language: str = "python") -> DocumentFeatures:
+        """
+        Lex and parse a code snippet once.
+        
+        Args:
+            code: Source code snippet
+            language: Programming language of the snippet
+            
+        Returns:
+            DocumentFeatures reusable across any number of comparisons
+        """
+        return self.build_document(code, lex(code, language), language)
+    
+    def build_document(self, code: str, tokens: List[Token], language: str = "python") -> DocumentFeatures:
+        """
+        Build document features from an already lexed token stream.
+        
+        The token, semantic and winnow features all come from the one
+        canonical token-id array of the stream.
+        """
+        ids = token_ids(tokens)
+        return DocumentFeatures(
+            empty=not len(ids),
+            tokens=token_ngrams(ids),
+            subtrees=self.get_subtree_hashes(code, language),
+            fingerprints=self._winnow_ids(ids)
+        )
+    
+    def prepare_documents(self, codes: List[str], languages: Optional[List[str]] = None) -> List[DocumentFeatures]:
+        """Prepare features for a list of code snippets (Python unless ``languages`` is given)."""
+        languages = languages or ["python"] * len(codes)
+        return [self.prepare_document(code, language) for code, language in zip(codes, languages)]
+    
+    def calculate_similarity_matrix(
+        self,
+        submissions: List[str],
+        references: Optional[List[str]] = None,
+        method: str = "hybrid",
+        language: str = "python"
+    ) -> np.ndarray:
+        """
+        Calculate the similarity of every submission against every document.
+        
+        Each document is prepared exactly once, TF-IDF is fitted once over the
+        whole corpus and all pairwise scores are produced by sparse matrix
+        products instead of per-pair comparisons.
+        
+        Args:
+            submissions: N submission code snippets
+            references: Optional M reference snippets (e.g. AI solutions)
+            method: Similarity method ('token', 'semantic', 'structural', 'winnow', 'hybrid')
+            language: Programming language of all snippets
+            
+        Returns:
+            Array of shape (N, N + M); column j < N is submission j, column
+            N + k is reference k. The diagonal compares a submission with itself.
+        """
+        codes = list(submissions) + list(references or [])
+        documents = self.prepare_documents(codes, [language] * len(codes))
+        return self.calculate_feature_matrix(documents, len(submissions), method)
+    
+    def calculate_feature_matrix(self, documents: List[DocumentFeatures], num_rows: int, method: str = "hybrid") -> np.ndarray:
+        """
+        Calculate a similarity matrix from already prepared documents.
+        
+        Args:
+            documents: Prepared documents; the first ``num_rows`` are compared
+                against all of them
+            num_rows: Number of leading documents used as matrix rows
+            method: Similarity method ('token', 'semantic', 'structural', 'winnow', 'hybrid')
+            
+        Returns:
+            Array of shape (num_rows, len(documents)) with scores in [0, 1]
+        """
+        return self.calculate_row_similarities(documents, np.arange(num_rows), method)
+    
+    def calculate_row_similarities(self, documents: List[DocumentFeatures], rows: np.ndarray, method: str = "hybrid") -> np.ndarray:
+        """
+        Calculate the similarity of selected documents against all documents.
+        
+        Features are fitted over all documents, so any split of the rows
+        yields exactly the rows of the full matrix.
+        
+        Args:
+            documents: Prepared documents
+            rows: Indices of the documents used as matrix rows
+            method: Similarity method ('token', 'semantic', 'structural', 'winnow', 'hybrid')
+            
+        Returns:
+            Array of shape (len(rows), len(documents)) with scores in [0, 1]
+        """
+        if len(rows) == 0 or not documents:
+            self._validate_method(method)
+            return np.zeros((len(rows), len(documents)))
+        
+        return self._score_documents(documents, np.asarray(rows), np.arange(len(documents)), method, paired=False)
+    
+    def calculate_pair_similarities(self, documents: List[DocumentFeatures], pairs: List[Tuple[int, int]], method: str = "hybrid") -> np.ndarray:
+        """
+        Calculate similarities for selected document pairs only.
+        
+        Features are still fitted over all documents (e.g. one shared TF-IDF
+        vocabulary), but only the requested pairs are scored.
+        
+        Args:
+            documents: Prepared documents
+            pairs: (i, j) index pairs into ``documents``
+            method: Similarity method ('token', 'semantic', 'structural', 'winnow', 'hybrid')
+            
+        Returns:
+            Array of len(pairs) scores in [0, 1]
+        """
+        if not pairs:
+            self._validate_method(method)
+            return np.zeros(0)
+        
+        rows = np.array([i for i, _ in pairs])
+        cols = np.array([j for _, j in pairs])
+        return self._score_documents(documents, rows, cols, method, paired=True)
+    
+    @staticmethod
+    def _validate_method(method: str) -> None:
+        if method not in SIMILARITY_METHODS:
+            raise ValueError(f"Invalid method '{method}'. Use 'token', 'semantic', 'structural', 'winnow', or 'hybrid'")
+    
+    def _score_documents(self, documents: List[DocumentFeatures], rows: np.ndarray, cols: np.ndarray, method: str, paired: bool) -> np.ndarray:
+        """
+        Score documents ``rows`` against ``cols``.
+        
+        With ``paired=False`` the result is the full len(rows) x len(cols)
+        matrix; with ``paired=True`` rows[k] is compared with cols[k] only.
+        """
+        self._validate_method(method)
+        
+        if method == "token":
+            scores = self._token_scores(documents, rows, cols, paired)
+        elif method == "semantic":
+            scores = self._semantic_scores(documents, rows, cols, paired)
+        elif method == "structural":
+            scores = self._structural_scores(documents, rows, cols, paired)
+        elif method == "winnow":
+            scores = self._winnow_scores(documents, rows, cols, paired)
+        else:
+            scores = (
+                HYBRID_WEIGHTS["token"] * self._token_scores(documents, rows, cols, paired) +
+                HYBRID_WEIGHTS["semantic"] * self._semantic_scores(documents, rows, cols, paired) +
+                HYBRID_WEIGHTS["structural"] * self._structural_scores(documents, rows, cols, paired)
+            )
+        
+        return np.clip(scores, 0.0, 1.0)
+    
+    def _token_scores(self, documents, rows, cols, paired) -> np.ndarray:
+        """Jaccard similarity of canonical token n-gram sets."""
+        return self._jaccard_scores([doc.tokens for doc in documents], rows, cols, paired)
+    
+    def _structural_scores(self, documents, rows, cols, paired) -> np.ndarray:
+        """Multiset Jaccard similarity of AST subtree hashes."""
+        return self._jaccard_scores([multiset_items(doc.subtrees) for doc in documents], rows, cols, paired)
+    
+    def _winnow_scores(self, documents, rows, cols, paired) -> np.ndarray:
+        """Jaccard overlap of winnowed fingerprint sets."""
+        return self._jaccard_scores([doc.fingerprints for doc in documents], rows, cols, paired)
+    
+    def _semantic_scores(self, documents, rows, cols, paired) -> np.ndarray:
+        """TF-IDF cosine similarity of canonical token n-grams using a single fit over all documents."""
+        try:
+            counts = DictVectorizer().fit_transform([doc.tokens for doc in documents])
+            if counts.shape[1] == 0:
+                raise ValueError("empty vocabulary")
+            
+            # TF-IDF rows are L2-normalized, so the dot product is the cosine
+            tfidf = TfidfTransformer().fit_transform(counts)
+            scores = self._dot(tfidf, rows, cols, paired)
+            
+        except Exception as e:
+            logger.warning(f"Semantic similarity calculation failed: {str(e)}")
+            # Fallback to token similarity
+            return self._token_scores(documents, rows, cols, paired)
+        
+        empty = np.array([doc.empty for doc in documents])
+        return self._apply_empty_rules(scores, *self._expand(empty, rows, cols, paired))
+    
+    def _jaccard_scores(self, sets: List[Iterable], rows: np.ndarray, cols: np.ndarray, paired: bool) -> np.ndarray:
+        """Jaccard coefficients via a sparse incidence matrix product."""
+        vocabulary: Dict[str, int] = {}
+        entries_rows, entries_cols = [], []
+        
+        for i, items in enumerate(sets):
+            for item in items:
+                entries_rows.append(i)
+                entries_cols.append(vocabulary.setdefault(item, len(vocabulary)))
+        
+        incidence = sparse.csr_matrix(
+            (np.ones(len(entries_rows)), (entries_rows, entries_cols)),
+            shape=(len(sets), max(len(vocabulary), 1))
+        )
+        
+        intersection = self._dot(incidence, rows, cols, paired)
+        sizes = np.asarray(incidence.sum(axis=1)).ravel()
+        row_sizes, col_sizes = self._expand(sizes, rows, cols, paired)
+        union = row_sizes + col_sizes - intersection
+        
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.where(union > 0, intersection / union, 0.0)
+        
+        return self._apply_empty_rules(scores, row_sizes == 0, col_sizes == 0)
+    
+    @staticmethod
+    def _dot(vectors: sparse.csr_matrix, rows: np.ndarray, cols: np.ndarray, paired: bool) -> np.ndarray:
+        """Row dot products: full matrix, or element-wise for aligned pairs."""
+        if paired:
+            return np.asarray(vectors[rows].multiply(vectors[cols]).sum(axis=1)).ravel()
+        return (vectors[rows] @ vectors[cols].T).toarray()
+    
+    @staticmethod
+    def _expand(values: np.ndarray, rows: np.ndarray, cols: np.ndarray, paired: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-document values arranged to broadcast against the score layout."""
+        if paired:
+            return values[rows], values[cols]
+        return values[rows][:, None], values[cols][None, :]
+    
+    @staticmethod
+    def _apply_empty_rules(scores: np.ndarray, row_empty: np.ndarray, col_empty: np.ndarray) -> np.ndarray:
+        """Two empty documents are identical; an empty and a non-empty one share nothing."""
+        scores = np.where(row_empty & col_empty, 1.0, scores)
+        return np.where(row_empty ^ col_empty, 0.0, scores)
+
     def get_max_similarity(self, target_code: str, reference_codes: List[str], method: str = "hybrid") -> float:
         """
         Get maximum similarity score between target code and multiple references.
@@ -289,17 +677,8 @@ class SimilarityCalculator:
         if not reference_codes:
             return 0.0
         
-        max_similarity = 0.0
-        
-        for ref_code in reference_codes:
-            try:
-                similarity = self.get_similarity(target_code, ref_code, method)
-                max_similarity = max(max_similarity, similarity)
-            except Exception as e:
-                logger.warning(f"Failed to compare with reference code: {str(e)}")
-                continue
-        
-        return max_similarity
+        matrix = self.calculate_similarity_matrix([target_code], reference_codes, method)
+        return float(matrix[0, 1:].max())
 
     def get_average_similarity(self, target_code: str, reference_codes: List[str], method: str = "hybrid") -> float:
         """
@@ -316,17 +695,8 @@ class SimilarityCalculator:
         if not reference_codes:
             return 0.0
         
-        similarities = []
-        
-        for ref_code in reference_codes:
-            try:
-                similarity = self.get_similarity(target_code, ref_code, method)
-                similarities.append(similarity)
-            except Exception as e:
-                logger.warning(f"Failed to compare with reference code: {str(e)}")
-                continue
-        
-        return sum(similarities) / len(similarities) if similarities else 0.0
+        matrix = self.calculate_similarity_matrix([target_code], reference_codes, method)
+        return float(matrix[0, 1:].mean())
 
 
 # Global similarity calculator instance
@@ -358,6 +728,21 @@ def get_average_group_similarity(student_code: str, other_submissions: List[str]
     return similarity_calculator.get_average_similarity(student_code, other_submissions, "hybrid")
 
 
+def get_similarity_matrix(submissions: List[str], references: Optional[List[str]] = None, method: str = "hybrid") -> np.ndarray:
+    """
+    Calculate the N x (N + M) similarity matrix of submissions against submissions and references.
+    
+    Args:
+        submissions: List of student code submissions
+        references: Optional list of reference codes (e.g. AI solutions)
+        method: Similarity method to use
+        
+    Returns:
+        Similarity matrix (see SimilarityCalculator.calculate_similarity_matrix)
+    """
+    return similarity_calculator.calculate_similarity_matrix(submissions, references, method)
+
+
 def get_group_similarities(submissions: List[str]) -> Dict[str, Dict[str, float]]:
     """
     Calculate pairwise similarities between all submissions in a group.
@@ -368,18 +753,12 @@ def get_group_similarities(submissions: List[str]) -> Dict[str, Dict[str, float]
     Returns:
         Dict mapping submission pairs to similarity scores
     """
-    similarities = {}
+    matrix = similarity_calculator.calculate_similarity_matrix(submissions, method="hybrid")
     
-    for i, code_a in enumerate(submissions):
-        similarities[f"submission_{i}"] = {}
-        
-        for j, code_b in enumerate(submissions):
-            if i != j:
-                try:
-                    similarity = similarity_calculator.get_similarity(code_a, code_b, "hybrid")
-                    similarities[f"submission_{i}"][f"submission_{j}"] = similarity
-                except Exception as e:
-                    logger.warning(f"Failed to compare submissions {i} and {j}: {str(e)}")
-                    similarities[f"submission_{i}"][f"submission_{j}"] = 0.0
-    
-    return similarities
\ No newline at end of file
+    return {
+        f"submission_{i}": {
+            f"submission_{j}": float(matrix[i, j])
+            for j in range(len(submissions)) if i != j
+        }
+        for i in range(len(submissions))
+    }
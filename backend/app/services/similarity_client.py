@@ -35,7 +35,7 @@ class SimilarityClient:
         Args:
             code_a: First code snippet
             code_b: Second code snippet
-            method: Similarity method ('token', 'semantic', 'structural', 'hybrid')
+            method: Similarity method ('token', 'semantic', 'structural', 'winnow', 'hybrid')
             
         Returns:
             Similarity score between 0.0 and 1.0
@@ -56,7 +56,7 @@ class SimilarityClient:
         Args:
             code_a: First code snippet
             code_b: Second code snippet
-            method: Similarity method ('token', 'semantic', 'structural', 'hybrid')
+            method: Similarity method ('token', 'semantic', 'structural', 'winnow', 'hybrid')
             
         Returns:
             Detailed comparison results with similarity score and metadata
@@ -90,35 +90,20 @@ class SimilarityClient:
         """
         logger.info(f"Comparing target code with {len(reference_codes)} references")
         
-        similarities = {}
-        
-        # Use semaphore to limit concurrent requests
-        semaphore = asyncio.Semaphore(5)
-        
-        async def compare_single(index: int, ref_code: str) -> tuple:
-            async with semaphore:
-                try:
-                    similarity = await self.get_similarity(target_code, ref_code, method)
-                    return index, similarity
-                except Exception as e:
-                    logger.warning(f"Failed to compare with reference {index}: {str(e)}")
-                    return index, 0.0
-        
-        # Execute comparisons concurrently
-        tasks = [
-            compare_single(i, ref_code) 
-            for i, ref_code in enumerate(reference_codes)
-        ]
+        if not reference_codes:
+            return {}
         
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            # One batch computation instead of a comparison per reference
+            matrix = self.calculator.calculate_similarity_matrix([target_code], reference_codes, method)
+        except Exception as e:
+            logger.error(f"Batch comparison failed: {str(e)}")
+            raise SimilarityClientError(f"Similarity comparison failed: {str(e)}")
         
-        for result in results:
-            if isinstance(result, Exception):
-                logger.error(f"Comparison task failed: {str(result)}")
-                continue
-                
-            index, similarity = result
-            similarities[f"ref_{index}"] = similarity
+        similarities = {
+            f"ref_{index}": float(similarity)
+            for index, similarity in enumerate(matrix[0, 1:])
+        }
         
         logger.info(f"Completed {len(similarities)} comparisons")
         return similarities
@@ -208,21 +193,19 @@ async def get_group_similarities(submissions: list) -> Dict[str, Dict[str, float
     Returns:
         Dict mapping submission pairs to similarity scores
     """
-    similarities = {}
-    
-    for i, code_a in enumerate(submissions):
-        similarities[f"submission_{i}"] = {}
-        
-        for j, code_b in enumerate(submissions):
-            if i != j:
-                try:
-                    similarity = await similarity_client.get_similarity(code_a, code_b, "hybrid")
-                    similarities[f"submission_{i}"][f"submission_{j}"] = similarity
-                except Exception as e:
-                    logger.warning(f"Failed to compare submissions {i} and {j}: {str(e)}")
-                    similarities[f"submission_{i}"][f"submission_{j}"] = 0.0
+    try:
+        matrix = similarity_client.calculator.calculate_similarity_matrix(submissions, method="hybrid")
+    except Exception as e:
+        logger.warning(f"Failed to compare submissions: {str(e)}")
+        matrix = None
     
-    return similarities
+    return {
+        f"submission_{i}": {
+            f"submission_{j}": float(matrix[i, j]) if matrix is not None else 0.0
+            for j in range(len(submissions)) if i != j
+        }
+        for i in range(len(submissions))
+    }
 
 
 async def get_average_group_similarity(student_code: str, other_submissions: list) -> float:
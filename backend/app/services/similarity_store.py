@@ -0,0 +1,417 @@
+"""
+EduCode Backend - Similarity Store
+
+Persists the pairwise similarities of each task's submissions together
+with per-submission aggregates (peer average/max and AI max). Large tasks
+store only the exactly scored near-duplicate candidates. When a single
+submission is created or changed it is compared only against the stored
+fingerprints of its task peers and AI solutions, and the matrix and the
+aggregates are patched in place, so grading finds everything precomputed.
+"""
+
+import logging
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.ai_solution import AISolution
+from app.models.evaluation import Evaluation
+from app.models.submission import Submission
+from app.models.submission_similarity import SubmissionSimilarity
+from app.models.submission_similarity_stats import SubmissionSimilarityStats
+from app.models.task import Task
+from app.services.embeddings import EMBEDDING_METHOD
+from app.services.evaluation_stats import mark_evaluation_stats_stale
+from app.services.fingerprints import load_fingerprints, fingerprint_to_features
+from app.services.similarity import similarity_calculator
+
+logger = logging.getLogger(__name__)
+
+SIMILARITY_METHOD = "hybrid"
+
+# Rows per INSERT statement in bulk writes
+BULK_CHUNK_SIZE = 1000
+
+
+def _pair_filter(submission_id: int, method: str = SIMILARITY_METHOD):
+    """Filter matching every stored pair of a method that involves a submission."""
+    return (SubmissionSimilarity.method == method) & or_(
+        SubmissionSimilarity.submission_a_id == submission_id,
+        SubmissionSimilarity.submission_b_id == submission_id
+    )
+
+
+def _pair_row(
+    task_id: int,
+    submission_id: int,
+    peer_id: int,
+    score: float,
+    content_hashes: Dict[int, str],
+    program_hashes: Dict[int, str],
+    method: str
+) -> Dict:
+    """Column values of one stored pair (lower submission ID first); exact copies score 1.0."""
+    a_id, b_id = min(submission_id, peer_id), max(submission_id, peer_id)
+    identical = program_hashes[a_id] == program_hashes[b_id]
+    return {
+        "task_id": task_id,
+        "submission_a_id": a_id,
+        "submission_b_id": b_id,
+        "similarity": 1.0 if identical else float(score),
+        "identical": identical,
+        "method": method,
+        "content_hash_a": content_hashes[a_id],
+        "content_hash_b": content_hashes[b_id],
+    }
+
+
+def _patch_peer_stats(
+    stats: SubmissionSimilarityStats,
+    old_pair: Optional[SubmissionSimilarity],
+    score: float,
+    peer_count: int
+) -> bool:
+    """
+    Replace one pair's contribution in a peer's aggregates.
+
+    Returns:
+        True if the peer's maximum may have dropped and must be recomputed
+    """
+    stats.peer_count = peer_count
+    if old_pair is None:
+        stats.compared_count += 1
+    else:
+        stats.similarity_sum -= old_pair.similarity
+
+    stats.similarity_sum += score
+
+    if score >= stats.max_similarity:
+        stats.max_similarity = score
+        return False
+
+    return old_pair is not None and old_pair.similarity >= stats.max_similarity
+
+
+def update_submission_similarities(db: Session, submission_id: int) -> SubmissionSimilarityStats:
+    """
+    Incrementally update the stored similarities of one submission.
+
+    Compares the submission against the fingerprints of all other
+    submissions of its task and of the task's AI solutions, upserts the
+    affected pairs and patches the aggregates of the submission and its
+    peers. Updates within one task are serialized by locking the task row.
+    The caller is responsible for committing the session.
+
+    Args:
+        db: Synchronous database session
+        submission_id: ID of the created or changed submission
+
+    Returns:
+        The submission's up-to-date SubmissionSimilarityStats
+    """
+    submission = db.query(Submission.id, Submission.task_id).filter(Submission.id == submission_id).first()
+    if not submission:
+        raise ValueError(f"Submission {submission_id} not found")
+    task_id = submission.task_id
+
+    # Serialize concurrent incremental updates of the same task
+    db.query(Task.id).filter(Task.id == task_id).with_for_update().one()
+
+    peer_ids = [
+        row.id for row in db.query(Submission.id).filter(
+            Submission.task_id == task_id, Submission.id != submission_id
+        ).order_by(Submission.id)
+    ]
+    ai_solution_ids = [
+        row.id for row in db.query(AISolution.id).filter(
+            AISolution.task_id == task_id, AISolution.code.isnot(None)
+        )
+    ]
+
+    submission_fps, ai_fps = load_fingerprints(db, [submission_id] + peer_ids, ai_solution_ids)
+    ai_solution_ids = [ai_id for ai_id in ai_solution_ids if ai_id in ai_fps]
+    own_fp = submission_fps[submission_id]
+    content_hashes = {sid: fingerprint.content_hash for sid, fingerprint in submission_fps.items()}
+    program_hashes = {sid: fingerprint.program_hash for sid, fingerprint in submission_fps.items()}
+
+    # One row of the similarity matrix: the submission against peers and AI solutions
+    documents = (
+        [fingerprint_to_features(own_fp)] +
+        [fingerprint_to_features(submission_fps[peer_id]) for peer_id in peer_ids] +
+        [fingerprint_to_features(ai_fps[ai_id]) for ai_id in ai_solution_ids]
+    )
+    row = similarity_calculator.calculate_feature_matrix(documents, 1, SIMILARITY_METHOD)[0]
+    # Exact copies of the program count as 1.0, like in a full rebuild
+    peer_scores = [
+        1.0 if program_hashes[peer_id] == own_fp.program_hash else float(score)
+        for peer_id, score in zip(peer_ids, row[1:1 + len(peer_ids)])
+    ]
+    ai_scores = row[1 + len(peer_ids):]
+
+    old_pairs = {
+        pair.other(submission_id): pair
+        for pair in db.query(SubmissionSimilarity).filter(_pair_filter(submission_id))
+    }
+    peer_stats = {
+        stats.submission_id: stats
+        for stats in db.query(SubmissionSimilarityStats).filter(
+            SubmissionSimilarityStats.submission_id.in_(peer_ids)
+        )
+    } if peer_ids else {}
+
+    stale_max: List[int] = []
+
+    for peer_id, score in zip(peer_ids, peer_scores):
+        old_pair = old_pairs.pop(peer_id, None)
+
+        # Peers without stats are left incomplete and rebuilt at grading time
+        stats = peer_stats.get(peer_id)
+        if stats is not None and _patch_peer_stats(stats, old_pair, score, len(peer_ids)):
+            stale_max.append(peer_id)
+
+        values = _pair_row(task_id, submission_id, peer_id, score, content_hashes, program_hashes, SIMILARITY_METHOD)
+        if old_pair is None:
+            db.add(SubmissionSimilarity(**values))
+        else:
+            for field, value in values.items():
+                setattr(old_pair, field, value)
+
+    # Pairs with submissions that left the task
+    for old_pair in old_pairs.values():
+        db.delete(old_pair)
+
+    own_stats = db.query(SubmissionSimilarityStats).filter(
+        SubmissionSimilarityStats.submission_id == submission_id
+    ).first()
+    if own_stats is None:
+        own_stats = SubmissionSimilarityStats(submission_id=submission_id, task_id=task_id)
+        db.add(own_stats)
+
+    own_stats.content_hash = own_fp.content_hash
+    own_stats.peer_count = len(peer_ids)
+    own_stats.compared_count = len(peer_ids)
+    own_stats.similarity_sum = sum(peer_scores)
+    own_stats.max_similarity = max(peer_scores, default=0.0)
+    own_stats.ai_max_similarity = float(ai_scores.max()) if len(ai_scores) else None
+
+    db.flush()
+
+    for peer_id in stale_max:
+        peer_stats[peer_id].max_similarity = db.query(
+            func.max(SubmissionSimilarity.similarity)
+        ).filter(_pair_filter(peer_id)).scalar() or 0.0
+
+    logger.info(
+        f"Updated similarities of submission {submission_id}: {len(peer_ids)} peers, "
+        f"{len(ai_solution_ids)} AI solutions, {len(stale_max)} peer maxima recomputed"
+    )
+    return own_stats
+
+
+def load_current_similarity_stats(
+    db: Session,
+    task_id: int,
+    content_hashes: Dict[int, str]
+) -> Optional[Dict[int, SubmissionSimilarityStats]]:
+    """
+    Load the stored aggregates of a task if they are complete and current.
+
+    Args:
+        db: Synchronous database session
+        task_id: Task ID
+        content_hashes: Current content hash of every submission of the task
+
+    Returns:
+        Mapping of submission_id to stats, or None if any submission's
+        stats are missing, were computed for other code or miss peers
+    """
+    stats_by_submission = {
+        stats.submission_id: stats
+        for stats in db.query(SubmissionSimilarityStats).filter(SubmissionSimilarityStats.task_id == task_id)
+    }
+
+    expected_peers = len(content_hashes) - 1
+    for submission_id, content_hash in content_hashes.items():
+        stats = stats_by_submission.get(submission_id)
+        if stats is None or stats.content_hash != content_hash or stats.peer_count != expected_peers:
+            return None
+
+    return stats_by_submission
+
+
+def matrix_pair_scores(matrix: np.ndarray) -> Dict[Tuple[int, int], float]:
+    """Scores of every (i, j) pair with i < j of a square similarity matrix."""
+    rows, cols = np.triu_indices(len(matrix), k=1)
+    return dict(zip(zip(rows.tolist(), cols.tolist()), np.asarray(matrix, dtype=float)[rows, cols].tolist()))
+
+
+def rebuild_task_similarities(
+    db: Session,
+    task_id: int,
+    submission_ids: List[int],
+    content_hashes: List[str],
+    program_hashes: List[str],
+    pair_scores: Dict[Tuple[int, int], float]
+) -> Dict[int, SubmissionSimilarityStats]:
+    """
+    Replace the stored pairs and aggregates of a task from scored submission pairs.
+
+    ``pair_scores`` may be sparse (e.g. only LSH candidates of a large
+    task): unscored pairs are not stored and count as 0.0 in a submission's
+    average, which is always taken over every peer. Exact copies (same
+    program hash) are always stored at 1.0. Existing AI maxima are kept.
+    The caller is responsible for committing the session.
+
+    Args:
+        db: Synchronous database session
+        task_id: Task ID
+        submission_ids: Submission IDs the pair indexes refer to
+        content_hashes: Content hashes aligned with ``submission_ids``
+        program_hashes: Program hashes (see app.services.dedup) aligned with ``submission_ids``
+        pair_scores: Similarity scores keyed by (i, j) indexes into ``submission_ids``
+
+    Returns:
+        Mapping of submission_id to the new stats
+    """
+    count = len(submission_ids)
+    scores = {(min(i, j), max(i, j)): score for (i, j), score in pair_scores.items() if i != j}
+
+    positions_by_program: Dict[str, List[int]] = {}
+    for index, code_hash in enumerate(program_hashes):
+        positions_by_program.setdefault(code_hash, []).append(index)
+    for positions in positions_by_program.values():
+        for a, b in combinations(positions, 2):
+            scores[(a, b)] = 1.0
+
+    previous_ai_max = dict(
+        db.query(SubmissionSimilarityStats.submission_id, SubmissionSimilarityStats.ai_max_similarity).filter(
+            SubmissionSimilarityStats.task_id == task_id
+        ).all()
+    )
+
+    db.query(SubmissionSimilarity).filter(
+        SubmissionSimilarity.task_id == task_id,
+        SubmissionSimilarity.method == SIMILARITY_METHOD
+    ).delete(synchronize_session=False)
+    db.query(SubmissionSimilarityStats).filter(SubmissionSimilarityStats.task_id == task_id).delete(synchronize_session="fetch")
+
+    hash_by_submission = dict(zip(submission_ids, content_hashes))
+    program_by_submission = dict(zip(submission_ids, program_hashes))
+    pairs = list(scores)
+    pair_rows = [
+        _pair_row(
+            task_id, submission_ids[i], submission_ids[j], scores[(i, j)],
+            hash_by_submission, program_by_submission, SIMILARITY_METHOD
+        )
+        for i, j in pairs
+    ]
+    for start in range(0, len(pair_rows), BULK_CHUNK_SIZE):
+        db.bulk_insert_mappings(SubmissionSimilarity, pair_rows[start:start + BULK_CHUNK_SIZE])
+
+    # Per-submission aggregates over the stored pairs
+    first = np.array([i for i, _ in pairs], dtype=int)
+    second = np.array([j for _, j in pairs], dtype=int)
+    values = np.array([row["similarity"] for row in pair_rows], dtype=float)
+    compared = np.bincount(first, minlength=count) + np.bincount(second, minlength=count)
+    sums = np.zeros(count)
+    maxima = np.zeros(count)
+    for index in (first, second):
+        np.add.at(sums, index, values)
+        np.maximum.at(maxima, index, values)
+
+    stats_by_submission = {}
+    for index, submission_id in enumerate(submission_ids):
+        stats = SubmissionSimilarityStats(
+            submission_id=submission_id,
+            task_id=task_id,
+            content_hash=content_hashes[index],
+            peer_count=count - 1,
+            compared_count=int(compared[index]),
+            similarity_sum=float(sums[index]),
+            max_similarity=float(maxima[index]),
+            ai_max_similarity=previous_ai_max.get(submission_id)
+        )
+        db.add(stats)
+        stats_by_submission[submission_id] = stats
+
+    logger.info(f"Rebuilt similarities of task {task_id}: {len(pairs)} of {count * (count - 1) // 2} pairs stored")
+    return stats_by_submission
+
+
+def bulk_store_pair_similarities(
+    db: Session,
+    task_id: int,
+    scores: Iterable[Tuple[int, int, float]],
+    content_hashes: Dict[int, str],
+    program_hashes: Dict[int, str],
+    method: str = SIMILARITY_METHOD
+) -> int:
+    """
+    Upsert scored submission pairs in bulk (PostgreSQL ON CONFLICT).
+
+    Aggregates are not touched; use this for partial results such as LSH
+    candidate scores. The caller is responsible for committing the session.
+
+    Args:
+        db: Synchronous database session
+        task_id: Task ID
+        scores: (submission_id, submission_id, score) triples in any order
+        content_hashes: Content hash of every submission referenced in ``scores``
+        program_hashes: Program hash of every submission referenced in ``scores``
+        method: Similarity method the scores were computed with
+
+    Returns:
+        Number of pairs written
+    """
+    rows = {}
+    for submission_id, peer_id, score in scores:
+        if submission_id != peer_id:
+            row = _pair_row(task_id, submission_id, peer_id, score, content_hashes, program_hashes, method)
+            rows[(row["submission_a_id"], row["submission_b_id"])] = row
+
+    rows = list(rows.values())
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        statement = insert(SubmissionSimilarity).values(rows[start:start + BULK_CHUNK_SIZE])
+        db.execute(statement.on_conflict_do_update(
+            constraint="unique_submission_similarity_pair",
+            set_={
+                "similarity": statement.excluded.similarity,
+                "identical": statement.excluded.identical,
+                "content_hash_a": statement.excluded.content_hash_a,
+                "content_hash_b": statement.excluded.content_hash_b,
+                "computed_at": func.now(),
+            }
+        ))
+
+    logger.info(f"Stored {len(rows)} {method} similarity pairs for task {task_id}")
+    return len(rows)
+
+
+def store_ai_similarity(db: Session, submission_id: int, ai_similarity: float, method: str = SIMILARITY_METHOD) -> None:
+    """
+    Record a submission's maximum AI similarity on its existing aggregates and evaluation.
+
+    Hybrid scores go to Evaluation.ai_similarity (and the aggregates),
+    embedding scores to Evaluation.ai_embedding_similarity. The caller is
+    responsible for committing the session.
+    """
+    if method == EMBEDDING_METHOD:
+        db.query(Evaluation).filter(
+            Evaluation.submission_id == submission_id
+        ).update({"ai_embedding_similarity": ai_similarity}, synchronize_session=False)
+        return
+
+    if method != SIMILARITY_METHOD:
+        raise ValueError(f"Unsupported AI similarity method: {method}")
+
+    db.query(SubmissionSimilarityStats).filter(
+        SubmissionSimilarityStats.submission_id == submission_id
+    ).update({"ai_max_similarity": ai_similarity}, synchronize_session=False)
+    db.query(Evaluation).filter(
+        Evaluation.submission_id == submission_id
+    ).update({"ai_similarity": ai_similarity}, synchronize_session=False)
+    mark_evaluation_stats_stale(db, submission_ids=[submission_id])
@@ -19,10 +19,12 @@ from app.models.lesson import Lesson
 from app.models.lesson_material import LessonMaterial, MaterialType
 from app.models.task import Task, ProgrammingLanguage
 from app.models.task_test import TaskTest, TestType
-from app.models.ai_solution import AISolution
+from app.models.ai_solution import AISolution, AIProvider
 from app.models.subject import Subject
+from app.models.loading import MATERIAL_TEXT
 from app.services.file_processor import process_lesson_material, process_multiple_materials
 from app.services.ai_task_generator import ai_task_generator, TaskGenerationError
+from app.services.fingerprints import save_fingerprint
 from app.tasks.celery_app import celery_app
 
 logger = logging.getLogger(__name__)
@@ -147,8 +149,8 @@ def generate_tasks_from_materials_task(
     Raises:
         Exception: If generation fails after retries
     """
-    import asyncio
     import time
+    from app.tasks.ai_tasks import run_async
 
     if languages is None:
         languages = ["python"]
@@ -179,7 +181,7 @@ def generate_tasks_from_materials_task(
                 # Get materials
                 if material_ids:
                     materials_result = await session.execute(
-                        select(LessonMaterial).where(
+                        select(LessonMaterial).options(*MATERIAL_TEXT).where(
                             and_(
                                 LessonMaterial.lesson_id == lesson_id,
                                 LessonMaterial.id.in_(material_ids)
@@ -188,7 +190,7 @@ def generate_tasks_from_materials_task(
                     )
                 else:
                     materials_result = await session.execute(
-                        select(LessonMaterial).where(
+                        select(LessonMaterial).options(*MATERIAL_TEXT).where(
                             and_(
                                 LessonMaterial.lesson_id == lesson_id,
                                 LessonMaterial.use_for_ai_generation == True
@@ -248,10 +250,13 @@ def generate_tasks_from_materials_task(
                     # Create AI solution (reference solution)
                     ai_solution = AISolution(
                         task_id=task.id,
-                        code=task_data["reference_solution"],
-                        language=task_data["language"].lower()
+                        provider=AIProvider.OPENAI if use_openai else AIProvider.ANTHROPIC,
+                        variant_index=1,
+                        code=task_data["reference_solution"]
                     )
                     session.add(ai_solution)
+                    await session.flush()
+                    await save_fingerprint(session, ai_solution.code, task.language.value, ai_solution_id=ai_solution.id)
 
                     # Create test cases
                     for test_data in task_data["tests"]:
@@ -300,7 +305,8 @@ def generate_tasks_from_materials_task(
                 raise
 
     try:
-        return asyncio.run(_generate())
+        # Worker event loop, so the LLM cache's pooled DB connections stay usable
+        return run_async(_generate())
     except Exception as exc:
         logger.error(f"Task generation failed for lesson {lesson_id}: {str(exc)}")
         # Only retry for specific errors (not validation errors)
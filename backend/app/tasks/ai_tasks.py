@@ -11,22 +11,71 @@ This module contains Celery tasks for:
 import asyncio
 import logging
 from datetime import datetime, timezone
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from celery import current_task
+from celery.signals import worker_process_init, worker_process_shutdown
 from sqlalchemy.orm import Session
 
 from app.tasks.celery_app import celery_app
+from app.core.config import settings
 from app.core.database import get_db
 from app.models.ai_solution import AISolution
 from app.models.evaluation import Evaluation
+from app.models.lesson import Lesson
+from app.models.loading import SUBMISSION_CODE, TASK_GRADING
 from app.models.submission import Submission
 from app.models.task import Task
 from app.services.ai_service import ai_service
-from app.services.similarity_client import get_ai_similarity, get_average_group_similarity
+from app.services.dedup import SubmissionClusters
+from app.services.execution_cache import run_submissions_tests_cached
+from app.services.fingerprints import load_fingerprints, fingerprint_to_features
+from app.services.lsh import score_candidate_pairs
+from app.services.parallel_similarity import feature_matrix_parallel
+from app.services.rubric import grade_contexts, load_rubric, primary_grader, rubric_grade
+from app.services.similarity import similarity_calculator
+from app.services.similarity_store import (
+    load_current_similarity_stats,
+    matrix_pair_scores,
+    rebuild_task_similarities,
+    store_ai_similarity,
+    update_submission_similarities,
+)
 
 logger = logging.getLogger(__name__)
 
+# Event loop kept for the lifetime of the worker process, so pooled AI API
+# connections (and async DB connections) are reused across tasks
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def run_async(coroutine):
+    """Run a coroutine to completion on this worker process's event loop."""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        _worker_loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_worker_loop)
+    return _worker_loop.run_until_complete(coroutine)
+
+
+@worker_process_init.connect
+def _open_ai_client_pool(**kwargs):
+    """Open the AI HTTP client pool in each worker process after fork."""
+    run_async(ai_service.startup())
+
+
+@worker_process_shutdown.connect
+def _close_ai_client_pool(**kwargs):
+    """Close the AI HTTP client pool and the worker's event loop."""
+    global _worker_loop
+    if _worker_loop is None or _worker_loop.is_closed():
+        return
+    try:
+        run_async(ai_service.aclose())
+    finally:
+        _worker_loop.close()
+        _worker_loop = None
+
 
 def get_celery_db_session():
     """Helper function to get synchronous database session for Celery tasks."""
@@ -84,10 +133,6 @@ def generate_ai_solutions_task(self, task_id: int):
             
             # Generate AI solutions using the AI service
             try:
-                # Create a new event loop for async operations
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
                 # Create async session for AI service
                 from app.core.database import async_session_factory, create_session_factory
                 
@@ -96,12 +141,12 @@ def generate_ai_solutions_task(self, task_id: int):
                 async_db = session_factory()
                 
                 try:
-                    result = loop.run_until_complete(
+                    result = run_async(
                         ai_service.generate_ai_solutions(task_id, async_db)
                     )
                     
                     # Commit the async session
-                    loop.run_until_complete(async_db.commit())
+                    run_async(async_db.commit())
                     
                     logger.info(f"[AI] Generated {len(result)} solutions for task {task_id}")
                     
@@ -112,7 +157,7 @@ def generate_ai_solutions_task(self, task_id: int):
                         "status": "completed"
                     }
                 finally:
-                    loop.run_until_complete(async_db.close())
+                    run_async(async_db.close())
                 
             except Exception as e:
                 logger.error(f"[AI] Solution generation failed for task {task_id}: {str(e)}")
@@ -123,11 +168,6 @@ def generate_ai_solutions_task(self, task_id: int):
                     "error": str(e),
                     "status": "failed"
                 }
-            finally:
-                try:
-                    loop.close()
-                except:
-                    pass
                 
         finally:
             db.close()
@@ -170,13 +210,13 @@ def calc_ai_similarity_task(self, submission_id: int):
         db = get_celery_db_session()
         
         try:
-            # Fetch submission and related data
-            submission = db.query(Submission).filter(Submission.id == submission_id).first()
+            # Fetch submission and related data (the code itself is not needed)
+            submission = db.query(Submission.id, Submission.task_id).filter(Submission.id == submission_id).first()
             if not submission:
                 raise ValueError(f"Submission {submission_id} not found")
             
             # Get AI solutions for the task
-            ai_solutions = db.query(AISolution).filter(
+            ai_solutions = db.query(AISolution.id).filter(
                 AISolution.task_id == submission.task_id,
                 AISolution.code.isnot(None)
             ).all()
@@ -185,37 +225,18 @@ def calc_ai_similarity_task(self, submission_id: int):
                 logger.warning(f"[AI] No AI solutions found for task {submission.task_id}")
                 ai_similarity = 0.0
             else:
-                # Extract AI codes
-                ai_codes = [solution.code for solution in ai_solutions]
-                
-                # Calculate similarity using async client
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
+                # Compare stored fingerprints instead of raw code
+                ai_solution_ids = [solution.id for solution in ai_solutions]
+                submission_fps, ai_fps = load_fingerprints(db, [submission_id], ai_solution_ids)
                 
-                try:
-                    ai_similarity = loop.run_until_complete(
-                        get_ai_similarity(submission.code, ai_codes)
-                    )
-                finally:
-                    loop.close()
-            
-            # Store or update evaluation record
-            evaluation = db.query(Evaluation).filter(
-                Evaluation.submission_id == submission_id
-            ).first()
-            
-            if evaluation:
-                evaluation.ai_similarity = ai_similarity
-            else:
-                evaluation = Evaluation(
-                    submission_id=submission_id,
-                    ai_similarity=ai_similarity,
-                    intra_group_similarity=None,
-                    final_score=None,
-                    rationale=None
-                )
-                db.add(evaluation)
-            
+                documents = [fingerprint_to_features(submission_fps[submission_id])] + [
+                    fingerprint_to_features(ai_fps[ai_id]) for ai_id in ai_solution_ids if ai_id in ai_fps
+                ]
+                matrix = similarity_calculator.calculate_feature_matrix(documents, 1)
+                ai_similarity = float(matrix[0, 1:].max()) if len(documents) > 1 else 0.0
+            
+            # Record it on the aggregates and the evaluation, if graded already
+            store_ai_similarity(db, submission_id, ai_similarity)
             db.commit()
             
             logger.info(f"[AI] AI similarity calculated: {ai_similarity:.3f} for submission {submission_id}")
@@ -245,12 +266,103 @@ def calc_ai_similarity_task(self, submission_id: int):
         }
 
 
+@celery_app.task(bind=True, max_retries=2, default_retry_delay=30)
+def update_submission_similarity_task(self, submission_id: int):
+    """
+    Incrementally update similarities after a submission is created or changed.
+    
+    Compares only this submission against the stored fingerprints of its
+    task peers and AI solutions, patches the stored pairwise matrix and the
+    per-submission aggregates, and stores the AI similarity with them (and
+    on the evaluation once grading has created it), so grading only has to
+    produce the final score.
+    
+    Args:
+        submission_id (int): Database ID of the student submission
+        
+    Returns:
+        dict: Updated similarity aggregates of the submission
+    """
+    try:
+        logger.info(f"[AI] Updating similarities for submission {submission_id}")
+        
+        # Get database session for Celery (sync)
+        db = get_celery_db_session()
+        
+        try:
+            stats = update_submission_similarities(db, submission_id)
+            ai_similarity = stats.ai_max_similarity or 0.0
+            
+            store_ai_similarity(db, submission_id, ai_similarity)
+            db.commit()
+            
+            logger.info(
+                f"[AI] Similarities updated for submission {submission_id}: "
+                f"ai={ai_similarity:.3f}, group avg={stats.average_similarity:.3f}, max={stats.max_similarity:.3f}"
+            )
+            
+            return {
+                "submission_id": submission_id,
+                "ai_similarity": ai_similarity,
+                "intra_group_similarity": stats.average_similarity,
+                "max_group_similarity": stats.max_similarity,
+                "peer_count": stats.peer_count,
+                "status": "completed"
+            }
+            
+        finally:
+            db.close()
+            
+    except Exception as exc:
+        logger.error(f"[AI] Similarity update failed for submission {submission_id}: {str(exc)}")
+        
+        # Retry for temporary failures
+        if any(keyword in str(exc).lower() for keyword in ["timeout", "connection", "deadlock"]):
+            raise self.retry(exc=exc, countdown=30 * (self.request.retries + 1))
+        
+        return {
+            "submission_id": submission_id,
+            "error": str(exc),
+            "status": "failed"
+        }
+
+
+def _rubric_grades_singly(contexts: List[Dict[str, Any]], rubric, label: str) -> List[Any]:
+    """Rubric-grade contexts one at a time; a context that fails is represented by its exception."""
+    results = []
+    for context in contexts:
+        try:
+            results.append(rubric_grade(context, rubric, label=label))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _collect_grades(contexts: Dict[Tuple, Dict[str, Any]], results: List[Any]) -> Dict[Tuple, Tuple[float, str]]:
+    """(score, rationale) per grading context; unusable results are logged and left out."""
+    grades = {}
+    for grade_key, result in zip(contexts, results):
+        try:
+            grades[grade_key] = (result["score"], result["rationale"])
+        except Exception:
+            logger.error(f"[AI] Failed to grade program {grade_key[0][:12]}: {result!r}")
+    return grades
+
+
+def _duplicate_note(duplicates: List[int]) -> str:
+    """Rationale suffix flagging submissions with identical code."""
+    if not duplicates:
+        return ""
+    return f"\n\nExact duplicate of submission(s) {', '.join(map(str, duplicates))}."
+
+
 @celery_app.task(bind=True, max_retries=2, default_retry_delay=60)
 def grade_task(self, task_id: int):
     """
     Grade all submissions for a task using AI evaluation.
     
-    Calculates group similarities, requests final grades from ChatGPT,
+    Calculates group similarities, scores submissions with the task's rubric
+    or requests final grades from ChatGPT (with the rubric as fallback),
     and stores the results in the database.
     
     Args:
@@ -266,102 +378,180 @@ def grade_task(self, task_id: int):
         db = get_celery_db_session()
         
         try:
-            # Fetch task and submissions
-            task = db.query(Task).filter(Task.id == task_id).first()
+            # Fetch task (with its tests) and submissions
+            task = db.query(Task).options(*TASK_GRADING).filter(Task.id == task_id).first()
             if not task:
                 raise ValueError(f"Task {task_id} not found")
             
-            submissions = db.query(Submission).filter(Submission.task_id == task_id).all()
+            submissions = db.query(Submission).options(*SUBMISSION_CODE).filter(Submission.task_id == task_id).all()
             if not submissions:
                 logger.warning(f"[AI] No submissions found for task {task_id}")
                 return {"task_id": task_id, "graded_count": 0, "status": "no_submissions"}
             
             logger.info(f"[AI] Grading {len(submissions)} submissions for task {task_id}")
             
-            # Extract submission codes for group similarity
-            submission_codes = [sub.code for sub in submissions]
+            # Group exact copies so every distinct program is processed once
+            clusters = SubmissionClusters({sub.id: sub.code for sub in submissions})
+            duplicate_clusters = clusters.duplicate_clusters
+            if duplicate_clusters:
+                logger.info(
+                    f"[AI] Task {task_id}: {len(clusters)} distinct programs, "
+                    f"{len(duplicate_clusters)} exact-duplicate clusters {duplicate_clusters}"
+                )
+            
+            # Use the incrementally maintained aggregates when they are current
+            submission_ids = [sub.id for sub in submissions]
+            fingerprints, _ = load_fingerprints(db, submission_ids)
+            content_hashes = [fingerprints[sid].content_hash for sid in submission_ids]
+            program_hashes = [fingerprints[sid].program_hash for sid in submission_ids]
+            similarity_stats = load_current_similarity_stats(db, task_id, dict(zip(submission_ids, content_hashes)))
+            
+            if similarity_stats is None:
+                # Pair scores over the distinct programs in one batch, built
+                # from the stored fingerprints so the raw source is never
+                # re-processed, then fanned out to every copy
+                logger.info(f"[AI] Similarity aggregates of task {task_id} are incomplete, rebuilding")
+                representatives = clusters.representatives
+                documents = [fingerprint_to_features(fingerprints[sid]) for sid in representatives]
+                
+                if len(representatives) >= settings.SIMILARITY_LSH_MIN_SUBMISSIONS:
+                    # Large tasks: exact scores only for the sparse LSH candidates
+                    distinct_scores = score_candidate_pairs(
+                        documents,
+                        [fingerprints[sid].minhash_data for sid in representatives],
+                        settings.SIMILARITY_LSH_THRESHOLD
+                    )
+                else:
+                    distinct_scores = matrix_pair_scores(feature_matrix_parallel(documents, len(representatives)))
+                
+                similarity_stats = rebuild_task_similarities(
+                    db, task_id, submission_ids, content_hashes, program_hashes,
+                    clusters.expand_pairs(distinct_scores, submission_ids)
+                )
+            
+            # Run the task's tests for every submission still to be graded,
+            # reusing cached results for unchanged code and tests
+            ungraded = {
+                submission.id: submission.code
+                for submission in submissions
+                if not (submission.evaluation and submission.evaluation.final_score is not None)
+            }
+            test_reports = run_submissions_tests_cached(db, ungraded, task.language, task.tests)
             
+            evaluations = {
+                evaluation.submission_id: evaluation
+                for evaluation in db.query(Evaluation).filter(Evaluation.submission_id.in_(submission_ids)).all()
+            }
+            
+            rubric = load_rubric(task)
+            grader = primary_grader(rubric)
+            
+            # Collect one grading context per distinct program and grading
+            # input; copies graded in the same context share the grade
+            contexts = {}
+            pending = []
             graded_count = 0
             
-            # Process each submission
             for submission in submissions:
                 try:
-                    # Get or create evaluation record
-                    evaluation = db.query(Evaluation).filter(
-                        Evaluation.submission_id == submission.id
-                    ).first()
+                    evaluation = evaluations.get(submission.id)
+                    if evaluation is not None and evaluation.final_score is not None:
+                        graded_count += 1
+                        continue
                     
-                    if not evaluation:
-                        evaluation = Evaluation(
-                            submission_id=submission.id,
-                            ai_similarity=0.0,
-                            intra_group_similarity=None,
-                            final_score=None,
-                            rationale=None
-                        )
-                        db.add(evaluation)
+                    # Similarities come from the aggregates; the evaluation
+                    # is only created once the submission has a grade
+                    stats = similarity_stats[submission.id]
+                    ai_similarity = stats.ai_max_similarity
+                    group_similarity = stats.average_similarity
+                    if evaluation is not None:
+                        ai_similarity = evaluation.ai_similarity
+                        if evaluation.intra_group_similarity is not None:
+                            group_similarity = evaluation.intra_group_similarity
                     
-                    # Calculate group similarity if not already done
-                    if evaluation.intra_group_similarity is None:
-                        other_codes = [code for code in submission_codes if code != submission.code]
-                        
-                        if other_codes:
-                            loop = asyncio.new_event_loop()
-                            asyncio.set_event_loop(loop)
-                            
-                            try:
-                                group_similarity = loop.run_until_complete(
-                                    get_average_group_similarity(submission.code, other_codes)
-                                )
-                            finally:
-                                loop.close()
-                        else:
-                            group_similarity = 0.0
-                        
-                        evaluation.intra_group_similarity = group_similarity
+                    test_report = test_reports[submission.id]
+                    correctness_score = test_report.correctness_score
+                    if test_report.total:
+                        logger.info(
+                            f"[AI] Submission {submission.id} passed {test_report.passed}/{test_report.total} tests "
+                            f"(score {correctness_score})"
+                        )
                     
-                    # Request final grade from AI if not already done
-                    if evaluation.final_score is None:
-                        context = {
+                    grade_key = (
+                        clusters.hash_by_submission[submission.id],
+                        ai_similarity or 0.0,
+                        group_similarity or 0.0,
+                        correctness_score
+                    )
+                    if grade_key not in contexts:
+                        contexts[grade_key] = {
                             "task_title": task.title,
                             "task_description": task.body,
-                            "ai_similarity": evaluation.ai_similarity or 0.0,
-                            "intra_group_similarity": evaluation.intra_group_similarity or 0.0,
-                            "correctness_score": 85  # Default correctness score
+                            "ai_similarity": grade_key[1],
+                            "intra_group_similarity": grade_key[2],
+                            "correctness_score": correctness_score,
+                            "rubric": rubric
                         }
-                        
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                        
-                        try:
-                            grade_result = loop.run_until_complete(
-                                ai_service.request_final_grade(context)
-                            )
-                            
-                            evaluation.final_score = grade_result["score"]
-                            evaluation.rationale = grade_result["rationale"]
-                            
-                        except Exception as e:
-                            logger.error(f"[AI] Failed to get grade for submission {submission.id}: {str(e)}")
-                            # Use fallback grading
-                            evaluation.final_score = max(1, min(100, 
-                                85 - int(evaluation.ai_similarity * 30) - int(evaluation.intra_group_similarity * 20)
-                            ))
-                            evaluation.rationale = "Fallback grading due to AI service unavailability"
-                        
-                        finally:
-                            loop.close()
-                    
-                    graded_count += 1
+                    pending.append((submission, evaluation, grade_key))
                     
                 except Exception as e:
                     logger.error(f"[AI] Failed to grade submission {submission.id}: {str(e)}")
                     continue
             
-            # Commit all changes
-            db.commit()
+            results = []
+            if contexts and grader == "rubric":
+                # Score every distinct program locally in one vectorized pass;
+                # rationales from the AI are requested on demand
+                logger.info(f"[AI] Rubric grading {len(contexts)} programs for task {task_id}")
+                try:
+                    results = grade_contexts(list(contexts.values()), rubric)
+                except Exception as e:
+                    # Grade programs one at a time so a bad context only fails its own submissions
+                    logger.error(f"[AI] Rubric grading failed for task {task_id}, grading programs singly: {str(e)}")
+                    results = _rubric_grades_singly(list(contexts.values()), rubric, "Rubric grading")
+            
+            elif contexts:
+                # Request all final grades from AI in one event loop, with
+                # bounded concurrency and request rate; failed requests
+                # already come back with the fallback grade
+                logger.info(
+                    f"[AI] Requesting {len(contexts)} grades for task {task_id} "
+                    f"(concurrency {settings.GRADING_CONCURRENCY})"
+                )
+                try:
+                    results = run_async(ai_service.request_final_grades(list(contexts.values())))
+                except Exception as e:
+                    logger.error(f"[AI] Grade requests failed for task {task_id}, using rubric grading: {str(e)}")
+                    results = _rubric_grades_singly(list(contexts.values()), rubric, "Fallback rubric grading")
             
-            # Mark task as graded
+            grades = _collect_grades(contexts, results)
+            
+            # Write each graded submission's evaluation; one without a grade
+            # is left untouched and graded on the next run
+            for submission, evaluation, grade_key in pending:
+                if grade_key not in grades:
+                    continue
+                try:
+                    final_score, rationale = grades[grade_key]
+                    values = {
+                        "ai_similarity": grade_key[1],
+                        "intra_group_similarity": grade_key[2],
+                        "correctness_score": grade_key[3],
+                        "final_score": final_score,
+                        "rationale": rationale + _duplicate_note(clusters.duplicates_of(submission.id)),
+                    }
+                except Exception as e:
+                    logger.error(f"[AI] Failed to grade submission {submission.id}: {str(e)}")
+                    continue
+                
+                if evaluation is None:
+                    db.add(Evaluation(submission_id=submission.id, **values))
+                else:
+                    for field, value in values.items():
+                        setattr(evaluation, field, value)
+                graded_count += 1
+            
+            # Commit all grades and mark the task as graded in one transaction
             task.graded = True
             db.commit()
             
@@ -371,6 +561,9 @@ def grade_task(self, task_id: int):
                 "task_id": task_id,
                 "total_submissions": len(submissions),
                 "graded_count": graded_count,
+                "distinct_programs": len(clusters),
+                "duplicate_clusters": duplicate_clusters,
+                "grader": grader,
                 "status": "completed"
             }
             
@@ -392,6 +585,91 @@ def grade_task(self, task_id: int):
         }
 
 
+@celery_app.task(bind=True, max_retries=2, default_retry_delay=60)
+def detect_subject_near_duplicates_task(self, subject_id: int, threshold: Optional[float] = None):
+    """
+    Find near-duplicate submissions across a whole subject.
+    
+    Indexes the MinHash signatures of every submission in the subject (all
+    lessons, tasks and semesters) in an LSH index and computes the exact
+    hybrid similarity only for the candidate pairs it returns.
+    
+    Args:
+        subject_id (int): Database ID of the subject
+        threshold (float): Minimum exact similarity to report; defaults to
+            GROUP_SIMILARITY_THRESHOLD
+        
+    Returns:
+        dict: Near-duplicate pairs sorted by similarity
+    """
+    threshold = settings.GROUP_SIMILARITY_THRESHOLD if threshold is None else threshold
+    
+    try:
+        logger.info(f"[AI] Detecting near-duplicate submissions for subject {subject_id}")
+        
+        db = get_celery_db_session()
+        
+        try:
+            rows = db.query(Submission.id, Submission.task_id).join(
+                Task, Submission.task_id == Task.id
+            ).join(
+                Lesson, Task.lesson_id == Lesson.id
+            ).filter(Lesson.subject_id == subject_id).order_by(Submission.id).all()
+            
+            if len(rows) < 2:
+                return {"subject_id": subject_id, "total_submissions": len(rows), "pairs": [], "status": "completed"}
+            
+            submission_ids = [row.id for row in rows]
+            fingerprints, _ = load_fingerprints(db, submission_ids)
+            db.commit()
+            
+            documents = [fingerprint_to_features(fingerprints[sid]) for sid in submission_ids]
+            candidate_scores = score_candidate_pairs(
+                documents,
+                [fingerprints[sid].minhash_data for sid in submission_ids],
+                settings.SIMILARITY_LSH_THRESHOLD
+            )
+            
+            pairs = sorted(
+                (
+                    {
+                        "submission_a_id": rows[i].id,
+                        "submission_b_id": rows[j].id,
+                        "task_a_id": rows[i].task_id,
+                        "task_b_id": rows[j].task_id,
+                        "similarity": score
+                    }
+                    for (i, j), score in candidate_scores.items() if score >= threshold
+                ),
+                key=lambda pair: pair["similarity"],
+                reverse=True
+            )
+            
+            logger.info(
+                f"[AI] Subject {subject_id}: {len(candidate_scores)} candidates, "
+                f"{len(pairs)} pairs above {threshold:.2f} among {len(rows)} submissions"
+            )
+            
+            return {
+                "subject_id": subject_id,
+                "total_submissions": len(rows),
+                "candidate_pairs": len(candidate_scores),
+                "pairs": pairs,
+                "status": "completed"
+            }
+            
+        finally:
+            db.close()
+            
+    except Exception as exc:
+        logger.error(f"[AI] Near-duplicate detection failed for subject {subject_id}: {str(exc)}")
+        
+        if any(keyword in str(exc).lower() for keyword in ["timeout", "connection"]):
+            raise self.retry(exc=exc, countdown=60 * (self.request.retries + 1))
+        
+        return {"subject_id": subject_id, "pairs": [], "error": str(exc), "status": "failed"}
+
+
 @celery_app.task
 def auto_grade_expired_tasks():
     """
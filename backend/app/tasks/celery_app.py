@@ -28,6 +28,11 @@ celery_app.conf.update(
     enable_utc=settings.CELERY_ENABLE_UTC,
     
     task_routes={
+        # CPU-bound similarity work; its worker needs a non-daemonic pool
+        # (--pool=solo) to shard across SIMILARITY_WORKERS processes
+        "app.tasks.ai_tasks.grade_task": {"queue": "similarity_queue"},
+        "app.tasks.ai_tasks.detect_subject_near_duplicates_task": {"queue": "similarity_queue"},
+        "app.tasks.grading_tasks.calculate_intra_group_similarity": {"queue": "similarity_queue"},
         "app.tasks.ai_tasks.*": {"queue": "ai_queue"},
         "app.tasks.grading_tasks.*": {"queue": "grading_queue"},
         "app.tasks.ai_generation_tasks.*": {"queue": "ai_queue"},
@@ -36,6 +41,7 @@ celery_app.conf.update(
     task_queues=(
         Queue("ai_queue", routing_key="ai"),
         Queue("grading_queue", routing_key="grading"),
+        Queue("similarity_queue", routing_key="similarity"),
         Queue("celery", routing_key="celery"),
     ),
     
@@ -10,12 +10,24 @@ This module handles:
 
 import logging
 import json
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Sequence, Tuple
 from datetime import datetime
 
+import numpy as np
 from celery import current_app as celery_app, current_task, group
 
 from app.core.config import get_settings
+from app.services.dedup import program_hash
+from app.services.embeddings import EMBEDDING_METHOD, embedding_similarity_matrix
+from app.services.execution import DEFAULT_CORRECTNESS_SCORE
+from app.services.execution_cache import evict_cached_test_runs, run_submissions_tests_cached
+from app.services.fingerprints import hash_code, minhash_signature
+from app.services.llm_cache import evict_cached_llm_responses
+from app.services.lsh import score_candidate_pairs
+from app.services.parallel_similarity import prepare_documents_parallel
+from app.services.rubric import rubric_grade
+from app.services.similarity import similarity_calculator
+from app.services.similarity_store import bulk_store_pair_similarities, store_ai_similarity
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -26,6 +38,9 @@ def calculate_ai_similarity(self, submission_id: int, student_code: str, ai_solu
     """
     Calculate similarity between student submission and AI-generated solutions.
     
+    The submission's AI similarity is its highest score against any AI
+    solution; the same value is returned and stored.
+    
     Args:
         submission_id (int): Database ID of the student submission
         student_code (str): Student's submitted code
@@ -42,56 +57,16 @@ def calculate_ai_similarity(self, submission_id: int, student_code: str, ai_solu
             meta={"current": 0, "total": len(ai_solutions), "status": "Starting similarity calculation"}
         )
         
-        similarity_scores = []
-        
-        for i, ai_solution in enumerate(ai_solutions):
-            try:
-                current_task.update_state(
-                    state="PROGRESS",
-                    meta={"current": i + 1, "total": len(ai_solutions), "status": f"Comparing with AI solution {i + 1}"}
-                )
-                
-                # Calculate similarity using the similarity service
-                similarity_score = _calculate_code_similarity(
-                    student_code, 
-                    ai_solution["code"],
-                    method="cosine_embedding"
-                )
-                
-                similarity_scores.append({
-                    "ai_solution_id": ai_solution.get("id"),
-                    "provider": ai_solution.get("provider"),
-                    "variant_index": ai_solution.get("variant_index"),
-                    "similarity_score": similarity_score,
-                    "comparison_method": "cosine_embedding"
-                })
-                
-            except Exception as e:
-                logger.error(f"Failed to calculate similarity with AI solution {i + 1}: {str(e)}")
-                similarity_scores.append({
-                    "ai_solution_id": ai_solution.get("id"),
-                    "provider": ai_solution.get("provider"),
-                    "variant_index": ai_solution.get("variant_index"),
-                    "similarity_score": 0.0,
-                    "error": str(e)
-                })
-        
-        # Calculate overall AI similarity (average of all valid scores)
-        valid_scores = [s["similarity_score"] for s in similarity_scores if s["similarity_score"] > 0]
-        overall_ai_similarity = sum(valid_scores) / len(valid_scores) if valid_scores else 0.0
-        
-        # Store similarity results
-        result = {
-            "submission_id": submission_id,
-            "overall_ai_similarity": overall_ai_similarity,
-            "individual_similarities": similarity_scores,
-            "total_comparisons": len(ai_solutions),
-            "successful_comparisons": len(valid_scores),
-            "status": "completed"
-        }
+        # Embed the submission and all AI solutions in one batch, one matrix product
+        matrix, comparison_method = _calculate_similarity_matrix(
+            [student_code],
+            [ai_solution["code"] for ai_solution in ai_solutions],
+            method=EMBEDDING_METHOD
+        )
+        result = _ai_similarity_result(submission_id, matrix[0], ai_solutions, comparison_method)
         
         # Update database with similarity scores
-        _store_ai_similarity_results(submission_id, result)
+        _store_ai_similarity_results([result])
         
         logger.info(f"Completed AI similarity calculation for submission {submission_id}")
         return result
@@ -101,6 +76,50 @@ def calculate_ai_similarity(self, submission_id: int, student_code: str, ai_solu
         raise self.retry(exc=exc)
 
 
+@celery_app.task(bind=True, max_retries=3, default_retry_delay=30)
+def calculate_group_ai_similarity(self, task_id: int, submissions: List[Dict], ai_solutions: List[Dict]):
+    """
+    Calculate the AI similarity of every submission of a task at once.
+    
+    All submissions and AI solutions are embedded in one batch and compared
+    with a single matrix product.
+    
+    Args:
+        task_id (int): Database ID of the programming task
+        submissions (List[Dict]): Student submissions of the task
+        ai_solutions (List[Dict]): AI-generated reference solutions
+        
+    Returns:
+        list: One calculate_ai_similarity result per submission
+    """
+    try:
+        logger.info(f"Calculating AI similarity for {len(submissions)} submissions of task {task_id}")
+        
+        current_task.update_state(
+            state="PROGRESS",
+            meta={"current": 0, "total": len(submissions), "status": "Embedding submissions and AI solutions"}
+        )
+        
+        matrix, comparison_method = _calculate_similarity_matrix(
+            [sub["code"] for sub in submissions],
+            [ai_solution["code"] for ai_solution in ai_solutions],
+            method=EMBEDDING_METHOD
+        )
+        results = [
+            _ai_similarity_result(sub["id"], row, ai_solutions, comparison_method)
+            for sub, row in zip(submissions, matrix)
+        ]
+        
+        _store_ai_similarity_results(results)
+        
+        logger.info(f"Completed AI similarity calculation for task {task_id} ({comparison_method})")
+        return results
+        
+    except Exception as exc:
+        logger.error(f"Group AI similarity calculation failed for task {task_id}: {str(exc)}")
+        raise self.retry(exc=exc)
+
+
 @celery_app.task(bind=True, max_retries=3, default_retry_delay=30)
 def calculate_intra_group_similarity(self, task_id: int, submissions: List[Dict]):
     """
@@ -121,71 +140,75 @@ def calculate_intra_group_similarity(self, task_id: int, submissions: List[Dict]
         
         current_task.update_state(
             state="PROGRESS",
-            meta={"current": 0, "total": total_comparisons, "status": "Starting intra-group similarity calculation"}
+            meta={"current": 0, "total": num_submissions, "status": "Indexing submissions"}
+        )
+        
+        # Prepare every submission once and index its MinHash signature
+        documents = prepare_documents_parallel(
+            [sub["code"] for sub in submissions],
+            [sub.get("language", "python") for sub in submissions]
+        )
+        signatures = [minhash_signature(document.fingerprints) for document in documents]
+        
+        current_task.update_state(
+            state="PROGRESS",
+            meta={"current": num_submissions, "total": num_submissions, "status": "Scoring LSH candidate pairs"}
         )
         
+        # Exact hybrid similarity only for near-duplicate candidates; exact
+        # copies always score 1.0
+        candidate_scores = score_candidate_pairs(documents, signatures, settings.SIMILARITY_LSH_THRESHOLD)
+        program_hashes = {sub["id"]: program_hash(sub["code"]) for sub in submissions}
+        
         similarity_matrix = {}
-        comparison_count = 0
-        
-        # Calculate pairwise similarities
-        for i in range(num_submissions):
-            for j in range(i + 1, num_submissions):
-                try:
-                    comparison_count += 1
-                    current_task.update_state(
-                        state="PROGRESS",
-                        meta={"current": comparison_count, "total": total_comparisons, "status": f"Comparing submissions {i + 1} and {j + 1}"}
-                    )
-                    
-                    submission_a = submissions[i]
-                    submission_b = submissions[j]
-                    
-                    similarity_score = _calculate_code_similarity(
-                        submission_a["code"],
-                        submission_b["code"],
-                        method="cosine_embedding"
-                    )
-                    
-                    # Store bidirectional similarity
-                    key_ab = f"{submission_a['id']}_{submission_b['id']}"
-                    key_ba = f"{submission_b['id']}_{submission_a['id']}"
-                    
-                    similarity_matrix[key_ab] = {
-                        "submission_a_id": submission_a["id"],
-                        "submission_b_id": submission_b["id"],
-                        "similarity_score": similarity_score,
-                        "comparison_method": "cosine_embedding"
-                    }
-                    similarity_matrix[key_ba] = similarity_matrix[key_ab]
-                    
-                except Exception as e:
-                    logger.error(f"Failed to calculate similarity between submissions {i + 1} and {j + 1}: {str(e)}")
-        
-        # Calculate statistics for each submission
+        for (i, j), similarity_score in candidate_scores.items():
+            submission_a = submissions[i]
+            submission_b = submissions[j]
+            if program_hashes[submission_a["id"]] == program_hashes[submission_b["id"]]:
+                similarity_score = 1.0
+            
+            # Store bidirectional similarity
+            key_ab = f"{submission_a['id']}_{submission_b['id']}"
+            key_ba = f"{submission_b['id']}_{submission_a['id']}"
+            
+            similarity_matrix[key_ab] = {
+                "submission_a_id": submission_a["id"],
+                "submission_b_id": submission_b["id"],
+                "similarity_score": similarity_score,
+                "comparison_method": "hybrid"
+            }
+            similarity_matrix[key_ba] = {
+                "submission_a_id": submission_b["id"],
+                "submission_b_id": submission_a["id"],
+                "similarity_score": similarity_score,
+                "comparison_method": "hybrid"
+            }
+        
+        # Group candidate similarities by submission
+        related_by_submission = {submission["id"]: [] for submission in submissions}
+        for sim in similarity_matrix.values():
+            if sim["submission_a_id"] != sim["submission_b_id"]:
+                related_by_submission[sim["submission_a_id"]].append(sim["similarity_score"])
+        
+        # Calculate statistics for each submission. Averages, maxima and
+        # minima cover every peer: pairs below the LSH threshold are never
+        # scored and count as 0.0. Statistics over the scored candidates
+        # alone are reported separately.
+        num_peers = num_submissions - 1
         submission_stats = {}
         for submission in submissions:
             submission_id = submission["id"]
+            related_similarities = related_by_submission[submission_id]
+            num_candidates = len(related_similarities)
             
-            # Find all similarities involving this submission
-            related_similarities = [
-                sim["similarity_score"] for key, sim in similarity_matrix.items()
-                if sim["submission_a_id"] == submission_id and sim["submission_a_id"] != sim["submission_b_id"]
-            ]
-            
-            if related_similarities:
-                submission_stats[submission_id] = {
-                    "max_similarity": max(related_similarities),
-                    "avg_similarity": sum(related_similarities) / len(related_similarities),
-                    "min_similarity": min(related_similarities),
-                    "num_comparisons": len(related_similarities)
-                }
-            else:
-                submission_stats[submission_id] = {
-                    "max_similarity": 0.0,
-                    "avg_similarity": 0.0,
-                    "min_similarity": 0.0,
-                    "num_comparisons": 0
-                }
+            submission_stats[submission_id] = {
+                "max_similarity": max(related_similarities, default=0.0),
+                "avg_similarity": sum(related_similarities) / num_peers if num_peers else 0.0,
+                "min_similarity": min(related_similarities) if num_candidates == num_peers and num_peers else 0.0,
+                "num_comparisons": num_peers,
+                "candidate_avg_similarity": sum(related_similarities) / num_candidates if num_candidates else 0.0,
+                "num_candidates": num_candidates
+            }
         
         result = {
             "task_id": task_id,
@@ -193,12 +216,18 @@ def calculate_intra_group_similarity(self, task_id: int, submissions: List[Dict]
             "submission_stats": submission_stats,
             "total_submissions": num_submissions,
             "total_comparisons": total_comparisons,
+            "candidate_comparisons": len(candidate_scores),
             "successful_comparisons": len(similarity_matrix) // 2,  # Divide by 2 due to bidirectional storage
             "status": "completed"
         }
         
         # Store intra-group similarity results
-        _store_intra_group_similarity_results(task_id, result)
+        _store_intra_group_similarity_results(
+            task_id,
+            result,
+            {sub["id"]: hash_code(sub["code"]) for sub in submissions},
+            program_hashes
+        )
         
         logger.info(f"Completed intra-group similarity calculation for task {task_id}")
         return result
@@ -334,12 +363,10 @@ def batch_grade_submissions(self, task_id: int, deadline_triggered: bool = False
             meta={"current": 0, "total": len(submissions), "status": "Starting batch grading process"}
         )
         
-        # Step 1: Calculate AI similarities for all submissions
-        ai_similarity_jobs = group(
-            calculate_ai_similarity.s(sub["id"], sub["code"], ai_solutions)
-            for sub in submissions
+        # Step 1: Calculate AI similarities for all submissions in one batch
+        ai_similarity_results = calculate_group_ai_similarity.apply_async(
+            args=[task_id, submissions, ai_solutions]
         )
-        ai_similarity_results = ai_similarity_jobs.apply_async()
         
         # Step 2: Calculate intra-group similarity
         intra_group_result = calculate_intra_group_similarity.apply_async(
@@ -350,7 +377,10 @@ def batch_grade_submissions(self, task_id: int, deadline_triggered: bool = False
         ai_similarities = ai_similarity_results.get()
         intra_group_data = intra_group_result.get()
         
-        # Step 3: Generate final grades for all submissions
+        # Step 3: Run the task's tests for all submissions in one batch
+        correctness_scores = _calculate_correctness_scores(task_id, submissions)
+        
+        # Step 4: Generate final grades for all submissions
         grading_jobs = []
         task_description = _get_task_description(task_id)
         
@@ -363,8 +393,7 @@ def batch_grade_submissions(self, task_id: int, deadline_triggered: bool = False
             submission_stats = intra_group_data["submission_stats"].get(str(submission["id"]), {})
             intra_group_similarity = submission_stats.get("max_similarity", 0.0)
             
-            # Calculate correctness score (placeholder)
-            correctness_score = _calculate_correctness_score(submission["code"], task_id)
+            correctness_score = correctness_scores[submission["id"]]
             
             # Create grading job
             grading_job = generate_final_grade.s(
@@ -405,23 +434,105 @@ def batch_grade_submissions(self, task_id: int, deadline_triggered: bool = False
 
 # Helper functions (placeholder implementations)
 
-def _calculate_code_similarity(code1: str, code2: str, method: str = "cosine_embedding") -> float:
-    """Calculate similarity between two code snippets."""
-    # TODO: Implement actual similarity calculation using the similarity service
-    import random
-    return random.uniform(0.0, 1.0)
+def _calculate_similarity_matrix(
+    codes: List[str],
+    references: List[str],
+    method: str = EMBEDDING_METHOD
+) -> Tuple[np.ndarray, str]:
+    """
+    Calculate similarity of many code snippets against many references at once.
 
+    Embedding similarity falls back to the hybrid method when the embedding
+    model is unavailable on this worker.
 
-def _store_ai_similarity_results(submission_id: int, results: Dict):
-    """Store AI similarity results in database."""
-    # TODO: Implement database storage
-    pass
+    Returns:
+        Tuple of (len(codes) x len(references) scores, method actually used)
+    """
+    if not codes or not references:
+        return np.zeros((len(codes), len(references))), method
 
+    if method == EMBEDDING_METHOD:
+        try:
+            return embedding_similarity_matrix(codes, references), method
+        except Exception as e:
+            logger.warning(f"Embedding similarity failed, falling back to hybrid: {str(e)}")
+            method = "hybrid"
 
-def _store_intra_group_similarity_results(task_id: int, results: Dict):
-    """Store intra-group similarity results in database."""
-    # TODO: Implement database storage
-    pass
+    matrix = similarity_calculator.calculate_similarity_matrix(codes, references, method)
+    return matrix[:len(codes), len(codes):], method
+
+
+def _calculate_code_similarity(code1: str, code2: str, method: str = EMBEDDING_METHOD) -> float:
+    """Calculate similarity between two code snippets."""
+    matrix, _ = _calculate_similarity_matrix([code1], [code2], method)
+    return float(matrix[0, 0])
+
+
+def _ai_similarity_result(submission_id: int, scores: Sequence[float], ai_solutions: List[Dict], method: str) -> Dict:
+    """AI similarity result of one submission; overall_ai_similarity is the maximum score."""
+    similarity_scores = [
+        {
+            "ai_solution_id": ai_solution.get("id"),
+            "provider": ai_solution.get("provider"),
+            "variant_index": ai_solution.get("variant_index"),
+            "similarity_score": float(score),
+            "comparison_method": method
+        }
+        for ai_solution, score in zip(ai_solutions, scores)
+    ]
+    values = [s["similarity_score"] for s in similarity_scores]
+    
+    return {
+        "submission_id": submission_id,
+        "overall_ai_similarity": max(values, default=0.0),
+        "average_ai_similarity": sum(values) / len(values) if values else 0.0,
+        "comparison_method": method,
+        "individual_similarities": similarity_scores,
+        "total_comparisons": len(ai_solutions),
+        "successful_comparisons": len(values),
+        "status": "completed"
+    }
+
+
+def _store_ai_similarity_results(results: List[Dict]):
+    """Store each submission's overall (maximum) AI similarity in the column of its method."""
+    results = [result for result in results if result["successful_comparisons"]]
+    if not results:
+        return
+    
+    from app.tasks.ai_tasks import get_celery_db_session
+    
+    db = get_celery_db_session()
+    try:
+        for result in results:
+            store_ai_similarity(db, result["submission_id"], result["overall_ai_similarity"], result["comparison_method"])
+        db.commit()
+    finally:
+        db.close()
+
+
+def _store_intra_group_similarity_results(
+    task_id: int,
+    results: Dict,
+    content_hashes: Dict[int, str],
+    program_hashes: Dict[int, str]
+):
+    """Bulk-store the scored submission pairs in the pairwise similarity table."""
+    pairs = [
+        (sim["submission_a_id"], sim["submission_b_id"], sim["similarity_score"])
+        for sim in results["similarity_matrix"].values()
+    ]
+    if not pairs:
+        return
+    
+    from app.tasks.ai_tasks import get_celery_db_session
+    
+    db = get_celery_db_session()
+    try:
+        bulk_store_pair_similarities(db, task_id, pairs, content_hashes, program_hashes, method="hybrid")
+        db.commit()
+    finally:
+        db.close()
 
 
 def _get_ai_grade_evaluation(prompt: str) -> Dict:
@@ -435,17 +546,11 @@ def _get_ai_grade_evaluation(prompt: str) -> Dict:
 
 
 def _fallback_grading_logic(correctness: float, ai_sim: float, group_sim: float) -> Dict:
-    """Fallback grading logic when AI services are unavailable."""
-    # Apply penalties for high similarity
-    ai_penalty = min(30, ai_sim * 40)  # Up to 30 points penalty for AI similarity
-    group_penalty = min(20, group_sim * 25)  # Up to 20 points penalty for group similarity
-    
-    final_score = max(1, min(100, int(correctness - ai_penalty - group_penalty)))
-    
-    return {
-        "score": final_score,
-        "rationale": f"Automated grading: {correctness:.1f} correctness, -{ai_penalty:.1f} AI similarity penalty, -{group_penalty:.1f} group similarity penalty"
-    }
+    """Fallback grading logic when AI services are unavailable (default rubric)."""
+    return rubric_grade(
+        {"correctness_score": correctness, "ai_similarity": ai_sim, "intra_group_similarity": group_sim},
+        label="Automated grading"
+    )
 
 
 def _store_final_grade(submission_id: int, grade_data: Dict):
@@ -455,34 +560,87 @@ def _store_final_grade(submission_id: int, grade_data: Dict):
 
 
 def _get_task_submissions(task_id: int) -> List[Dict]:
-    """Get all submissions for a task."""
-    # TODO: Implement database query
-    return [
-        {"id": 1, "student_id": 1, "code": "# Sample student code 1", "created_at": "2024-01-01T00:00:00Z"},
-        {"id": 2, "student_id": 2, "code": "# Sample student code 2", "created_at": "2024-01-01T00:00:00Z"}
-    ]
+    """Get all submissions for a task, ordered by ID."""
+    from app.models.loading import SUBMISSION_CODE
+    from app.models.submission import Submission
+    from app.tasks.ai_tasks import get_celery_db_session
+    
+    db = get_celery_db_session()
+    try:
+        submissions = db.query(Submission).options(*SUBMISSION_CODE).filter(
+            Submission.task_id == task_id
+        ).order_by(Submission.id).all()
+        return [
+            {
+                "id": submission.id,
+                "student_id": submission.student_id,
+                "code": submission.code,
+                "created_at": submission.created_at.isoformat() if submission.created_at else None
+            }
+            for submission in submissions
+        ]
+    finally:
+        db.close()
 
 
 def _get_task_ai_solutions(task_id: int) -> List[Dict]:
-    """Get AI solutions for a task."""
-    # TODO: Implement database query
-    return [
-        {"id": "ai_1", "provider": "openai", "variant_index": 1, "code": "# AI solution 1"},
-        {"id": "ai_2", "provider": "openai", "variant_index": 2, "code": "# AI solution 2"}
-    ]
+    """Get the AI solutions with code for a task."""
+    from app.models.ai_solution import AISolution
+    from app.models.loading import AI_SOLUTION_CODE
+    from app.tasks.ai_tasks import get_celery_db_session
+    
+    db = get_celery_db_session()
+    try:
+        solutions = db.query(AISolution).options(*AI_SOLUTION_CODE).filter(
+            AISolution.task_id == task_id,
+            AISolution.code.isnot(None)
+        ).order_by(AISolution.id).all()
+        return [
+            {
+                "id": solution.id,
+                "provider": getattr(solution.provider, "value", solution.provider),
+                "variant_index": solution.variant_index,
+                "code": solution.code
+            }
+            for solution in solutions
+        ]
+    finally:
+        db.close()
 
 
 def _get_task_description(task_id: int) -> str:
     """Get task description."""
-    # TODO: Implement database query
-    return "Sample programming task description"
+    from app.models.loading import TASK_BODY
+    from app.models.task import Task
+    from app.tasks.ai_tasks import get_celery_db_session
+    
+    db = get_celery_db_session()
+    try:
+        task = db.query(Task).options(*TASK_BODY).filter(Task.id == task_id).first()
+        return task.body if task and task.body else ""
+    finally:
+        db.close()
 
 
-def _calculate_correctness_score(code: str, task_id: int) -> float:
-    """Calculate code correctness score."""
-    # TODO: Implement actual correctness evaluation
-    import random
-    return random.uniform(70.0, 100.0)
+def _calculate_correctness_scores(task_id: int, submissions: List[Dict]) -> Dict[int, float]:
+    """Calculate correctness scores from the task's tests (cached per code and test set)."""
+    from app.models.loading import TASK_GRADING
+    from app.models.task import Task
+    from app.tasks.ai_tasks import get_celery_db_session
+    
+    db = get_celery_db_session()
+    try:
+        task = db.query(Task).options(*TASK_GRADING).filter(Task.id == task_id).first()
+        if not task:
+            return {sub["id"]: DEFAULT_CORRECTNESS_SCORE for sub in submissions}
+        reports = run_submissions_tests_cached(
+            db, {sub["id"]: sub["code"] for sub in submissions}, task.language, task.tests
+        )
+        db.commit()
+    finally:
+        db.close()
+    
+    return {submission_id: report.correctness_score for submission_id, report in reports.items()}
 
 
 def _calculate_score_distribution(grades: List[Dict]) -> Dict:
@@ -528,7 +686,7 @@ def cleanup_old_results(self):
     """Cleanup old task results and transient data to control storage usage."""
     try:
         logger.info("Running cleanup of old results")
-        # TODO: Implement cleanup of old Celery results or DB records
+        # Evict stale cached test runs and LLM responses (Celery results expire on their own)
         cleaned = _cleanup_transient_data()
         return {"status": "completed", "cleaned": cleaned}
     except Exception as exc:
@@ -546,6 +704,15 @@ def _get_expired_tasks() -> List[int]:
 
 
 def _cleanup_transient_data() -> int:
-    """Placeholder for cleaning up transient data; returns count cleaned."""
-    # TODO: Implement actual cleanup logic
-    return 0
\ No newline at end of file
+    """Evict stale cached test runs and LLM responses; returns count cleaned."""
+    from app.tasks.ai_tasks import get_celery_db_session
+    
+    db = get_celery_db_session()
+    try:
+        cleaned = evict_cached_test_runs(db)
+        cleaned += evict_cached_llm_responses(db)
+        db.commit()
+    finally:
+        db.close()
+    
+    return cleaned
\ No newline at end of file
@@ -6,7 +6,11 @@ Tools for normalizing, tokenizing, and analyzing code submissions.
 
 import re
 import ast
-from typing import List, Dict, Set, Optional, Tuple
+from typing import List, Dict, Set, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.lexer import STRING, lex, token_ids
 
 
 def normalize_code(code: str, language: str = "python") -> str:
@@ -18,55 +22,110 @@ def normalize_code(code: str, language: str = "python") -> str:
         language: Programming language (python, javascript, java, cpp)
 
     Returns:
-        Normalized code string
+        Normalized code string (tokens separated by single spaces)
     """
-    if not code:
-        return ""
+    return " ".join(tokenize_code(code, language))
 
-    # Remove comments based on language
-    if language in ["python", "ruby", "perl"]:
-        # Remove single-line comments
-        code = re.sub(r'#.*$', '', code, flags=re.MULTILINE)
-        # Remove docstrings
-        code = re.sub(r'""".*?"""', '', code, flags=re.DOTALL)
-        code = re.sub(r"'''.*?'''", '', code, flags=re.DOTALL)
 
-    elif language in ["javascript", "typescript", "java", "cpp", "c", "go", "rust", "php"]:
-        # Remove single-line comments
-        code = re.sub(r'//.*$', '', code, flags=re.MULTILINE)
-        # Remove multi-line comments
-        code = re.sub(r'/\*.*?\*/', '', code, flags=re.DOTALL)
+def tokenize_code(code: str, language: str = "python") -> List[str]:
+    """
+    Extract meaningful tokens from code.
 
-    # Normalize whitespace
-    code = re.sub(r'\s+', ' ', code)
+    Args:
+        code: Source code string
+        language: Programming language
 
-    # Remove extra spaces around operators and punctuation
-    code = re.sub(r'\s*([{}();,=+\-*/\[\]])\s*', r'\1', code)
+    Returns:
+        List of code tokens (comments and whitespace removed)
+    """
+    return [token.text for token in lex(code, language)]
 
-    # Convert to lowercase for comparison (optional, can be disabled)
-    code = code.lower()
 
-    return code.strip()
+# Karp-Rabin base for k-gram hashing
+_KGRAM_BASE = np.uint64(1000003)
+_MASK_32 = np.uint64(0xFFFFFFFF)
 
 
-def tokenize_code(code: str, language: str = "python") -> List[str]:
+def hash_kgrams(token_ids: Sequence[int], k: int = 5) -> List[int]:
     """
-    Extract meaningful tokens from code.
+    Hash every contiguous k-gram of a token-id stream.
+
+    Uses a vectorized Karp-Rabin polynomial over the ids followed by a
+    32-bit avalanche mix, so hashes are stable across processes.
 
     Args:
-        code: Source code string
-        language: Programming language
+        token_ids: Token-id stream (see ``app.utils.lexer.token_ids``)
+        k: Number of tokens per k-gram
 
     Returns:
-        List of code tokens
+        List of 32-bit k-gram hashes (a single hash if the stream is shorter than k)
     """
-    normalized = normalize_code(code, language)
+    ids = np.asarray(token_ids, dtype=np.uint64)
+    if ids.size == 0:
+        return []
+
+    k = min(k, ids.size)
+    windows = np.lib.stride_tricks.sliding_window_view(ids, k)
+    powers = _KGRAM_BASE ** np.arange(k - 1, -1, -1, dtype=np.uint64) & _MASK_32
+    hashes = (windows * powers).sum(axis=1, dtype=np.uint64) & _MASK_32
 
-    # Extract identifiers, keywords, operators, and literals
-    tokens = re.findall(r'\b\w+\b|[{}();,=+\-*/\[\]]', normalized)
+    # fmix32 finalizer from MurmurHash3
+    hashes ^= hashes >> np.uint64(16)
+    hashes = (hashes * np.uint64(0x85EBCA6B)) & _MASK_32
+    hashes ^= hashes >> np.uint64(13)
+    hashes = (hashes * np.uint64(0xC2B2AE35)) & _MASK_32
+    hashes ^= hashes >> np.uint64(16)
 
-    # Filter out very short tokens (but keep operators)
-    return [token for token in tokens if len(token) > 1 or token in '{}();,=+-*/[]']
+    return hashes.tolist()
+
+
+def winnow(hashes: List[int], window: int = 4) -> List[int]:
+    """
+    Select fingerprints from k-gram hashes using winnowing (Schleimer et al., MOSS).
+
+    In every window of consecutive hashes the minimum is selected (the
+    rightmost one on ties); each selected position is recorded once.
+
+    Args:
+        hashes: K-gram hashes in token order
+        window: Winnowing window size
+
+    Returns:
+        Selected fingerprint hashes in order of position
+    """
+    if len(hashes) <= window:
+        return [min(hashes)] if hashes else []
+
+    fingerprints = []
+    last_position = -1
+
+    for start in range(len(hashes) - window + 1):
+        position = start
+        for offset in range(start + 1, start + window):
+            if hashes[offset] <= hashes[position]:
+                position = offset
+
+        if position != last_position:
+            fingerprints.append(hashes[position])
+            last_position = position
+
+    return fingerprints
+
+
+def winnow_code(code: str, language: str = "python", k: int = 5, window: int = 4) -> List[int]:
+    """
+    Compute winnowed k-gram fingerprints of a code snippet.
+
+    Args:
+        code: Source code string
+        language: Programming language
+        k: Number of tokens per k-gram
+        window: Winnowing window size
+
+    Returns:
+        Selected fingerprint hashes
+    """
+    return winnow(hash_kgrams(token_ids(lex(code, language)), k), window)
 
 
 def extract_functions(code: str, language: str = "python") -> List[Dict[str, str]]:
@@ -235,14 +294,8 @@ def remove_strings_and_comments(code: str, language: str = "python") -> str:
     Returns:
         Code without strings and comments
     """
-    # Remove string literals
-    code = re.sub(r'"[^"]*"', '""', code)
-    code = re.sub(r"'[^']*'", "''", code)
-
-    # Remove comments
-    code = normalize_code(code, language)
-
-    return code
+    # Comments are dropped by the lexer; string literals are emptied
+    return " ".join('""' if token.kind == STRING else token.text for token in lex(code, language))
 
 
 def get_code_structure(code: str, language: str = "python") -> Dict[str, any]:
@@ -0,0 +1,283 @@
+"""
+EduCode Backend - Source Code Lexer
+
+Single-pass, language-aware lexing of submissions. Python is lexed with the
+standard library ``tokenize`` module; all other supported languages share a
+hand-written state machine for C-like syntax. Comments and whitespace are
+dropped, string literals stay intact (a ``#`` or ``//`` inside a string is
+not a comment), and the token stream can be mapped to compact integer ids
+with identifiers and literals canonicalized.
+"""
+
+import io
+import hashlib
+import keyword
+import tokenize
+from typing import Dict, FrozenSet, List, NamedTuple, Sequence
+
+import numpy as np
+
+# Token kinds
+KEYWORD = "keyword"
+NAME = "name"
+NUMBER = "number"
+STRING = "string"
+OP = "op"
+
+# Placeholders used for canonicalized tokens
+IDENTIFIER_PLACEHOLDER = "<id>"
+NUMBER_PLACEHOLDER = "<num>"
+STRING_PLACEHOLDER = "<str>"
+
+_C_KEYWORDS = {
+    "auto", "break", "case", "char", "const", "continue", "default", "do", "double",
+    "else", "enum", "extern", "float", "for", "goto", "if", "inline", "int", "long",
+    "register", "restrict", "return", "short", "signed", "sizeof", "static", "struct",
+    "switch", "typedef", "union", "unsigned", "void", "volatile", "while",
+}
+
+LANGUAGE_KEYWORDS: Dict[str, FrozenSet[str]] = {
+    "python": frozenset(keyword.kwlist),
+    "c": frozenset(_C_KEYWORDS),
+    "cpp": frozenset(_C_KEYWORDS | {
+        "bool", "catch", "class", "constexpr", "delete", "explicit", "false", "friend",
+        "namespace", "new", "nullptr", "operator", "private", "protected", "public",
+        "template", "this", "throw", "true", "try", "typename", "using", "virtual",
+    }),
+    "java": frozenset({
+        "abstract", "assert", "boolean", "break", "byte", "case", "catch", "char", "class",
+        "const", "continue", "default", "do", "double", "else", "enum", "extends", "false",
+        "final", "finally", "float", "for", "if", "implements", "import", "instanceof", "int",
+        "interface", "long", "native", "new", "null", "package", "private", "protected",
+        "public", "return", "short", "static", "super", "switch", "synchronized", "this",
+        "throw", "throws", "try", "true", "var", "void", "volatile", "while",
+    }),
+    "javascript": frozenset({
+        "async", "await", "break", "case", "catch", "class", "const", "continue", "default",
+        "delete", "do", "else", "export", "extends", "false", "finally", "for", "function",
+        "if", "import", "in", "instanceof", "let", "new", "null", "of", "return", "super",
+        "switch", "this", "throw", "true", "try", "typeof", "undefined", "var", "void",
+        "while", "yield",
+    }),
+    "csharp": frozenset({
+        "abstract", "bool", "break", "case", "catch", "char", "class", "const", "continue",
+        "decimal", "default", "do", "double", "else", "enum", "false", "finally", "float",
+        "for", "foreach", "if", "in", "int", "interface", "internal", "is", "long",
+        "namespace", "new", "null", "out", "override", "private", "protected", "public",
+        "readonly", "ref", "return", "static", "string", "struct", "switch", "this", "throw",
+        "true", "try", "using", "var", "virtual", "void", "while",
+    }),
+    "go": frozenset({
+        "break", "case", "chan", "const", "continue", "default", "defer", "else",
+        "fallthrough", "for", "func", "go", "goto", "if", "import", "interface", "map",
+        "nil", "package", "range", "return", "select", "struct", "switch", "type", "var",
+    }),
+    "rust": frozenset({
+        "as", "break", "const", "continue", "crate", "else", "enum", "false", "fn", "for",
+        "if", "impl", "in", "let", "loop", "match", "mod", "move", "mut", "pub", "ref",
+        "return", "self", "Self", "static", "struct", "super", "trait", "true", "type",
+        "unsafe", "use", "where", "while",
+    }),
+}
+
+# Multi-character operators recognized by the C-like lexer (longest match wins)
+_OPERATORS = (
+    ">>>=", "<<=", ">>=", "...", "->*", "<=>", "===", "!==", ">>>", "**=", "//=",
+    "==", "!=", "<=", ">=", "&&", "||", "++", "--", "+=", "-=", "*=", "/=", "%=",
+    "&=", "|=", "^=", "<<", ">>", "->", "::", "=>", ":=", "**", "//", "?.", "??",
+)
+_OPERATORS_BY_LENGTH = {
+    length: frozenset(op for op in _OPERATORS if len(op) == length) for length in (4, 3, 2)
+}
+_SINGLE_CHAR_OPERATORS = "+-*/%=<>!&|^~?:;,.()[]{}@#$\\"
+
+# Stable vocabulary for token ids; changing it changes every stored fingerprint
+VOCABULARY = (
+    (IDENTIFIER_PLACEHOLDER, NUMBER_PLACEHOLDER, STRING_PLACEHOLDER)
+    + tuple(sorted(set().union(*LANGUAGE_KEYWORDS.values())))
+    + tuple(sorted(set(_OPERATORS) | set(_SINGLE_CHAR_OPERATORS)))
+)
+_TOKEN_IDS = {token: index for index, token in enumerate(VOCABULARY)}
+
+_PYTHON_SKIPPED = {
+    tokenize.COMMENT, tokenize.NL, tokenize.NEWLINE, tokenize.INDENT,
+    tokenize.DEDENT, tokenize.ENCODING, tokenize.ENDMARKER,
+}
+_PYTHON_STRING_TYPES = {tokenize.STRING} | {
+    getattr(tokenize, name) for name in ("FSTRING_START", "FSTRING_MIDDLE", "FSTRING_END") if hasattr(tokenize, name)
+}
+
+
+class Token(NamedTuple):
+    """A lexed token: its kind and source text."""
+    kind: str
+    text: str
+
+
+def lex(code: str, language: str = "python") -> List[Token]:
+    """
+    Split source code into tokens in a single pass.
+
+    Args:
+        code: Source code string
+        language: Programming language (a ProgrammingLanguage value)
+
+    Returns:
+        Tokens without comments or whitespace
+    """
+    if not code:
+        return []
+
+    if language == "python":
+        try:
+            return _lex_python(code)
+        except (tokenize.TokenError, SyntaxError):
+            # Unbalanced brackets, bad indentation etc.: lex it as plain text
+            return _lex_c_like(code, LANGUAGE_KEYWORDS["python"], hash_comments=True)
+
+    keywords = LANGUAGE_KEYWORDS.get(language, LANGUAGE_KEYWORDS["c"])
+    return _lex_c_like(code, keywords, hash_comments=False)
+
+
+def _lex_python(code: str) -> List[Token]:
+    """Lex Python code with the standard library tokenizer."""
+    keywords = LANGUAGE_KEYWORDS["python"]
+    tokens = []
+
+    for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+        if tok.type in _PYTHON_SKIPPED:
+            continue
+        if tok.type == tokenize.NAME:
+            tokens.append(Token(KEYWORD if tok.string in keywords else NAME, tok.string))
+        elif tok.type == tokenize.NUMBER:
+            tokens.append(Token(NUMBER, tok.string))
+        elif tok.type in _PYTHON_STRING_TYPES:
+            tokens.append(Token(STRING, tok.string))
+        elif tok.string.strip():
+            tokens.append(Token(OP, tok.string))
+
+    return tokens
+
+
+def _lex_c_like(code: str, keywords: FrozenSet[str], hash_comments: bool) -> List[Token]:
+    """
+    Lex C-family code with a character-level state machine.
+
+    Handles ``//`` and ``/* */`` comments (``#`` comments instead when
+    ``hash_comments`` is set), quoted literals with escapes, numbers,
+    identifiers and longest-match operators.
+    """
+    tokens = []
+    length = len(code)
+    i = 0
+
+    while i < length:
+        char = code[i]
+
+        if char.isspace():
+            i += 1
+
+        elif char == "/" and code.startswith("//", i) and not hash_comments:
+            end = code.find("\n", i)
+            i = length if end < 0 else end
+
+        elif char == "/" and code.startswith("/*", i) and not hash_comments:
+            end = code.find("*/", i + 2)
+            i = length if end < 0 else end + 2
+
+        elif char == "#" and hash_comments:
+            end = code.find("\n", i)
+            i = length if end < 0 else end
+
+        elif char in "\"'`":
+            end = _scan_string(code, i, char)
+            if end is None:
+                # Unterminated quote (e.g. a Rust lifetime): treat as an operator
+                tokens.append(Token(OP, char))
+                i += 1
+            else:
+                tokens.append(Token(STRING, code[i:end]))
+                i = end
+
+        elif char.isdigit() or (char == "." and i + 1 < length and code[i + 1].isdigit()):
+            start = i
+            i += 1
+            while i < length and (code[i].isalnum() or code[i] in "._"):
+                i += 1
+            tokens.append(Token(NUMBER, code[start:i]))
+
+        elif char.isalpha() or char in "_$":
+            start = i
+            i += 1
+            while i < length and (code[i].isalnum() or code[i] in "_$"):
+                i += 1
+            word = code[start:i]
+            tokens.append(Token(KEYWORD if word in keywords else NAME, word))
+
+        else:
+            for size in (4, 3, 2):
+                if code[i:i + size] in _OPERATORS_BY_LENGTH[size]:
+                    tokens.append(Token(OP, code[i:i + size]))
+                    i += size
+                    break
+            else:
+                tokens.append(Token(OP, char))
+                i += 1
+
+    return tokens
+
+
+def _scan_string(code: str, start: int, quote: str):
+    """Return the end index of a quoted literal, or None if it is not closed."""
+    i = start + 1
+    length = len(code)
+
+    while i < length:
+        char = code[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == quote:
+            return i + 1
+        if char == "\n" and quote != "`":
+            return None
+        i += 1
+
+    return None
+
+
+def canonical_text(token: Token) -> str:
+    """Canonical form of a token: placeholders for identifiers and literals."""
+    if token.kind == NAME:
+        return IDENTIFIER_PLACEHOLDER
+    if token.kind == NUMBER:
+        return NUMBER_PLACEHOLDER
+    if token.kind == STRING:
+        return STRING_PLACEHOLDER
+    return token.text
+
+
+def token_ids(tokens: Sequence[Token]) -> np.ndarray:
+    """
+    Map tokens to a compact id array with identifiers and literals canonicalized.
+
+    Renaming variables or changing constants therefore leaves the array
+    unchanged. Tokens outside the vocabulary get a stable hashed id.
+
+    Args:
+        tokens: Lexed tokens
+
+    Returns:
+        int32 array of token ids
+    """
+    ids = np.empty(len(tokens), dtype=np.int32)
+
+    for position, token in enumerate(tokens):
+        text = canonical_text(token)
+        token_id = _TOKEN_IDS.get(text)
+        if token_id is None:
+            digest = hashlib.blake2b(text.encode("utf-8"), digest_size=2).digest()
+            token_id = len(VOCABULARY) + int.from_bytes(digest, "little")
+        ids[position] = token_id
+
+    return ids
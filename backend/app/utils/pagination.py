@@ -0,0 +1,138 @@
+"""
+EduCode Backend - Keyset Pagination
+
+Cursor pagination for list endpoints, ordered newest first by
+``(created_at, id)``. A cursor is an opaque token for the last row of a
+page; the next page starts strictly after it, so deep pages cost the same
+as the first one (backed by a ``(created_at, id)`` index) and rows added
+meanwhile do not shift pages. ``page`` without a cursor is still accepted
+and falls back to OFFSET.
+
+Totals are counted from the same filtered query that returns the rows and
+cached per process for PAGINATION_TOTAL_CACHE_SECONDS, so paging through a
+list does not run ``COUNT(*)`` for every page.
+"""
+
+import base64
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Select, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+# Cached totals are dropped once this many queries are tracked
+_TOTAL_CACHE_MAX_ENTRIES = 1024
+_total_cache: Dict[Tuple[str, str], Tuple[float, int]] = {}
+
+
+class Page(NamedTuple):
+    """One page of rows plus the cursor for the next page (None on the last page)."""
+    items: List[Any]
+    next_cursor: Optional[str]
+    total: Optional[int]
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Opaque cursor for the row with this ``(created_at, id)``."""
+    payload = json.dumps([created_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor from ``encode_cursor``.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+async def cached_total(db: AsyncSession, query: Select) -> int:
+    """
+    Count the rows ``query`` returns, reusing a recent count of the same query.
+
+    Args:
+        db: Database session
+        query: Filtered list query (ordering and limits are ignored)
+
+    Returns:
+        Number of rows
+    """
+    count_query = select(func.count()).select_from(query.order_by(None).limit(None).offset(None).subquery())
+    compiled = count_query.compile()
+    key = (str(compiled), repr(sorted(compiled.params.items())))
+    now = time.monotonic()
+
+    cached = _total_cache.get(key)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    total = (await db.execute(count_query)).scalar()
+    if settings.PAGINATION_TOTAL_CACHE_SECONDS > 0:
+        if len(_total_cache) >= _TOTAL_CACHE_MAX_ENTRIES:
+            for stale in [k for k, (expires, _) in _total_cache.items() if expires <= now] or list(_total_cache):
+                del _total_cache[stale]
+        _total_cache[key] = (now + settings.PAGINATION_TOTAL_CACHE_SECONDS, total)
+    return total
+
+
+async def paginate(
+    db: AsyncSession,
+    query: Select,
+    model: Any,
+    size: int,
+    cursor: Optional[str] = None,
+    page: int = 1,
+    include_total: bool = True
+) -> Page:
+    """
+    Fetch one page of ``query``, newest first.
+
+    Args:
+        db: Database session
+        query: Filtered ``select(model)`` query without ordering or limits
+        model: Mapped class with ``created_at`` and ``id`` columns
+        size: Page size
+        cursor: Cursor from a previous page; takes precedence over ``page``
+        page: 1-based page number, used (via OFFSET) only without a cursor
+        include_total: Whether to return the (cached) total
+
+    Returns:
+        Page of ORM rows
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed
+    """
+    total = await cached_total(db, query) if include_total else None
+
+    rows_query = query.order_by(model.created_at.desc(), model.id.desc())
+    if cursor:
+        try:
+            created_at, row_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        rows_query = rows_query.where(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+    elif page > 1:
+        rows_query = rows_query.offset((page - 1) * size)
+
+    # One extra row tells whether a next page exists
+    result = await db.execute(rows_query.limit(size + 1))
+    items = list(result.scalars().all())
+
+    next_cursor = None
+    if len(items) > size:
+        items = items[:size]
+        next_cursor = encode_cursor(items[-1].created_at, items[-1].id)
+
+    return Page(items=items, next_cursor=next_cursor, total=total)